@@ -0,0 +1,238 @@
+import json
+
+import flask
+
+from bibliotheque import bibliotheque
+from elasticites import compute_elasticites
+from model import parametres
+from prevention import charge_interventions, optimise
+from scenarios import ErreurScenario, evalue_scenarios, lit_ndjson, lit_scenario
+
+NDJSON = "application/x-ndjson"
+
+api = flask.Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def _ndjson(resultats):
+    for resultat in resultats:
+        yield json.dumps(resultat, ensure_ascii=False) + "\n"
+
+
+@api.route("/costs", methods=["POST"])
+def costs():
+    """Coûts d'un ou plusieurs scénarios
+
+    - corps JSON : un scénario, une liste de scénarios ou
+      {"scenarios": [...]} ; la réponse est un objet, ou {"resultats": [...]}
+    - corps NDJSON (Content-Type application/x-ndjson) : un scénario par
+      ligne, lu au fil de l'eau
+
+    La réponse est en NDJSON, un résultat par ligne et envoyée au fil du
+    calcul, si le corps est en NDJSON, si Accept contient
+    application/x-ndjson ou avec ?format=ndjson. La réponse étant déjà
+    partie, un scénario invalide y donne une ligne {"erreur": ...} à sa
+    place, les autres sont calculés"""
+
+    requete = flask.request
+    reponse_ndjson = (
+        requete.args.get("format") == "ndjson"
+        or NDJSON in requete.headers.get("Accept", "")
+        or requete.mimetype == NDJSON
+    )
+
+    unique = False
+    if requete.mimetype == NDJSON:
+        scenarios = lit_ndjson(requete.stream, erreurs_en_ligne=True)
+    else:
+        corps = requete.get_json(force=True, silent=True)
+        if corps is None:
+            return flask.jsonify({"erreur": "Corps JSON invalide"}), 400
+        if isinstance(corps, dict) and "scenarios" in corps:
+            scenarios = corps["scenarios"]
+            if not isinstance(scenarios, list):
+                return flask.jsonify({"erreur": "scenarios : liste attendue"}), 400
+        elif isinstance(corps, list):
+            scenarios = corps
+        else:
+            scenarios = [corps]
+            unique = True
+
+    if reponse_ndjson:
+        return flask.Response(
+            flask.stream_with_context(
+                _ndjson(evalue_scenarios(scenarios, erreurs_en_ligne=True))
+            ),
+            mimetype=NDJSON,
+        )
+
+    try:
+        resultats = list(evalue_scenarios(scenarios))
+    except ErreurScenario as e:
+        return flask.jsonify({"erreur": str(e)}), 400
+
+    if unique:
+        return flask.jsonify(resultats[0])
+    return flask.jsonify({"resultats": resultats})
+
+
+@api.route("/gradient", methods=["POST"])
+def gradient():
+    """Dérivées et élasticités du coût annuel d'un scénario (même format que
+    /costs) par rapport à chaque variable : pour le total, chaque maladie et
+    chaque secteur"""
+
+    scenario = flask.request.get_json(force=True, silent=True)
+    try:
+        x, naissances = lit_scenario(scenario)
+    except ErreurScenario as e:
+        return flask.jsonify({"erreur": str(e)}), 400
+
+    resultat = {
+        nom: {
+            "cout_total": sous_total["cout"],
+            "gradient": dict(zip(parametres.noms, sous_total["gradient"].tolist())),
+            "elasticites": dict(
+                zip(parametres.noms, sous_total["elasticites"].tolist())
+            ),
+        }
+        for nom, sous_total in compute_elasticites(x, naissances).items()
+    }
+    return flask.jsonify({"naissances": naissances, "couts": resultat})
+
+
+@api.route("/variables")
+def variables():
+    """Noms, valeurs par défaut et bornes des variables du modèle"""
+    return flask.jsonify(
+        [
+            {
+                "nom": nom,
+                "defaut": float(parametres.defaut[i]),
+                "mini": float(parametres.mini[i]),
+                "maxi": float(parametres.maxi[i]),
+                "categorie": parametres.categories[i],
+            }
+            for i, nom in enumerate(parametres.noms)
+        ]
+    )
+
+
+@api.route("/scenarios", methods=["GET"])
+def liste_scenarios():
+    """Scénarios enregistrés, filtrés par ?nom= (préfixe), ?proprietaire= et
+    ?territoire=, au plus ?limite= (50 par défaut, entre 1 et 500)"""
+    args = flask.request.args
+    try:
+        # type=int ignorerait silencieusement une valeur non entière
+        territoire, limite = args.get("territoire"), args.get("limite", 50)
+        scenarios = bibliotheque.cherche(
+            nom=args.get("nom"),
+            proprietaire=args.get("proprietaire"),
+            territoire=None if territoire is None else int(territoire),
+            limite=int(limite),
+        )
+    except ValueError as e:
+        return flask.jsonify({"erreur": str(e)}), 400
+    return flask.jsonify({"scenarios": scenarios})
+
+
+@api.route("/scenarios", methods=["POST"])
+def enregistre_scenario():
+    """Enregistre un scénario au format de /costs, avec un nom et un
+    propriétaire optionnel ; les variables absentes prennent leur valeur
+    par défaut"""
+
+    scenario = flask.request.get_json(force=True, silent=True)
+    try:
+        x, _ = lit_scenario(scenario)
+        identifiant = bibliotheque.enregistre(
+            scenario.get("nom"),
+            x,
+            territoire=scenario.get("territoire"),
+            naissances=scenario.get("naissances"),
+            proprietaire=scenario.get("proprietaire", ""),
+        )
+    except ErreurScenario as e:
+        return flask.jsonify({"erreur": str(e)}), 400
+    return flask.jsonify({"id": identifiant}), 201
+
+
+@api.route("/scenarios/<int:identifiant>", methods=["GET", "DELETE"])
+def scenario(identifiant):
+    """Scénario enregistré ; DELETE le supprime si ?proprietaire= est son
+    libellé de propriétaire. Il n'y a pas d'authentification : ce libellé,
+    renvoyé par GET, évite les suppressions par erreur, pas malveillantes"""
+    try:
+        if flask.request.method == "DELETE":
+            bibliotheque.supprime(
+                identifiant, flask.request.args.get("proprietaire", "")
+            )
+            return "", 204
+        scenario = bibliotheque.get(identifiant)
+    except KeyError:
+        return flask.jsonify({"erreur": f"Scénario inconnu : {identifiant}"}), 404
+    except PermissionError:
+        erreur = f"?proprietaire= ne correspond pas au scénario {identifiant}"
+        return flask.jsonify({"erreur": erreur}), 403
+
+    scenario["valeurs"] = dict(zip(parametres.noms, scenario["valeurs"].tolist()))
+    return flask.jsonify(scenario)
+
+
+@api.route("/scenarios/compare")
+def compare_scenarios():
+    """Coûts annuels des scénarios ?ids=1,2,3 côte à côte (total, mère,
+    bébé, maladies, secteurs) et écarts au premier"""
+    try:
+        identifiants = [int(i) for i in flask.request.args.get("ids", "").split(",")]
+        tableau = bibliotheque.compare(identifiants)
+    except ErreurScenario as e:
+        return flask.jsonify({"erreur": str(e)}), 400
+    except ValueError:
+        return flask.jsonify({"erreur": "ids : identifiants séparés par ,"}), 400
+    return flask.jsonify(
+        {
+            "lignes": list(tableau.index),
+            "colonnes": {c: tableau[c].tolist() for c in tableau.columns},
+        }
+    )
+
+
+def _allocation(resultat, k):
+    return {
+        "depense": resultat["depense"][k],
+        "cout_evite": resultat["cout_evite"][k],
+        "net": resultat["net"][k],
+        "couvertures": dict(
+            zip(resultat["interventions"], resultat["couvertures"][k].tolist())
+        ),
+    }
+
+
+@api.route("/prevention", methods=["POST"])
+def prevention():
+    """Allocation d'un budget annuel de prévention (budget, en €) entre des
+    interventions, pour un scénario au format de /costs : allocation au gain
+    net maximal dans le budget, et frontière efficace dépense / coût évité.
+    Sans interventions, celles de resources/interventions.csv"""
+
+    scenario = flask.request.get_json(force=True, silent=True)
+    try:
+        x, naissances = lit_scenario(scenario)
+        resultat = optimise(
+            x,
+            naissances,
+            scenario.get("interventions") or charge_interventions(),
+            budget=scenario.get("budget"),
+        )
+    except ErreurScenario as e:
+        return flask.jsonify({"erreur": str(e)}), 400
+
+    return flask.jsonify(
+        {
+            "naissances": naissances,
+            "cout_reference": resultat["cout_reference"],
+            "optimum": _allocation(resultat, resultat["optimum"]),
+            "frontiere": [_allocation(resultat, k) for k in resultat["frontiere"]],
+        }
+    )
@@ -1,621 +1,747 @@
 # DASH IMPORTS
 import dash
-import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
-from dash.dependencies import Input, Output, State
-import dash_table as dt
+from dash.dependencies import Input, Output, State, MATCH
+from dash.exceptions import PreventUpdate
 
 # OTHER IMPORTS
-import numpy as np
-import pandas as pd
-import plotly.express as px
+import os
+import logging
 import plotly.graph_objs as go
-import time
-from itertools import chain
+import flask
 
 # LOCAL IMPORTS
-from utils import make_group, generate_popovers, generate_qm
-from utils import make_card_repartition, make_row, millify, generate_form_naissances
-from utils import get_pitch, generate_item
-from model import process_values
-from table_mod import generate_table_from_df
-
+from utils import millify, compute_dataframes, calcul_incremental, make_frontiere
+from model import df_variables
+from incertitude import compute_incertitude, multiplie_naissances
+from sensibilite import compute_bauer_hamby, bauer_hamby_par_categorie
+from sensibilite import compute_sobol
+from table_mod import generate_table, format_euros, donnees_datatable
+from cache import cache_resultats, cle_hypotheses
+from territoires import index_territoires, recherche_territoires, slot_salaire
+from bibliotheque import bibliotheque
+from scenarios import ErreurScenario
+from prevention import interventions_depuis_lignes, optimise
+from permaliens import PARAMETRE, code_permalien, decode_permalien, encode_permalien
+from clientside import export_callback_resultats, export_callback_elasticites
+from statique import init_statique, charge_snapshot, ecrit_snapshot
+from metriques import etape, init_metriques
+from api import api
+
+CHEMIN_SNAPSHOT = os.environ.get("PSYPERINATHON_LAYOUT")
+
+# LOGS : niveau WARNING par défaut, PSYPERINATHON_LOG=DEBUG pour le détail
+# des calculs de chaque requête
+logging.basicConfig(
+    level=os.environ.get("PSYPERINATHON_LOG", "WARNING"),
+    format="%(asctime)s %(levelname)s %(name)s : %(message)s",
+)
+logger = logging.getLogger(__name__)
 
 # DASH AND APP SETTINGS
 external_stylesheets = [dbc.themes.BOOTSTRAP]
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 server = app.server
-
-# CSS SETTINGS
-eq_width = {"width": "25%", "text-align": "center", "font-weight": "bold"}
-tt = {"always_visible": False, "placement": "topLeft"}
+server.register_blueprint(api)
+init_metriques(server, cache_resultats)
 
 # VARIABLES
-global df_variables
-col_types = {"maxi": float, "mini": int, "val": float, "step": float}
-df_variables = pd.read_csv("resources/bdd_variables.csv", dtype=col_types)
-nb_variables_total = df_variables.shape[0]
+nb_variables_total = len(df_variables)
 
+# index des coûts par territoire pour les hypothèses par défaut
+index_territoires(df_variables["val"])
 
-# DEPRESSION
-items_depression_mere = generate_item(df_variables, "depression_mere")
-items_depression_bebe = generate_item(df_variables, "depression_bebe")
+# LAYOUT : construit à l'import de layout.py, ou lu depuis un snapshot
+# (PSYPERINATHON_LAYOUT) sans rien construire
+layout_json = charge_snapshot(CHEMIN_SNAPSHOT) if CHEMIN_SNAPSHOT else None
+if layout_json is None:
+    from layout import layout
 
+    app.layout = layout
+    if CHEMIN_SNAPSHOT:
+        ecrit_snapshot(CHEMIN_SNAPSHOT, layout)
+else:
+    # Dash exige un layout : celui servi au navigateur est le snapshot
+    app.layout = html.Div(id="main-container")
+init_statique(app, layout_json)
 
-# ANXIETE
-items_anxiete_mere = generate_item(df_variables, "anxiete_mere")
-items_anxiete_bebe = generate_item(df_variables, "anxiete_bebe")
 
+def _declencheurs():
+    return {d["prop_id"] for d in dash.callback_context.triggered}
 
-# PSYCHOSE
-items_psychose_mere = generate_item(df_variables, "psychose_mere")
-items_psychose_bebe = generate_item(df_variables, "psychose_bebe")
 
-
-# MEDICAL ET ECONOMIQUE
-items_economique = generate_item(df_variables, "economique")
-items_medical = generate_item(df_variables, "medical")
+@app.callback(
+    [Output("dd-echelle", "options"), Output("dd-echelle", "value")],
+    [Input("dd-echelle", "search_value"), Input("url", "search")],
+    [State("dd-echelle", "value")],
+)
+def search_echelle(search_value, search, val):
+    # à l'ouverture d'un lien permanent : territoire du lien
+    if "dd-echelle.search_value" not in _declencheurs():
+        try:
+            permalien = rendu_permalien(code_permalien(search))
+        except ErreurScenario:
+            raise PreventUpdate
+        if permalien is None:
+            raise PreventUpdate
+        territoires = list(recherche_territoires().cherche(""))
+        if permalien["territoire"] not in territoires:
+            territoires.append(permalien["territoire"])
+        return recherche_territoires().options(territoires), permalien["territoire"]
+
+    if not search_value:
+        raise PreventUpdate
+
+    territoires = list(recherche_territoires().cherche(search_value))
+    # le territoire choisi doit rester dans les options pour être affiché
+    if val is not None and val not in territoires:
+        territoires.append(val)
+    return recherche_territoires().options(territoires), dash.no_update
 
 
-tabs_variables = dbc.Tabs(
+@app.callback(
+    [Output("nombre-naissances", "value")]
+    + [Output(f"slider-{i}", "value") for i in range(nb_variables_total)]
+    + [Output("permalien-applique", "data"), Output("hypotheses-chargees", "data")],
     [
-        dbc.Tab(
-            make_group("Variables médicales", items_medical, "Variables-Médicales"),
-            label="Variables médicales",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            make_group(
-                "Variables économiques", items_economique, "Variables-Economiques"
-            ),
-            label="Variables économiques",
-            tab_style=eq_width,
-        ),
+        Input("url", "search"),
+        Input("dd-echelle", "value"),
+        Input("button-charger-scenario", "n_clicks"),
     ],
-)
-
-tabs_maladies = dbc.Tabs(
     [
-        dbc.Tab(
-            [
-                make_group(
-                    "Coûts pour la mère", items_depression_mere, "Dépression-Mère"
-                ),
-                html.Hr(),
-                make_group(
-                    "Coûts pour le bébé", items_depression_bebe, "Dépression-Bébé"
-                ),
-            ],
-            label="Dépression de la mère",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            [
-                make_group("Coûts pour la mère", items_anxiete_mere, "Anxiété-Mère"),
-                html.Hr(),
-                make_group("Coûts pour le bébé", items_anxiete_bebe, "Anxiété-Bébé"),
-            ],
-            label="Anxiété de la mère",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            [
-                make_group("Coûts pour la mère", items_psychose_mere, "Psychose-Mère"),
-                html.Hr(),
-                make_group("Coûts pour le bébé", items_psychose_bebe, "Psychose-Bébé"),
-            ],
-            label="Psychose de la mère",
-            tab_style=eq_width,
-        ),
+        State("dd-scenarios", "value"),
+        State("permalien-applique", "data"),
+        State("hypotheses-chargees", "data"),
     ],
 )
+def upd_hypotheses(
+    search, val, n_charger, scenarios_choisis, permalien_applique, n_chargees
+):
+    """Nombre de naissances et salaire horaire du territoire choisi, toutes
+    les hypothèses du lien permanent à l'ouverture de la page, ou celles du
+    premier scénario sélectionné dans la bibliothèque
+
+    hypotheses-chargees est incrémenté à chaque fois : les tableaux de coûts
+    sont recalculés avec les nouveaux sliders"""
+
+    n_chargees = (n_chargees or 0) + 1
+
+    if "button-charger-scenario.n_clicks" in _declencheurs():
+        if not scenarios_choisis:
+            raise PreventUpdate
+        try:
+            _, X, naissances = bibliotheque.matrice(scenarios_choisis[:1])
+        except ErreurScenario:
+            raise PreventUpdate
+        return [int(naissances[0])] + X[0].tolist() + [dash.no_update, n_chargees]
+
+    # le lien n'est appliqué qu'une fois, quand dd-echelle a pris son
+    # territoire (search_echelle) : les changements suivants de territoire
+    # sont ceux de l'utilisateur
+    code = code_permalien(search)
+    if code is not None and code != permalien_applique:
+        try:
+            permalien = rendu_permalien(code)
+        except ErreurScenario:
+            permalien = None
+        if permalien is not None:
+            if permalien["territoire"] != val:
+                raise PreventUpdate
+            return [permalien["naissances"]] + permalien["sliders"] + [code, n_chargees]
+
+    if val is None:
+        raise PreventUpdate
+
+    territoire = recherche_territoires().get(val)
+    valeurs = [dash.no_update] * (3 + nb_variables_total)
+    valeurs[0] = int(territoire["Nombre de naissances (2018)"])
+    valeurs[1 + slot_salaire] = float(territoire["Salaire horaire des femmes"])
+    valeurs[-1] = n_chargees
+    return valeurs
+
+
+def colonnes_euros(df):
+    """Colonnes d'un tableau de coûts : la première telle quelle, les
+    suivantes en euros"""
+    return [df.iloc[:, 0].tolist()] + [
+        format_euros(df[c].values) for c in df.columns[1:]
+    ]
 
 
-lien_article_site = "http://alliance-psyperinat.org/2020/04/28/rapport-da-bauer-lse/"
-lien_nhs = (
-    "https://www.england.nhs.uk/2018/02/funding-boost-for-new-mums-mental-health/"
-)
-lien_nhs_2 = "https://www.england.nhs.uk/2016/02/fyfv-mh/"
-lien_nhs_3 = "https://www.england.nhs.uk/wp-content/uploads/2016/02/Mental-Health-Taskforce-FYFV-final.pdf"
-lien_govuk = (
-    "https://www.gov.uk/government/news/new-investment-in-mental-health-services"
-)
-
-
-pitch = get_pitch()
-
-mode_demploi_text = {
-    "mode_demploi_1": "Premièrement, il vous faudra choisir l’échelle à laquelle vous voulez évaluer le coût des maladies périnatales. Il est possible de choisir la France, l’une des 12 régions, l’un des 100 départements, l’une des 200 plus grandes villes ou l'une des 577 circonscriptions. Lorsque vous sélectionnez un territoire, le nombre de naissances en 2018 sur le territoire apparaît à droite. Vous pouvez toujours modifier directement ce chiffre à la main.",
-    "mode_demploi_2": "Vous pouvez alors cliquer sur Générer l'analyse, et voir les premiers résultats ! Une interface récapitulative des coûts à votre échelle et avec vos hypothèses apparaîtra : c’est le coût engendré par les maladies psychiques périnatales",
-    "mode_demploi_3": "Deuxièmement, si vous souhaitez aller plus loin dans l'estimation des coûts, vous pouvez ajuster les principales variables qui influent sur notre estimation. En effet, celle-ci est fondée sur des hypothèses (les plus crédibles selon nous), mais il vous est possible de les ajuster pour refléter au mieux vos convictions et vos questions. Par exemple, il est difficile de connaître précisément la prévalence de la dépression périnatale en France, mais les estimations communément admises sont de 10%. Libre à vous de modifier la valeur si vous pensez que cette estimation est différente de la votre.",
-    "mode_demploi_4": "Troisièmement, si vous souhaitez plonger en détail dans l’utilisation de l’outil, il est possible de modifier toutes les hypothèses initiales de l'article, mais celles-ci sont plus techniques. Par exemple, vous aurez la possibilité de modifier le coût d’une hospitalisation liée à une dépression, ou encore les coûts supplémentaires pour la santé, l'éducation voire la justice des troubles du comportement liés à l’anxiété périnatale.",
-    "mode_demploi_5": "Tout au long de votre parcours, n’hésitez pas à cliquer sur les petits points d’interrogation, ils vous donneront des informations supplémentaires.",
-}
-
-mode_demploi = html.Div(
+# le coût total, la carte mère / bébé et le camembert sont calculés dans le
+# navigateur (clientside.py) : le serveur ne construit que leur état initial
+@app.callback(
     [
-        html.Div(
-            html.Ul(
-                [
-                    html.Li(html.Span(parag), style={"margin": "0 0 0.7em 0"})
-                    for parag in mode_demploi_text.values()
-                ],
-                style={
-                    "list-style-position": "outside",
-                    "text-align": "justify",
-                    "font-size": "1.2em",
-                },
-            ),
-        ),
+        Output("table1", "children"),
+        Output("table2", "children"),
+    ],
+    [
+        Input("button-generate", "n_clicks"),
+        Input("button-adjust", "n_clicks"),
+        Input("hypotheses-chargees", "data"),
     ],
-    style={
-        "border": "1px solid black",
-        "padding": "1.5em 1.5em 1.5em 1.5em",
-        "border-radius": "3px",
-    },
+    [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
 )
+def compute_costs(n_generate, n_adjust, n_chargees, *sliders):
+    return tableaux_couts(sliders)
+
+
+def tableaux_couts(sliders):
+    """Tableaux des coûts par cas et par naissance, lus dans le cache de
+    résultats ou calculés puis mis en cache
+
+    Ils ne dépendent pas du nombre de naissances : seules les hypothèses
+    font partie de la clé du cache"""
+    with etape("compute_costs.cache_lecture"):
+        cle = cle_hypotheses(sliders, df_variables, "tableaux")
+        resultat = cache_resultats.get(cle)
+    if resultat is not None:
+        logger.debug("compute_costs : résultat en cache (%s)", cle)
+        return resultat
+
+    with etape("compute_costs.modele"):
+        df_par_cas, df_par_naissance, _, cout_par_naissance = compute_dataframes(
+            sliders, 1
+        )
+    logger.debug(
+        "compute_costs : coût par naissance %s, termes modifiés %s",
+        cout_par_naissance,
+        calcul_incremental.deltas,
+    )
 
+    with etape("compute_costs.format"):
+        colonnes_cas = colonnes_euros(df_par_cas)
+        colonnes_naissance = colonnes_euros(df_par_naissance)
+
+    with etape("compute_costs.tableaux"):
+        table_cas = generate_table(
+            dbc.Table,
+            ["Coût par cas"] + list(df_par_cas.columns[1:]),
+            colonnes_cas,
+            striped=True,
+            bordered=True,
+            hover=True,
+            italic_last=False,
+        )
 
-presentation_alliance_1 = "L’Alliance francophone pour la santé mentale périnatale ambitionne de regrouper le plus grand nombre d’associations nationales d’usager.e.s et de sociétés savantes pour plaider à tout moment et en tout lieu pour une authentique priorisation dans toutes les politiques publiques de la période périnatale, et plus particulièrement de sa dimension psychique. "
+        table_naissance = generate_table(
+            dbc.Table,
+            ["Coût par naissance"] + list(df_par_naissance.columns[1:]),
+            colonnes_naissance,
+            striped=True,
+            bordered=True,
+            hover=True,
+            italic_last=True,
+        )
 
-presentation_alliance_2 = "Elle n’est, à ce jour, ni une société scientifique de plus, ni une association, ni une fédération. "
+    resultat = [table_cas, table_naissance]
+    with etape("compute_costs.cache_ecriture"):
+        cache_resultats.set(cle, resultat)
+
+    return resultat
+
+
+# LIENS PERMANENTS
+def rendu_permalien(code):
+    """Hypothèses d'un lien permanent, mises en cache sous son code avec les
+    tableaux de coûts (tableaux_couts) : un lien ouvert par de nombreux
+    visiteurs n'est décodé et calculé qu'une fois. None si code vaut None,
+    ErreurScenario si le code est invalide"""
+
+    if code is None:
+        return None
+    cle = f"permalien:{code}"
+    with etape("permalien.cache_lecture"):
+        rendu = cache_resultats.get(cle)
+    if rendu is None:
+        sliders, territoire, naissances = decode_permalien(code)
+        naissances = int(naissances) if float(naissances).is_integer() else naissances
+        rendu = {
+            "territoire": territoire,
+            "naissances": naissances,
+            "sliders": sliders.tolist(),
+        }
+        tableaux_couts(rendu["sliders"])
+        cache_resultats.set(cle, rendu)
+    return rendu
 
-presentation_alliance_3 = "Les (futurs) bébés et les (futurs) parents méritent une attention soutenue, au-delà de leurs proches, de la part de toute la société, attention qui commence par celle de l’ensemble des professionnels actifs dans cette période. Rassemblant des personnes morales, elle est rendue possible par l’engagement citoyen de tout membre de ses associations et sociétés. "
 
-qui_sommes_nous = html.Div(
-    [
-        html.Div(
-            # "L'Alliance Francophone de Santé Mentale Périnatale est ",
-            [
-                html.Div(txt, style={"padding": "0 0 0.6em 0"})
-                for txt in [
-                    presentation_alliance_1,
-                    presentation_alliance_2,
-                    presentation_alliance_3,
-                ]
-            ],
-            style={"font-size": "1.2em", "text-align": "justify"},
-        )
-    ],
-    style={
-        "border": "1px solid black",
-        "padding": "1.5em 1.5em 1.5em 1.5em",
-        "border-radius": "3px",
-    },
-)
-
-telechargement_rapport = html.Div(
-    [
-        html.Div(
-            [
-                # html.Li(
-                #     "Test Téléchargement rapport FR"
-                # ),
-                html.Div(
-                    dbc.Button(
-                        "Rapport traduit en français",
-                        id="rapportbauer-fr-download",
-                        href="http://alliance-psyperinat.org/wp-content/uploads/2020/10/Article-Bauer-et-al-traduction-franc%CC%A7aise.pdf",
-                        target="_blank",
-                        color="secondary",
-                        outline=True,
-                        style={"display": "flex", "justify-content": "center"},
-                    )
-                ),
-                # html.Li(
-                #           "Test Téléchargement rapport EN"
-                #       ),
-                html.Hr(),
-                html.Div(
-                    dbc.Button(
-                        "Rapport original en anglais",
-                        id="rapportbauer-en-download",
-                        href="http://alliance-psyperinat.org/wp-content/uploads/2020/04/LSE-%C3%A9tude-de-co%C3%BBts-1.pdf",
-                        target="_blank",
-                        color="secondary",
-                        outline=True,
-                        style={"display": "flex", "justify-content": "center"},
-                    )
-                ),
-            ]
-        ),
-    ],
-    style={
-        "border": "1px solid black",
-        "padding": "1.5em 1.5em 1.5em 1.5em",
-        "border-radius": "3px",
-    },
+@app.callback(
+    Output("lien-permalien", "value"),
+    [Input("button-permalien", "n_clicks")],
+    [State("dd-echelle", "value"), State("nombre-naissances", "value")]
+    + [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
 )
-
-tabs_intro = dbc.Tabs(
+def cree_permalien(n, territoire, naissances, *sliders):
+    if not n:
+        raise PreventUpdate
+    try:
+        code = encode_permalien(sliders, territoire, naissances)
+        # pré-calcul : le premier visiteur trouve déjà le résultat en cache
+        rendu_permalien(code)
+    except ErreurScenario as e:
+        return f"Lien non créé : {e}"
+    return f"{flask.request.url_root}?{PARAMETRE}={code}"
+
+
+app.clientside_callback(
+    export_callback_resultats(),
     [
-        dbc.Tab(
-            pitch,
-            label="Raison d'être",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            mode_demploi,
-            label="Mode d'emploi",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            qui_sommes_nous,
-            label="Qui sommes-nous ?",
-            tab_style=eq_width,
-        ),
-        dbc.Tab(
-            telechargement_rapport,
-            label="Télécharger le rapport",
-            tab_style=eq_width,
-        ),
+        Output("total-couts", "children"),
+        Output("proportion-mere", "children"),
+        Output("proportion-bebe", "children"),
+        Output("example-graph-pie", "figure"),
     ],
+    [Input("nombre-naissances", "value")]
+    + [Input(f"slider-{i}", "value") for i in range(nb_variables_total)],
+    [State("example-graph-pie", "figure")],
 )
 
-tabs_intro_title = html.Div(
-    [html.H3("Introduction à l'outil", style={"color": "#8ec63f"}), tabs_intro]
+app.clientside_callback(
+    export_callback_elasticites(),
+    Output("table-elasticites", "data"),
+    [Input("nombre-naissances", "value")]
+    + [Input(f"slider-{i}", "value") for i in range(nb_variables_total)],
 )
 
 
-button_generate = dbc.Button(
-    "Générer l'analyse !",
-    color="primary",
-    block=True,
-    id="button-generate",
-    size="lg",
-)
+@server.route("/cache-stats")
+def cache_stats():
+    return flask.jsonify(cache_resultats.stats())
 
-button_adjust = dbc.Button(
-    "Ajuster l'analyse !",
-    color="primary",
-    block=True,
-    id="button-adjust",
-    size="lg",
-)
 
+def incertitude_par_naissance(sliders):
+    """Distribution du coût par naissance sur les tirages Monte Carlo, lue
+    dans le cache de résultats ou calculée puis mise en cache : les tirages
+    ne dépendent que des hypothèses, un changement du nombre de naissances
+    ne les refait pas"""
+    with etape("incertitude.cache_lecture"):
+        cle = cle_hypotheses(sliders, df_variables, "incertitude")
+        resultat = cache_resultats.get(cle)
+    if resultat is None:
+        with etape("incertitude.tirages"):
+            resultat = compute_incertitude(df_variables, sliders, 1)
+        with etape("incertitude.cache_ecriture"):
+            cache_resultats.set(cle, resultat)
+    return resultat
 
-logo_alliance = "http://alliancefrancophonepourlasantementaleperinatale.com/wp-content/uploads/2020/03/cropped-cropped-cropped-alliance-francaise-AFSMP-2-1-300x246.png"
 
-navbar = dbc.Navbar(
+@app.callback(
     [
-        html.A(
-            dbc.Row(
-                [
-                    dbc.Col(html.Img(src=logo_alliance, height="70px")),
-                    dbc.Col(dbc.NavbarBrand("Outil Psypérinathon")),
-                ],
-                align="center",
-                no_gutters=False,
-            ),
-            href="http://alliance-psyperinat.org/",
-            target="_blank",
-            style={"float": "left"},
-        ),
-        html.A(
-            "Alliance francophone pour la santé mentale périnatale",
-            href="http://alliance-psyperinat.org/",
-            target="_blank",
-            style={"margin-left": "auto", "margin-right": "0", "color": "black"},
-        ),
+        Output("collapse-incertitude", "is_open"),
+        Output("texte-incertitude", "children"),
+        Output("histogramme-incertitude", "figure"),
+    ],
+    [
+        Input("button-generate", "n_clicks"),
+        Input("button-adjust", "n_clicks"),
+        Input("nombre-naissances", "value"),
+        Input("switch-incertitude", "value"),
     ],
-    color="#1b75bc",
-    light=True,
-    sticky="top",
-    style={"width": "100%", "float": "left"},
+    [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
 )
+def compute_incertitude_costs(
+    n_generate, n_adjust, n_naissances, mode_incertitude, *sliders
+):
+    if not mode_incertitude:
+        return False, "", dash.no_update
 
+    if n_naissances is None:
+        n_naissances = 1
 
-global bdd_naissances
-bdd_naissances = pd.read_csv("resources/naissance_salaires_echelons.csv")
+    resultat = multiplie_naissances(incertitude_par_naissance(sliders), n_naissances)
 
-form_naissances = generate_form_naissances(bdd_naissances)
+    texte = [
+        html.Div(f"Médiane : {millify(resultat['mediane'])}"),
+        html.Div(
+            f"Intervalle 5 - 95 % : {millify(resultat['p5'])} - {millify(resultat['p95'])}",
+            style={"font-style": "italic"},
+        ),
+    ]
 
-title = html.H1(
-    "Estimer le coût des maladies psypérinatales",
-    style={"padding": "3em 0 0.5em 0", "text-align": "center", "color": "#1b75bc"},
-)
+    bornes = resultat["bornes"]
+    centres = (bornes[:-1] + bornes[1:]) / 2
+    # figure en dict : go.Figure valide chaque propriété, plus lent que le
+    # calcul lui-même quand les tirages sont en cache
+    histogramme = {
+        "data": [
+            {
+                "type": "bar",
+                "x": centres.tolist(),
+                "y": resultat["effectifs"].tolist(),
+                "width": float(bornes[1] - bornes[0]),
+                "marker": {"color": "#1b75bc"},
+                "customdata": [millify(c) for c in centres],
+                "hovertemplate": "Coût : %{customdata}<br>Tirages : %{y}<extra></extra>",
+            }
+        ],
+        "layout": {
+            "title": {"text": "<b>Distribution du coût total annuel</b>"},
+            "height": 350,
+            "bargap": 0,
+            "yaxis": {"title": {"text": "Nombre de tirages"}},
+            "shapes": [
+                {
+                    "type": "line",
+                    "x0": float(x),
+                    "x1": float(x),
+                    "yref": "paper",
+                    "y0": 0,
+                    "y1": 1,
+                    "line": {"color": couleur, "dash": "dash"},
+                }
+                for x, couleur in [
+                    (resultat["p5"], "#f7a5ab"),
+                    (resultat["mediane"], "#d91b5c"),
+                    (resultat["p95"], "#f7a5ab"),
+                ]
+            ],
+        },
+    }
 
-tabs_and_title_variables = html.Div(
-    [
-        html.H2(
-            "Deuxième étape : ajustement des variables principales",
-            style={"color": "#8ec63f"},
-        ),
-        tabs_variables,
-    ],
-    style={"padding": "0.5em 0 0.5em 0"},
-)
+    return True, texte, histogramme
 
-tabs_and_title_maladies = html.Div(
-    [
-        html.H2(
-            "Troisième étape : pour aller plus loin...", style={"color": "#8ec63f"}
-        ),
-        tabs_maladies,
-    ],
-    style={"padding": "0.5em 0 0.5em 0"},
-)
 
-pp_tableaux = dbc.Popover(
-    [
-        dbc.PopoverHeader("Coût par cas / coût par naissance"),
-        dbc.PopoverBody(
-            [
-                html.Span("Le "),
-                html.Span("coût par cas", style={"font-weight": "bold"}),
-                html.Span(
-                    " désigne l’ensemble des coûts inhérents à l’occurence chez une mère d’une des trois maladies. "
-                ),
-                html.Br(),
-                html.Span("Le "),
-                html.Span("coût par naissance", style={"font-weight": "bold"}),
-                html.Span(
-                    " désigne le coût total rapporté au nombre de naissances, c’est-à-dire combien coûte "
-                ),
-                html.Span("en moyenne", style={"font-style": "italic"}),
-                html.Span(" les maladies. "),
-            ]
-        ),
-    ],
-    id=f"popover-cout-cas",
-    target=f"badge-cout-cas",
-    is_open=False,
+@app.callback(
+    Output("collapse-sensibilite", "is_open"),
+    [Input("button-sensibilite", "n_clicks")],
+    [State("collapse-sensibilite", "is_open")],
 )
+def toggle_sensibilite(n, is_open):
+    if n:
+        return not is_open
+    return is_open
 
-question_mark_tableaux = dbc.Badge("?", pill=True, color="light", id="badge-cout-cas")
 
-graphiques = dbc.Row(
+@app.callback(
     [
-        dbc.Col(
-            [
-                html.H4(
-                    f"A l'échelle de ce territoire, les coûts associés aux problèmes de santé mentale périnatale représentent chaque année :",
-                    style={"text-align": "center"},
-                ),
-                html.H1(id="total-couts", style={"text-align": "center"}),
-            ],
-            style={"border": "0px solid black", "padding": "10% 2% 0 0"},
-        ),
-        dbc.Col(
-            [html.Div(id="draw1")],
-            style={"border": "0px solid black", "padding": "5% 0 0 2%"},
-        ),
-        dbc.Col(
-            [dcc.Graph(id="example-graph-pie")],
-            style={"border": "0px solid black", "padding": "5% 0 0 0"},
-        ),
+        Output("graph-sensibilite", "figure"),
+        Output("graph-sensibilite-categorie", "figure"),
     ],
-)
-
-charts_coll = dbc.Collapse(
     [
-        html.H3("Principaux enseignements", style={"color": "#8ec63f"}),
-        graphiques,
-        html.H3(
-            ["Tableaux récapitulatifs  ", question_mark_tableaux],
-            style={"color": "#8ec63f"},
-        ),
-        dbc.Row([dbc.Col([html.Div(id="table1")]), dbc.Col([html.Div(id="table2")])]),
-        html.Hr(),
-        tabs_and_title_variables,
-        html.Hr(),
-        tabs_and_title_maladies,
-        html.Hr(),
-        button_adjust,
-        html.Hr(),
+        Input("collapse-sensibilite", "is_open"),
+        Input("button-generate", "n_clicks"),
+        Input("button-adjust", "n_clicks"),
     ],
-    id="collapsed-graphs",
+    [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
 )
+def compute_sensibilite(is_open, n_generate, n_adjust, *sliders):
+    if not is_open:
+        return dash.no_update, dash.no_update
+
+    with etape("sensibilite.bauer_hamby"):
+        bauer_hamby = compute_bauer_hamby(df_variables, sliders)
+        par_categorie = bauer_hamby_par_categorie(bauer_hamby)
+
+    tornade = go.Figure(
+        go.Bar(
+            y=bauer_hamby.index,
+            base=bauer_hamby["Coût min"],
+            x=bauer_hamby["Coût max"] - bauer_hamby["Coût min"],
+            orientation="h",
+            marker_color="#1b75bc",
+            customdata=bauer_hamby["Indice de Bauer-Hamby"].round(3),
+            hovertemplate="<b>%{y}</b><br>Coût par naissance : %{base:,.0f} € - %{x:,.0f} €"
+            "<br>Indice de Bauer-Hamby : %{customdata}<extra></extra>",
+        )
+    )
+    tornade.update_layout(
+        title="<b>Coût par naissance selon chaque hypothèse</b>",
+        height=1400,
+        xaxis_title="Coût par naissance (€)",
+        yaxis=dict(automargin=True, tickfont=dict(size=10)),
+    )
 
+    categories = go.Figure(
+        go.Bar(
+            y=par_categorie.index,
+            x=par_categorie["Indice de Bauer-Hamby"],
+            orientation="h",
+            marker_color="#8ec63f",
+        )
+    )
+    categories.update_layout(
+        title="<b>Indice moyen par catégorie</b>",
+        height=400,
+        xaxis=dict(range=[0, 1]),
+    )
 
-app.layout = html.Div(
-    [
-        navbar,
-        dbc.Container(
-            [
-                title,
-                html.Hr(),
-                tabs_intro_title,
-                # pitch,
-                html.Hr(),
-                # mode_demploi,
-                html.Hr(),
-                form_naissances,
-                html.Hr(),
-                button_generate,
-                html.Hr(),
-                charts_coll,
-                html.Hr(),
-            ]
-            + generate_popovers()
-            + [pp_tableaux],
-            id="main-container",
-        ),
-    ]
-)
-
+    return tornade, categories
 
-@app.callback(Output("nombre-naissances", "value"), [Input("dd-echelle", "value")])
-def upd_input_echelle(val):
-    return int(val)
 
+@app.callback(
+    Output("graph-sobol", "figure"),
+    [Input("collapse-sensibilite", "is_open")],
+)
+def compute_sensibilite_globale(is_open):
+    if not is_open:
+        return dash.no_update
+
+    with etape("sensibilite.sobol"):
+        sobol = compute_sobol(df_variables)
+
+    figure = go.Figure(
+        [
+            go.Bar(
+                y=sobol.index,
+                x=sobol[indice],
+                name=indice,
+                orientation="h",
+                marker_color=couleur,
+            )
+            for indice, couleur in [
+                ("Indice de Sobol (1er ordre)", "#8ec63f"),
+                ("Indice de Sobol total", "#1b75bc"),
+            ]
+        ]
+    )
+    figure.update_layout(
+        title="<b>Indices de Sobol sur les intervalles des hypothèses</b>",
+        height=1400,
+        barmode="group",
+        yaxis=dict(automargin=True, tickfont=dict(size=10)),
+        legend=dict(orientation="h", y=1.02, yanchor="bottom"),
+    )
 
-@app.callback(Output("slider-41", "value"), [Input("dd-echelle", "value")])
-def upd_input_echelle(val):
-    upd_salaire_horaire = bdd_naissances[
-        bdd_naissances["Nombre de naissances (2018)"] == val
-    ].values[0][-1]
-    print("vall", upd_salaire_horaire)
-    return float(upd_salaire_horaire)
+    return figure
 
 
 @app.callback(
+    Output("table-territoires", "data"),
     [
-        Output("table1", "children"),
-        Output("table2", "children"),
-        Output("draw1", "children"),
-        Output("total-couts", "children"),
-        Output("example-graph-pie", "figure"),
-    ],
-    [
+        Input("dd-classement-echelon", "value"),
+        Input("dd-classement-colonne", "value"),
+        Input("classement-n", "value"),
         Input("button-generate", "n_clicks"),
         Input("button-adjust", "n_clicks"),
-        Input("nombre-naissances", "value"),
     ],
     [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
 )
-def compute_costs(n_generate, n_adjust, n_naissances, *sliders):
-    df_variables_upd = df_variables.copy()
-    df_variables_upd["upd_variables"] = sliders
-
-    df_par_cas, df_repartition = process_values(df_variables_upd)
-    df_par_cas = df_par_cas.reset_index()
-    print(df_par_cas)
-
-    prevalences = (
-        df_variables_upd.set_index("nom_variable")
-        .loc[
-            [
-                "Prévalence de " + mal
-                for mal in ["la dépression", "l'anxiété", "la psychose"]
-            ]
-        ]
-        .iloc[:, -1]
-        .values
-        / 100
+def compute_classement_territoires(echelon, colonne, n, n_generate, n_adjust, *sliders):
+    with etape("classement.top"):
+        top = index_territoires(sliders).top(n or 20, colonne, echelon)
+
+    return donnees_datatable(
+        {
+            "nom": top["Nom de l'échelon"].tolist(),
+            "naissances": top["Nombre de naissances (2018)"].astype(int).tolist(),
+            "total": [millify(x) for x in top["Coût total"].tolist()],
+            "par_naissance": format_euros(top["Coût par naissance"].values),
+            "mere": [millify(x) for x in top["Mère"].tolist()],
+            "bebe": [millify(x) for x in top["Bébé"].tolist()],
+        }
     )
 
-    df_par_naissance = df_par_cas.copy()
-    df_par_naissance.iloc[:, 1:] = df_par_naissance.iloc[:, 1:].mul(prevalences, axis=0)
 
-    # for df in [df_par_naissance]:
-    df_par_naissance.loc["3 maladies"] = ["Total des trois maladies"] + np.sum(
-        df_par_naissance.values[:, 1:], axis=0
-    ).tolist()
+# BIBLIOTHEQUE DE SCENARIOS
+def _option_scenario(scenario):
+    label = scenario["nom"]
+    if scenario["proprietaire"]:
+        label += f" ({scenario['proprietaire']})"
+    return {"label": label, "value": scenario["id"]}
 
-    total_par_cas = df_par_naissance["Total"].iloc[:-1].sum()
 
-    print(f"Nombre naissances = {n_naissances}\n")
-    if n_naissances is None:
-        n_naissances = 1  # set 1 as default to avoid problems if values is not defined
+@app.callback(
+    Output("dd-scenarios", "options"),
+    [
+        Input("dd-scenarios", "search_value"),
+        Input("message-scenario", "children"),
+    ],
+    [State("dd-scenarios", "value")],
+)
+def search_scenarios(search_value, message, choisis):
+    scenarios = bibliotheque.cherche(nom=search_value or None)
+    # les scénarios sélectionnés doivent rester dans les options
+    trouves = {scenario["id"] for scenario in scenarios}
+    for identifiant in choisis or []:
+        if identifiant not in trouves:
+            try:
+                scenarios.append(bibliotheque.get(identifiant))
+            except KeyError:
+                pass
+    return [_option_scenario(scenario) for scenario in scenarios]
 
-    cout_total = total_par_cas * n_naissances
-    cout_total_str = millify(cout_total)
-    print(cout_total_str)
 
-    df_repartition["couts_totaux"] = (
-        df_repartition["Répartition des coûts par secteur"] * cout_total
-    )
-    df_repartition["couts_lisibles"] = df_repartition["couts_totaux"].apply(millify)
-
-    pie_maladies = px.pie(
-        df_repartition,
-        values="couts_totaux",
-        names=df_repartition.index,
-        title="<b>Répartition des coûts par secteur</b>",
-        width=350,
-        height=350,
-        color="couts_totaux",
-        color_discrete_sequence=["#d91b5c", "#f7a5ab", "#8ec63f"],
-    )
-
-    pie_maladies.update_traces(
-        textposition="auto",
-        textinfo="label+percent",
-        insidetextorientation="horizontal",
-        sort=False,
-        customdata=df_repartition["couts_lisibles"],
-        hovertemplate="<b>%{label}</b><br>Coût : %{customdata[0]}",
-    )
-    pie_maladies.update_layout(showlegend=False)
+@app.callback(
+    Output("message-scenario", "children"),
+    [Input("button-enregistrer-scenario", "n_clicks")],
+    [
+        State("nom-scenario", "value"),
+        State("proprietaire-scenario", "value"),
+        State("dd-echelle", "value"),
+        State("nombre-naissances", "value"),
+    ]
+    + [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
+)
+def enregistre_scenario(n, nom, proprietaire, territoire, naissances, *sliders):
+    if not n:
+        raise PreventUpdate
+    try:
+        bibliotheque.enregistre(nom, sliders, territoire, naissances, proprietaire)
+    except ErreurScenario as e:
+        return f"Scénario non enregistré : {e}"
+    return f"Scénario « {nom} » enregistré."
 
-    card_repartition = make_card_repartition(df_par_naissance)
 
-    def formating(x):
-        return "{:,} €".format(x).replace(",", " ")
+def _millify_signe(x):
+    return ("+" if x > 0 else "") + millify(x)
 
-    for df in [df_par_cas, df_par_naissance]:  # formatte les 2 tableaux en euros
-        for c in df.columns:
-            if df[c].dtype != "object":
-                df[c] = df[c].astype(int).apply(formating)
 
-    df_par_cas.columns = [
-        c if i > 0 else "Coût par cas" for i, c in enumerate(df_par_cas.columns)
+@app.callback(
+    [Output("table-comparaison", "columns"), Output("table-comparaison", "data")],
+    [Input("button-comparer-scenarios", "n_clicks")],
+    [State("dd-scenarios", "value")],
+)
+def compare_scenarios(n, choisis):
+    if not n or not choisis:
+        raise PreventUpdate
+    with etape("compare_scenarios"):
+        try:
+            tableau = bibliotheque.compare(choisis)
+        except ErreurScenario:
+            raise PreventUpdate
+
+    # une colonne par scénario, puis les écarts au premier
+    colonnes = [{"name": "", "id": "ligne"}] + [
+        {"name": nom, "id": f"c{j}"} for j, nom in enumerate(tableau.columns)
     ]
-    df_par_naissance.columns = [
-        c if i > 0 else "Coût par naissance"
-        for i, c in enumerate(df_par_naissance.columns)
+    donnees = {
+        "ligne": [
+            " ".join(ligne.replace("<br>", " ").split()) for ligne in tableau.index
+        ]
+    }
+    for j, nom in enumerate(tableau.columns):
+        format_cout = millify if j < len(choisis) else _millify_signe
+        donnees[f"c{j}"] = [format_cout(x) for x in tableau[nom].tolist()]
+    return colonnes, donnees_datatable(donnees)
+
+
+# PREVENTION
+@app.callback(
+    Output("table-interventions", "data"),
+    [Input("button-ajout-intervention", "n_clicks")],
+    [State("table-interventions", "data")],
+)
+def ajoute_intervention(n, lignes):
+    if not n:
+        raise PreventUpdate
+    # même intervention que la dernière ligne : un effet de plus
+    derniere = lignes[-1] if lignes else {}
+    return lignes + [
+        {
+            "intervention": derniere.get("intervention"),
+            "cout_par_naissance": derniere.get("cout_par_naissance"),
+            "variable": None,
+            "effet": None,
+        }
     ]
 
-    table_cas = generate_table_from_df(
-        dbc.Table,
-        df_par_cas,
-        striped=True,
-        bordered=True,
-        hover=True,
-        italic_last=False,
-    )
 
-    table_naissance = generate_table_from_df(
-        dbc.Table,
-        df_par_naissance,
-        striped=True,
-        bordered=True,
-        hover=True,
-        italic_last=True,
-    )
+@app.callback(
+    [
+        Output("graph-frontiere", "figure"),
+        Output("texte-prevention", "children"),
+        Output("table-allocation", "data"),
+    ],
+    [Input("button-prevention", "n_clicks")],
+    [
+        State("table-interventions", "data"),
+        State("budget-prevention", "value"),
+        State("nombre-naissances", "value"),
+    ]
+    + [State(f"slider-{i}", "value") for i in range(nb_variables_total)],
+)
+def compute_prevention(n, lignes, budget, n_naissances, *sliders):
+    if not n:
+        raise PreventUpdate
+    if n_naissances is None:
+        n_naissances = 1
+
+    with etape("prevention.optimisation"):
+        try:
+            resultat = optimise(
+                sliders, n_naissances, interventions_depuis_lignes(lignes), budget
+            )
+        except ErreurScenario as e:
+            return dash.no_update, f"Optimisation impossible : {e}", []
+
+    optimum = resultat["optimum"]
+    depense = resultat["depense"][optimum]
+    cout_evite = resultat["cout_evite"][optimum]
+
+    if resultat["net"][optimum] <= 0:
+        texte = "Aucune allocation n'évite plus de coûts qu'elle n'en coûte."
+    else:
+        texte = (
+            f"La meilleure allocation dépense {millify(depense)} par an "
+            f"et évite {millify(cout_evite)} de coûts, soit un gain "
+            f"net de {millify(resultat['net'][optimum])} "
+            f"({100 * cout_evite / resultat['cout_reference']:.1f} % "
+            "du coût total)."
+        )
 
-    return table_cas, table_naissance, card_repartition, cout_total_str, pie_maladies
+    allocation = resultat["couvertures"][optimum]
+    return (
+        make_frontiere(resultat, budget),
+        texte,
+        donnees_datatable(
+            {
+                "intervention": resultat["interventions"],
+                "couverture": [f"{100 * c:.0f} %" for c in allocation.tolist()],
+                "depense": [
+                    millify(x)
+                    for x in (
+                        allocation * resultat["couts_par_naissance"] * n_naissances
+                    ).tolist()
+                ],
+            }
+        ),
+    )
 
 
 # CALLBACK GRAPHS
 @app.callback(
     Output("collapsed-graphs", "is_open"),
-    [Input("button-generate", "n_clicks"), Input("button-adjust", "n_clicks")],
+    [
+        Input("button-generate", "n_clicks"),
+        Input("button-adjust", "n_clicks"),
+        Input("url", "search"),
+    ],
     [State("collapsed-graphs", "is_open")],
 )
-def toggle_collapse(n_generate, n_adjust, is_open):
-    if n_generate or n_adjust:
+def toggle_collapse(n_generate, n_adjust, search, is_open):
+    # un lien permanent ouvre directement les résultats
+    if n_generate or n_adjust or code_permalien(search) is not None:
         return True
     return is_open
 
 
+# un seul callback par type de composant, quel que soit le nombre de
+# variables de bdd_variables.csv
+@app.callback(
+    Output({"type": "collapsible", "index": MATCH}, "is_open"),
+    [Input({"type": "open-tab", "index": MATCH}, "n_clicks")],
+    [State({"type": "collapsible", "index": MATCH}, "is_open")],
+)
 def toggle_collapse_maladies(n, is_open):
     if n:
         return not is_open
     return is_open
 
 
-for item_maladie in [
-    "Dépression-Mère",
-    "Dépression-Bébé",
-    "Anxiété-Mère",
-    "Anxiété-Bébé",
-    "Psychose-Mère",
-    "Psychose-Bébé",
-]:
-    app.callback(
-        Output(f"collapsible-{item_maladie}", "is_open"),
-        [Input(f"open-tab-{item_maladie}", "n_clicks")],
-        [State(f"collapsible-{item_maladie}", "is_open")],
-    )(toggle_collapse_maladies)
-
 # CALLBACK POPOVERS
+@app.callback(
+    Output({"type": "popover", "index": MATCH}, "is_open"),
+    [Input({"type": "badge", "index": MATCH}, "n_clicks")],
+    [State({"type": "popover", "index": MATCH}, "is_open")],
+)
 def toggle_popover(n, is_open):
     if n:
         return not is_open
     return is_open
 
 
-for i in list(range(nb_variables_total)) + ["cout-cas"]:
-    app.callback(
-        Output(f"popover-{i}", "is_open"),
-        [Input(f"badge-{i}", "n_clicks")],
-        [State(f"popover-{i}", "is_open")],
-    )(toggle_popover)
-
-
 if __name__ == "__main__":
     app.run_server(
         debug=False,
@@ -0,0 +1,547 @@
+"""Benchmarks des chemins critiques de l'app, comparés à une référence
+
+    python benchmark.py                 # compare à resources/benchmark_reference.json
+    python benchmark.py --enregistre    # met à jour la référence
+    python benchmark.py --seuil 0.3 modele  # seuil de régression, filtre par nom
+
+Chaque benchmark est répété et on garde la médiane du temps par appel. Un
+benchmark est en régression s'il est plus lent que la référence de plus de
+seuil (20 % par défaut) ; le script sort alors avec le code 1. Les temps
+dépendent de la machine : la référence doit être enregistrée sur la machine
+qui compare."""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+
+REFERENCE = "resources/benchmark_reference.json"
+SEUIL = 0.20
+REPETITIONS = 5
+DUREE_MIN = 0.2
+
+# nom -> fonction qui prépare le benchmark et renvoie (appel, nb_elements)
+benchmarks = {}
+
+
+def benchmark(nom):
+    def enregistre(preparation):
+        benchmarks[nom] = preparation
+        return preparation
+
+    return enregistre
+
+
+# caches, bibliothèques et snapshots jetables, supprimés à la sortie du script
+_repertoire_temporaire = tempfile.TemporaryDirectory(prefix="benchmark_")
+_numeros_temporaires = itertools.count()
+
+
+def _fichier_temporaire(suffixe):
+    return os.path.join(
+        _repertoire_temporaire.name, f"{next(_numeros_temporaires)}{suffixe}"
+    )
+
+
+def _import_app():
+    # l'app écrit dans un cache jetable et ses sorties ne polluent pas le rapport
+    os.environ.setdefault("PSYPERINATHON_CACHE", _fichier_temporaire(".sqlite"))
+    os.environ.setdefault("PSYPERINATHON_SCENARIOS", _fichier_temporaire(".sqlite"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    return app
+
+
+# MODELE
+@benchmark("modele.process_values")
+def _process_values():
+    import pandas as pd
+    from model import process_values
+
+    df_variables = pd.read_csv("resources/bdd_variables.csv")
+    return lambda: process_values(df_variables), 1
+
+
+@benchmark("modele.process_values_sensi")
+def _process_values_sensi():
+    import pandas as pd
+    from model import process_values_sensi
+
+    df_variables = pd.read_csv("resources/bdd_variables.csv")
+    return lambda: process_values_sensi(df_variables), 1
+
+
+@benchmark("modele.process_values_batch")
+def _process_values_batch():
+    import numpy as np
+    from model import parametres, process_values_batch
+
+    X = np.random.default_rng(0).uniform(
+        parametres.mini, parametres.maxi, size=(100000, len(parametres))
+    )
+    return lambda: process_values_batch(X), len(X)
+
+
+@benchmark("modele.incremental_un_slider")
+def _incremental():
+    """Un slider modifié à chaque appel, les autres termes sont réutilisés"""
+    import numpy as np
+    from graphe import CalculIncremental
+    from model import parametres
+
+    calcul = CalculIncremental()
+    v = parametres.vecteur()
+    calcul.calcule(v)
+    slot = parametres.slots["Valeur d'une année de QALY"]
+    valeurs = itertools.cycle(
+        np.linspace(parametres.mini[slot], parametres.maxi[slot], 97).tolist()
+    )
+
+    def appel():
+        v[slot] = next(valeurs)
+        calcul.calcule(v)
+
+    return appel, 1
+
+
+@benchmark("modele.balayage")
+def _balayage():
+    """Un facteur à la fois : 1000 valeurs d'une hypothèse"""
+    import numpy as np
+    from graphe import CalculIncremental
+    from model import parametres
+
+    calcul = CalculIncremental()
+    slot = parametres.slots["Valeur d'une année de QALY"]
+    valeurs = np.linspace(parametres.mini[slot], parametres.maxi[slot], 1000)
+    v = parametres.vecteur()
+    return lambda: calcul.balayage(v, slot, valeurs), len(valeurs)
+
+
+@benchmark("modele.gradients")
+def _gradients():
+    """Gradients du total, des 3 maladies et des 3 secteurs"""
+    from elasticites import gradient_modele
+    from model import parametres
+
+    v = parametres.vecteur()
+    return lambda: gradient_modele().calcule(v), 1
+
+
+# CALLBACKS
+@benchmark("callback.compute_costs")
+def _compute_costs():
+    from cache import SUBDIVISIONS_PAS
+    from territoires import slot_salaire
+
+    app = _import_app()
+    sliders = list(app.df_variables["val"])
+    # un salaire différent d'une subdivision de pas à chaque appel : la clé
+    # du cache change, le cache ne sert pas
+    pas = app.df_variables["step"].values[slot_salaire] / SUBDIVISIONS_PAS
+    numeros = itertools.count(1)
+    compute_costs = app.compute_costs.__wrapped__
+
+    def appel():
+        sliders[slot_salaire] = app.df_variables["val"][slot_salaire]
+        sliders[slot_salaire] += next(numeros) * pas
+        return compute_costs(1, None, None, *sliders)
+
+    return appel, 1
+
+
+@benchmark("callback.compute_dataframes")
+def _compute_dataframes():
+    app = _import_app()
+    sliders = list(app.df_variables["val"])
+    return lambda: app.compute_dataframes(sliders, 756662), 1
+
+
+@benchmark("callback.generate_table_from_df")
+def _generate_table_from_df():
+    import dash_bootstrap_components as dbc
+    from table_mod import generate_table_from_df
+
+    app = _import_app()
+    _, df_par_naissance, _, _ = app.compute_dataframes(
+        list(app.df_variables["val"]), 756662
+    )
+    return (
+        lambda: generate_table_from_df(
+            dbc.Table, df_par_naissance, striped=True, bordered=True, hover=True
+        ),
+        1,
+    )
+
+
+@benchmark("callback.classement_territoires")
+def _classement_territoires():
+    """Classement de tous les territoires (table-territoires)"""
+    app = _import_app()
+    sliders = list(app.df_variables["val"])
+    classement = app.compute_classement_territoires.__wrapped__
+    n = len(app.recherche_territoires().bdd_naissances)
+    return lambda: classement(None, "Coût total", n, 1, None, *sliders), n
+
+
+@benchmark("callback.make_pie")
+def _make_pie():
+    from utils import make_pie
+
+    _import_app()
+    import layout
+
+    return lambda: make_pie(layout.df_repartition_initial), 1
+
+
+def _requetes_permalien(app, search, sliders):
+    """Requêtes Dash d'un visiteur qui ouvre un lien permanent : hypothèses
+    du lien, puis tableaux de coûts"""
+    hypotheses = {
+        "output": ".."
+        + "...".join(
+            ["nombre-naissances.value"]
+            + [f"slider-{i}.value" for i in range(len(sliders))]
+            + ["permalien-applique.data", "hypotheses-chargees.data"]
+        )
+        + "..",
+        "inputs": [
+            {"id": "url", "property": "search", "value": search},
+            {"id": "dd-echelle", "property": "value", "value": 75},
+            {"id": "button-charger-scenario", "property": "n_clicks"},
+        ],
+        "changedPropIds": ["url.search"],
+        "state": [
+            {"id": "dd-scenarios", "property": "value"},
+            {"id": "permalien-applique", "property": "data"},
+            {"id": "hypotheses-chargees", "property": "data"},
+        ],
+    }
+    tableaux = {
+        "output": "..table1.children...table2.children..",
+        "inputs": [
+            {"id": "button-generate", "property": "n_clicks"},
+            {"id": "button-adjust", "property": "n_clicks"},
+            {"id": "hypotheses-chargees", "property": "data", "value": 1},
+        ],
+        "changedPropIds": ["hypotheses-chargees.data"],
+        "state": [
+            {"id": f"slider-{i}", "property": "value", "value": v}
+            for i, v in enumerate(sliders)
+        ],
+    }
+    client = app.server.test_client()
+
+    def appel():
+        for payload in [hypotheses, tableaux]:
+            reponse = client.post("/_dash-update-component", json=payload)
+            assert reponse.status_code == 200
+
+    return appel
+
+
+@benchmark("callback.permalien")
+def _permalien():
+    """Ouverture d'un lien permanent déjà en cache (2 requêtes Dash)"""
+    from permaliens import encode_permalien
+
+    app = _import_app()
+    sliders = list(app.df_variables["val"])
+    sliders[3] = 1.5
+    code = encode_permalien(sliders, 75, 5000)
+    app.rendu_permalien(code)
+    return _requetes_permalien(app, f"?s={code}", sliders), 1
+
+
+@benchmark("callback.permalien_nouveau")
+def _permalien_nouveau():
+    """Idem pour un lien jamais ouvert : décodage et calcul des tableaux"""
+    from permaliens import encode_permalien
+
+    from cache import SUBDIVISIONS_PAS
+
+    app = _import_app()
+    sliders = list(app.df_variables["val"])
+    # une hypothèse différente d'une subdivision de pas à chaque lien : ni le
+    # lien ni ses tableaux ne sont en cache
+    pas = app.df_variables["step"].values[3] / SUBDIVISIONS_PAS
+    numeros = itertools.count(1)
+
+    def appel():
+        sliders[3] = app.df_variables["val"][3] + next(numeros) * pas
+        code = encode_permalien(sliders, 75, 5000)
+        _requetes_permalien(app, f"?s={code}", sliders)()
+
+    return appel, 1
+
+
+@benchmark("callback.prevention")
+def _prevention_callback():
+    """Optimisation du budget de prévention et frontière efficace"""
+    from prevention import lignes_interventions
+
+    app = _import_app()
+    sliders = list(app.df_variables["val"])
+    lignes = lignes_interventions()
+    compute_prevention = app.compute_prevention.__wrapped__
+    return lambda: compute_prevention(1, lignes, 200000, 4342, *sliders), 1
+
+
+# PREVENTION
+@benchmark("prevention.optimise")
+def _prevention():
+    """Grille des allocations des interventions de resources/interventions.csv"""
+    from prevention import charge_interventions, grille_allocations, optimise
+    from model import parametres
+
+    interventions = charge_interventions()
+    v = parametres.vecteur()
+    nb_allocations = len(grille_allocations(len(interventions)))
+    return lambda: optimise(v, 4342, interventions, 200000), nb_allocations
+
+
+# BIBLIOTHEQUE DE SCENARIOS
+def _bibliotheque(nb_scenarios):
+    import numpy as np
+    from bibliotheque import BibliothequeScenarios
+    from model import parametres
+
+    bibliotheque = BibliothequeScenarios(_fichier_temporaire(".sqlite"))
+    rng = np.random.default_rng(0)
+    X = rng.uniform(parametres.mini, parametres.maxi, (nb_scenarios, len(parametres)))
+    ids = [
+        bibliotheque.enregistre(f"scénario {k}", x, territoire=k % 100)
+        for k, x in enumerate(X)
+    ]
+    return bibliotheque, ids
+
+
+@benchmark("bibliotheque.compare")
+def _bibliotheque_compare():
+    """Comparaison de 200 scénarios enregistrés (lecture et évaluation)"""
+    bibliotheque, ids = _bibliotheque(200)
+    return lambda: bibliotheque.compare(ids), len(ids)
+
+
+@benchmark("bibliotheque.cherche")
+def _bibliotheque_cherche():
+    """Recherche par préfixe de nom parmi 5000 scénarios (dd-scenarios)"""
+    bibliotheque, _ = _bibliotheque(5000)
+    return lambda: bibliotheque.cherche(nom="Scénario 12"), 1
+
+
+# LAYOUT
+@benchmark("layout.generate_item_make_group")
+def _layout_variables():
+    from utils import df_variables, generate_item, make_group
+
+    categories = list(df_variables["category"].unique())
+    return (
+        lambda: [make_group(c, generate_item(df_variables, c), c) for c in categories],
+        len(categories),
+    )
+
+
+@benchmark("layout.generate_popovers")
+def _layout_popovers():
+    from utils import generate_popovers
+
+    return generate_popovers, 1
+
+
+@benchmark("layout.serialisation")
+def _layout_serialisation():
+    import plotly
+
+    _import_app()
+    import layout
+
+    return (
+        lambda: json.dumps(layout.layout, cls=plotly.utils.PlotlyJSONEncoder),
+        1,
+    )
+
+
+# SENSIBILITE
+@benchmark("sensibilite.bauer_hamby")
+def _bauer_hamby():
+    import sensibilite
+
+    app = _import_app()
+    valeurs = list(app.df_variables["val"])
+
+    def appel():
+        sensibilite._bauer_hamby.cache_clear()
+        sensibilite.compute_bauer_hamby(app.df_variables, valeurs)
+
+    return appel, len(valeurs) * sensibilite.N_POINTS
+
+
+# DEMARRAGE
+@benchmark("demarrage.import_app")
+def _import_app_froid():
+    """Import de app dans un nouveau processus (hors démarrage de Python)"""
+    code = (
+        "import contextlib, io, time\n"
+        "debut = time.perf_counter()\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    import app\n"
+        "print(time.perf_counter() - debut)\n"
+    )
+
+    def appel():
+        sortie = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        return float(sortie.stdout.split()[-1])
+
+    # le temps mesuré est celui de l'import, pas celui du sous-processus
+    appel.mesure_interne = True
+    return appel, 1
+
+
+_CODE_PREMIERE_REPONSE = """
+import contextlib, io, time
+debut = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+client = app.server.test_client()
+for url in ["/", "/_dash-layout", "/_dash-dependencies"]:
+    assert client.get(url).status_code == 200
+print(time.perf_counter() - debut)
+"""
+
+
+def _premiere_reponse(env):
+    def appel():
+        sortie = subprocess.run(
+            [sys.executable, "-c", _CODE_PREMIERE_REPONSE],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, **env},
+        )
+        return float(sortie.stdout.split()[-1])
+
+    appel.mesure_interne = True
+    return appel, 1
+
+
+@benchmark("demarrage.premiere_reponse")
+def _premiere_reponse_sans_snapshot():
+    """Import de app puis page, layout et dépendances servis"""
+    return _premiere_reponse({})
+
+
+@benchmark("demarrage.premiere_reponse_snapshot")
+def _premiere_reponse_snapshot():
+    """Idem avec un snapshot du layout (PSYPERINATHON_LAYOUT) déjà écrit"""
+    chemin = _fichier_temporaire(".json")
+    appel, nb_elements = _premiere_reponse({"PSYPERINATHON_LAYOUT": chemin})
+    appel()
+    return appel, nb_elements
+
+
+def mesure(appel, repetitions=REPETITIONS, duree_min=DUREE_MIN):
+    """Médiane du temps par appel sur repetitions séries d'au moins duree_min
+    secondes"""
+
+    if getattr(appel, "mesure_interne", False):
+        return statistics.median(appel() for _ in range(repetitions))
+
+    timer = timeit.Timer(appel)
+    nombre, duree = timer.autorange()
+    nombre = max(1, int(nombre * duree_min / duree)) if duree < duree_min else nombre
+    return statistics.median(
+        t / nombre for t in timer.repeat(repeat=repetitions, number=nombre)
+    )
+
+
+def _format_duree(secondes):
+    for unite, facteur in [("s", 1), ("ms", 1e-3), ("µs", 1e-6)]:
+        if secondes >= facteur:
+            return f"{secondes / facteur:.3g} {unite}"
+    return f"{secondes / 1e-9:.3g} ns"
+
+
+def run_benchmarks(noms, repetitions=REPETITIONS):
+    resultats = {}
+    for nom in noms:
+        appel, nb_elements = benchmarks[nom]()
+        duree = mesure(appel, repetitions)
+        resultats[nom] = {"duree": duree, "nb_elements": nb_elements}
+    return resultats
+
+
+def rapport(resultats, reference, seuil=SEUIL):
+    """Tableau texte des résultats et liste des benchmarks en régression"""
+
+    lignes = [
+        f"{'benchmark':<36} {'par appel':>11} {'débit (/s)':>12} "
+        f"{'référence':>11} {'écart':>8}"
+    ]
+    regressions = []
+    for nom, resultat in resultats.items():
+        duree = resultat["duree"]
+        debit = resultat["nb_elements"] / duree
+        ligne = f"{nom:<36} {_format_duree(duree):>11} {debit:>12.4g}"
+
+        if nom in reference:
+            ecart = duree / reference[nom]["duree"] - 1
+            ligne += f" {_format_duree(reference[nom]['duree']):>11} {ecart:>+8.1%}"
+            if ecart > seuil:
+                ligne += "  REGRESSION"
+                regressions.append(nom)
+        else:
+            ligne += f" {'-':>11} {'-':>8}"
+        lignes.append(ligne)
+
+    return "\n".join(lignes), regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmarks du modèle, des callbacks et du layout"
+    )
+    parser.add_argument(
+        "filtres", nargs="*", help="ne lance que les benchmarks dont le nom contient"
+    )
+    parser.add_argument("--reference", default=REFERENCE)
+    parser.add_argument(
+        "--enregistre",
+        action="store_true",
+        help="enregistre les résultats comme nouvelle référence",
+    )
+    parser.add_argument("--seuil", type=float, default=SEUIL)
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS)
+    args = parser.parse_args()
+
+    noms = [
+        nom
+        for nom in benchmarks
+        if not args.filtres or any(f in nom for f in args.filtres)
+    ]
+
+    reference = {}
+    if os.path.exists(args.reference):
+        with open(args.reference) as f:
+            reference = json.load(f)
+
+    resultats = run_benchmarks(noms, args.repetitions)
+    texte, regressions = rapport(resultats, reference, args.seuil)
+    print(texte)
+
+    if args.enregistre:
+        with open(args.reference, "w") as f:
+            json.dump({**reference, **resultats}, f, indent=2, sort_keys=True)
+        print(f"Référence enregistrée dans {args.reference}")
+    elif regressions:
+        print(f"{len(regressions)} régression(s) au-delà de {args.seuil:.0%}")
+        sys.exit(1)
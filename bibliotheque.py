@@ -0,0 +1,258 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from model import MALADIES, SECTEURS, nb_variables, slots_prevalences
+from scenarios import ErreurScenario, evalue
+from territoires import recherche_territoires
+
+CHEMIN_BIBLIOTHEQUE = os.environ.get(
+    "PSYPERINATHON_SCENARIOS",
+    os.path.join(tempfile.gettempdir(), "psyperinathon_scenarios.sqlite"),
+)
+NB_RESULTATS = 50
+NB_RESULTATS_MAX = 500
+
+LIGNES_COMPARAISON = ["Coût total", "Coût par naissance", "Mère", "Bébé"] + [
+    *MALADIES,
+    *SECTEURS,
+]
+
+
+class BibliothequeScenarios:
+    """Scénarios nommés (jeu d'hypothèses, territoire, nombre de naissances)
+    stockés dans SQLite, partagés entre les workers gunicorn
+
+    Les hypothèses sont stockées en un blob de 55 float64 ; les recherches
+    par nom (préfixe), propriétaire et territoire passent par des index"""
+
+    def __init__(self, chemin=CHEMIN_BIBLIOTHEQUE):
+        self.chemin = chemin
+        self._local = threading.local()
+
+    @property
+    def connexion(self):
+        # une connexion par thread, ouverte après le fork des workers
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=10)
+            connexion.row_factory = sqlite3.Row
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS scenarios ("
+                "id INTEGER PRIMARY KEY, nom TEXT NOT NULL, "
+                "proprietaire TEXT NOT NULL DEFAULT '', territoire INTEGER, "
+                "naissances REAL, valeurs BLOB NOT NULL, modifie_le REAL, "
+                "UNIQUE (proprietaire, nom))"
+            )
+            # (proprietaire, nom) est déjà indexé par la contrainte UNIQUE
+            connexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_proprietaire "
+                "ON scenarios (proprietaire, modifie_le)"
+            )
+            connexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_nom ON scenarios (nom COLLATE NOCASE)"
+            )
+            connexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_territoire ON scenarios (territoire)"
+            )
+            connexion.commit()
+            self._local.connexion = connexion
+        return connexion
+
+    def enregistre(
+        self, nom, valeurs, territoire=None, naissances=None, proprietaire=""
+    ):
+        """Enregistre (ou remplace, pour un même nom et propriétaire) un
+        scénario et renvoie son identifiant
+
+        Le propriétaire est un libellé déclaré par le client, sans
+        authentification : il distingue des scénarios de même nom mais ne
+        protège pas ceux-ci"""
+
+        valeurs = np.asarray(valeurs, dtype=np.float64)
+        if not isinstance(nom, str) or not nom:
+            raise ErreurScenario(f"Nom de scénario invalide : {nom!r}")
+        if proprietaire is not None and not isinstance(proprietaire, str):
+            raise ErreurScenario(f"Propriétaire invalide : {proprietaire!r}")
+        if valeurs.shape != (nb_variables,):
+            raise ErreurScenario(f"{nb_variables} valeurs attendues")
+        if territoire is not None:
+            if isinstance(territoire, bool) or not isinstance(
+                territoire, (int, np.integer)
+            ):
+                raise ErreurScenario(f"Territoire invalide : {territoire!r}")
+            territoire = int(territoire)
+            if territoire not in recherche_territoires().bdd_naissances.index:
+                raise ErreurScenario(f"Territoire inconnu : {territoire!r}")
+
+        with self.connexion:
+            self.connexion.execute(
+                "INSERT INTO scenarios "
+                "(nom, proprietaire, territoire, naissances, valeurs, modifie_le) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (proprietaire, nom) DO UPDATE "
+                "SET territoire = excluded.territoire, "
+                "naissances = excluded.naissances, valeurs = excluded.valeurs, "
+                "modifie_le = excluded.modifie_le",
+                (
+                    nom,
+                    proprietaire or "",
+                    territoire,
+                    None if naissances is None else float(naissances),
+                    valeurs.tobytes(),
+                    time.time(),
+                ),
+            )
+            (identifiant,) = self.connexion.execute(
+                "SELECT id FROM scenarios WHERE proprietaire = ? AND nom = ?",
+                (proprietaire or "", nom),
+            ).fetchone()
+        return identifiant
+
+    def cherche(
+        self, nom=None, proprietaire=None, territoire=None, limite=NB_RESULTATS
+    ):
+        """Scénarios dont le nom commence par nom (sans tenir compte de la
+        casse), filtrés par propriétaire et territoire, du plus récent au
+        plus ancien, sans leurs valeurs ; limite est ramenée entre 1 et
+        NB_RESULTATS_MAX"""
+
+        limite = min(max(int(limite), 1), NB_RESULTATS_MAX)
+        conditions, parametres_sql = [], []
+        if nom:
+            # préfixe en intervalle pour utiliser l'index idx_nom
+            conditions.append("nom >= ? COLLATE NOCASE AND nom < ? COLLATE NOCASE")
+            parametres_sql += [nom, nom + "\U0010ffff"]
+        if proprietaire is not None:
+            conditions.append("proprietaire = ?")
+            parametres_sql.append(proprietaire)
+        if territoire is not None:
+            conditions.append("territoire = ?")
+            parametres_sql.append(int(territoire))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        lignes = self.connexion.execute(
+            "SELECT id, nom, proprietaire, territoire, naissances, modifie_le "
+            f"FROM scenarios {where} ORDER BY modifie_le DESC LIMIT ?",
+            parametres_sql + [limite],
+        ).fetchall()
+        return [dict(ligne) for ligne in lignes]
+
+    def get(self, identifiant):
+        """Scénario complet, valeurs comprises ; KeyError s'il n'existe pas"""
+        ligne = self.connexion.execute(
+            "SELECT * FROM scenarios WHERE id = ?", (identifiant,)
+        ).fetchone()
+        if ligne is None:
+            raise KeyError(identifiant)
+        scenario = dict(ligne)
+        scenario["valeurs"] = np.frombuffer(ligne["valeurs"], dtype=np.float64)
+        return scenario
+
+    def supprime(self, identifiant, proprietaire=""):
+        """Supprime un scénario ; KeyError s'il n'existe pas, PermissionError
+        si proprietaire n'est pas son libellé de propriétaire (garde-fou
+        contre une suppression par erreur, pas un contrôle d'accès)"""
+        with self.connexion:
+            ligne = self.connexion.execute(
+                "SELECT proprietaire FROM scenarios WHERE id = ?", (identifiant,)
+            ).fetchone()
+            if ligne is None:
+                raise KeyError(identifiant)
+            if ligne["proprietaire"] != (proprietaire or ""):
+                raise PermissionError(identifiant)
+            self.connexion.execute(
+                "DELETE FROM scenarios WHERE id = ? AND proprietaire = ?",
+                (identifiant, ligne["proprietaire"]),
+            )
+
+    def matrice(self, identifiants):
+        """Noms, jeux d'hypothèses (m, 55) et nombres de naissances (m,) des
+        scénarios, dans l'ordre des identifiants, lus en une requête"""
+
+        identifiants = [int(i) for i in identifiants]
+        lignes = {
+            ligne["id"]: ligne
+            for ligne in self.connexion.execute(
+                "SELECT id, nom, territoire, naissances, valeurs FROM scenarios "
+                f"WHERE id IN ({', '.join('?' * len(identifiants))})",
+                identifiants,
+            )
+        }
+        inconnus = [i for i in identifiants if i not in lignes]
+        if inconnus:
+            raise ErreurScenario(f"Scénarios inconnus : {inconnus}")
+
+        lignes = [lignes[i] for i in identifiants]
+        X = np.frombuffer(
+            b"".join(ligne["valeurs"] for ligne in lignes), dtype=np.float64
+        )
+        X = X.reshape(len(lignes), nb_variables)
+
+        # naissances du scénario, sinon celles de son territoire, sinon 1
+        bdd_naissances = recherche_territoires().bdd_naissances
+        naissances = np.ones(len(lignes))
+        for k, ligne in enumerate(lignes):
+            if ligne["naissances"] is not None:
+                naissances[k] = ligne["naissances"]
+            elif ligne["territoire"] is not None:
+                naissances[k] = bdd_naissances.loc[
+                    ligne["territoire"], "Nombre de naissances (2018)"
+                ]
+
+        return [ligne["nom"] for ligne in lignes], X, naissances
+
+    def compare(self, identifiants):
+        """Coûts annuels des scénarios côte à côte, en une évaluation
+        vectorisée : DataFrame lignes LIGNES_COMPARAISON x une colonne par
+        scénario, plus une colonne d'écart au premier pour chacun des autres"""
+
+        if not identifiants:
+            raise ErreurScenario("Aucun scénario à comparer")
+        noms, X, naissances = self.matrice(identifiants)
+        return comparaison(noms, X, naissances)
+
+
+def comparaison(noms, X, naissances):
+    """Tableau de compare pour des jeux d'hypothèses déjà lus"""
+
+    resultats = evalue(X, naissances)
+
+    # part mère / bébé : coûts par cas pondérés par la prévalence
+    prevalences = X[:, slots_prevalences] / 100
+    par_personne = (
+        resultats["couts_par_cas"][:, :, :2] * prevalences[:, :, np.newaxis]
+    ).sum(axis=1) * naissances[:, np.newaxis]
+
+    valeurs = np.column_stack(
+        [
+            resultats["cout_total"],
+            resultats["cout_par_naissance"],
+            par_personne,
+            resultats["couts_maladies"],
+            resultats["couts_secteurs"],
+        ]
+    )
+
+    noms = _noms_uniques(noms)
+    colonnes = dict(zip(noms, valeurs))
+    for nom, ligne in zip(noms[1:], valeurs[1:]):
+        colonnes[f"{nom} - {noms[0]}"] = ligne - valeurs[0]
+    return pd.DataFrame(colonnes, index=LIGNES_COMPARAISON)
+
+
+def _noms_uniques(noms):
+    vus = {}
+    uniques = []
+    for nom in noms:
+        vus[nom] = vus.get(nom, 0) + 1
+        uniques.append(nom if vus[nom] == 1 else f"{nom} ({vus[nom]})")
+    return uniques
+
+
+bibliotheque = BibliothequeScenarios()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import plotly
+
+CHEMIN_CACHE = os.environ.get(
+    "PSYPERINATHON_CACHE",
+    os.path.join(tempfile.gettempdir(), "psyperinathon_cache.sqlite"),
+)
+TAILLE_MAX = 10000
+TTL = 24 * 3600
+
+# les valeurs sont arrondies au millième de pas : les valeurs par défaut hors
+# grille (0.088 pour un pas de 0.01) ne sont pas confondues avec leurs voisines
+SUBDIVISIONS_PAS = 1000
+
+
+class CacheResultats:
+    """Cache LRU / TTL sur disque (SQLite), partagé entre les workers gunicorn
+
+    Les valeurs sont stockées en JSON, telles que Dash les enverrait au
+    navigateur"""
+
+    def __init__(self, chemin=CHEMIN_CACHE, taille_max=TAILLE_MAX, ttl=TTL):
+        self.chemin = chemin
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._local = threading.local()
+
+    @property
+    def connexion(self):
+        # une connexion par thread, ouverte après le fork des workers
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=10)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=NORMAL")
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS resultats ("
+                "cle TEXT PRIMARY KEY, valeur TEXT, cree_le REAL, dernier_acces REAL)"
+            )
+            connexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_dernier_acces "
+                "ON resultats (dernier_acces)"
+            )
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS compteurs "
+                "(nom TEXT PRIMARY KEY, valeur INTEGER)"
+            )
+            connexion.commit()
+            self._local.connexion = connexion
+        return connexion
+
+    def _incremente(self, nom):
+        self.connexion.execute(
+            "INSERT INTO compteurs VALUES (?, 1) "
+            "ON CONFLICT(nom) DO UPDATE SET valeur = valeur + 1",
+            (nom,),
+        )
+
+    def get(self, cle):
+        """Renvoie la valeur associée à cle, ou None si absente ou expirée"""
+        maintenant = time.time()
+        with self.connexion:
+            ligne = self.connexion.execute(
+                "SELECT valeur, cree_le FROM resultats WHERE cle = ?", (cle,)
+            ).fetchone()
+
+            if ligne is None or maintenant - ligne[1] > self.ttl:
+                if ligne is not None:
+                    self.connexion.execute(
+                        "DELETE FROM resultats WHERE cle = ?", (cle,)
+                    )
+                self._incremente("misses")
+                return None
+
+            self.connexion.execute(
+                "UPDATE resultats SET dernier_acces = ? WHERE cle = ?",
+                (maintenant, cle),
+            )
+            self._incremente("hits")
+
+        return json.loads(ligne[0])
+
+    def set(self, cle, valeur):
+        maintenant = time.time()
+        with self.connexion:
+            self.connexion.execute(
+                "INSERT OR REPLACE INTO resultats VALUES (?, ?, ?, ?)",
+                (
+                    cle,
+                    json.dumps(valeur, cls=plotly.utils.PlotlyJSONEncoder),
+                    maintenant,
+                    maintenant,
+                ),
+            )
+            # éviction des entrées expirées puis des moins récemment utilisées
+            self.connexion.execute(
+                "DELETE FROM resultats WHERE cree_le < ?", (maintenant - self.ttl,)
+            )
+            self.connexion.execute(
+                "DELETE FROM resultats WHERE cle IN (SELECT cle FROM resultats "
+                "ORDER BY dernier_acces DESC LIMIT -1 OFFSET ?)",
+                (self.taille_max,),
+            )
+
+    def clear(self):
+        with self.connexion:
+            self.connexion.execute("DELETE FROM resultats")
+            self.connexion.execute("DELETE FROM compteurs")
+
+    def stats(self):
+        compteurs = dict(
+            self.connexion.execute("SELECT nom, valeur FROM compteurs").fetchall()
+        )
+        hits = compteurs.get("hits", 0)
+        misses = compteurs.get("misses", 0)
+        (taille,) = self.connexion.execute("SELECT COUNT(*) FROM resultats").fetchone()
+        return {
+            "hits": hits,
+            "misses": misses,
+            "taux_hits": hits / (hits + misses) if hits + misses else 0.0,
+            "taille": taille,
+            "taille_max": self.taille_max,
+            "ttl": self.ttl,
+        }
+
+
+def cle_hypotheses(valeurs, df_variables, *extra):
+    """Clé canonique d'un jeu d'hypothèses : valeurs quantifiées au pas de
+    chaque variable, plus d'éventuels éléments supplémentaires (nombre de
+    naissances...)"""
+
+    valeurs = np.asarray(valeurs, dtype=float)
+    mini = df_variables["mini"].values
+    pas = df_variables["step"].values
+
+    quantifiees = np.rint((valeurs - mini) / pas * SUBDIVISIONS_PAS).astype(np.int64)
+
+    h = hashlib.sha1(quantifiees.tobytes())
+    h.update(repr(extra).encode())
+    return h.hexdigest()
+
+
+cache_resultats = CacheResultats()
@@ -0,0 +1,177 @@
+"""Export du moteur de model.py en JavaScript, pour les callbacks clientside
+
+Le code JS n'est pas écrit à la main : il est généré à partir du graphe de
+calcul du moteur Python (graphe.py), une constante par opération, dans le
+même ordre. Les résultats sont donc identiques au flottant près et les
+deux versions ne peuvent pas diverger."""
+
+import json
+
+from graphe import TRONQUE, GrapheModele
+from model import nb_variables, parametres, slots_prevalences
+
+NB_ELASTICITES = 10
+
+
+def _structure(x, code):
+    if isinstance(x, dict):
+        return (
+            "{"
+            + ", ".join(f"{json.dumps(k)}: {_structure(x[k], code)}" for k in x)
+            + "}"
+        )
+    if isinstance(x, list):
+        return "[" + ", ".join(_structure(e, code) for e in x) + "]"
+    if x[0] == "noeud":
+        return code(x[1])
+    return repr(x[1]) if x[1] >= 0 else f"({x[1]!r})"
+
+
+def _code_js(noeud):
+    # hypothèses : v[slot], noeuds de calcul : une constante t0, t1... chacun
+    if noeud < nb_variables:
+        return f"v[{noeud}]"
+    return f"t{noeud - nb_variables}"
+
+
+def _instructions_js(graphe):
+    return [
+        f"const {_code_js(k)} = {graphe.code(k, _code_js)};".replace(
+            f"{TRONQUE}(", "Math.trunc("
+        )
+        for k in graphe.dependants()
+    ]
+
+
+def _fonction_js(nom, instructions, retour):
+    corps = "\n".join("    " + instruction for instruction in instructions)
+    return f"function {nom}(v) {{\n{corps}\n    return {retour};\n}}"
+
+
+def export_modele_js(nom="modele"):
+    """Source d'une fonction JS nom(v) : v est le tableau des 55 valeurs dans
+    l'ordre des slots, le résultat contient couts (3 x 3), repartition et
+    cout_par_naissance, comme process_vector(v, niveau="detail")"""
+
+    graphe = GrapheModele()
+    sortie = {
+        "couts": graphe.sorties["couts_par_cas"],
+        "repartition": graphe.sorties["repartition_secteur"],
+        "cout_par_naissance": graphe.sorties["cout_par_naissance"],
+    }
+    return _fonction_js(nom, _instructions_js(graphe), _structure(sortie, _code_js))
+
+
+def export_gradient_js(nom="gradient"):
+    """Source d'une fonction JS nom(v) : coût par naissance (valeur) et ses
+    dérivées par rapport aux 55 hypothèses (gradient), comme
+    elasticites.GradientModele pour le total"""
+
+    graphe = GrapheModele()
+    _, total = graphe.sorties["cout_par_naissance"]
+
+    instructions = _instructions_js(graphe)
+    derivees = set()
+    for noeud, premiere, expression in graphe.adjoint(
+        total, _code_js, lambda k: f"d{k}"
+    ):
+        declaration = "let " if premiere else ""
+        operation = "=" if premiere else "+="
+        instructions.append(f"{declaration}d{noeud} {operation} {expression};")
+        derivees.add(noeud)
+
+    gradient = ", ".join(
+        f"d{slot}" if slot in derivees else "0" for slot in range(nb_variables)
+    )
+    retour = f"{{valeur: {_code_js(total)}, gradient: [{gradient}]}}"
+    return _fonction_js(nom, instructions, retour)
+
+
+def export_millify_js(nom="millify"):
+    """Équivalent JS de utils.millify"""
+    return (
+        f"function {nom}(n) {{\n"
+        "    const millnames = ['', ' mille €', \" millions d'€\", \" milliards d'€\"];\n"
+        "    const millidx = Math.max(0, Math.min(millnames.length - 1,\n"
+        "        Math.floor(n === 0 ? 0 : Math.log10(Math.abs(n)) / 3)));\n"
+        "    return (n / Math.pow(10, 3 * millidx)).toFixed(1) + millnames[millidx];\n"
+        "}"
+    )
+
+
+def export_callback_resultats():
+    """Callback clientside (nombre de naissances, 55 valeurs, figure actuelle)
+    -> (coût total, part mère, part bébé, camembert par secteur)
+
+    Reprend les calculs de compute_costs ; la figure n'est pas reconstruite,
+    seuls ses values / customdata sont remplacés"""
+
+    return f"""function(n_naissances, ...valeurs) {{
+{export_modele_js()}
+
+{export_millify_js()}
+
+    const figure = valeurs.pop();
+    const v = valeurs.map(Number);
+    const r = modele(v);
+    const prevalences = {json.dumps(slots_prevalences)}.map(slot => v[slot] / 100);
+    if (n_naissances === null || n_naissances === undefined) {{
+        n_naissances = 1;
+    }}
+
+    const cout_total = r.cout_par_naissance * n_naissances;
+    let mere = 0;
+    let bebe = 0;
+    for (let i = 0; i < 3; i++) {{
+        mere += r.couts[i][0] * prevalences[i];
+        bebe += r.couts[i][1] * prevalences[i];
+    }}
+    const proportion_mere = 100 * mere / (mere + bebe);
+
+    const couts_totaux = r.repartition.map(part => part * cout_total);
+    const trace = Object.assign({{}}, figure.data[0], {{
+        values: couts_totaux,
+        customdata: couts_totaux.map(millify),
+    }});
+
+    return [
+        millify(cout_total),
+        " " + proportion_mere.toFixed(0) + " %",
+        " " + (100 - proportion_mere).toFixed(0) + " %",
+        Object.assign({{}}, figure, {{data: [trace]}}),
+    ];
+}}"""
+
+
+def export_callback_elasticites(n=NB_ELASTICITES):
+    """Callback clientside (nombre de naissances, 55 valeurs) -> lignes de
+    table-elasticites : les n hypothèses dont l'élasticité du coût total
+    est la plus grande en valeur absolue, et l'effet sur le coût annuel
+    d'une hausse de 10 % de chacune"""
+
+    return f"""function(n_naissances, ...valeurs) {{
+{export_gradient_js()}
+
+{export_millify_js()}
+
+    const v = valeurs.map(Number);
+    const r = gradient(v);
+    const noms = {json.dumps(parametres.noms, ensure_ascii=False)};
+    if (n_naissances === null || n_naissances === undefined) {{
+        n_naissances = 1;
+    }}
+
+    const lignes = v.map((x, i) => ({{
+        i: i,
+        elasticite: r.valeur === 0 ? 0 : r.gradient[i] * x / r.valeur,
+        effet: 0.1 * x * r.gradient[i] * n_naissances,
+    }}));
+    lignes.sort((a, b) => Math.abs(b.elasticite) - Math.abs(a.elasticite));
+
+    const signe = x => (x < 0 ? "-" : "+");
+    return lignes.slice(0, {n}).map(l => ({{
+        hypothese: noms[l.i],
+        elasticite: signe(l.elasticite) + Math.abs(l.elasticite).toFixed(2),
+        effet: signe(l.effet) + millify(Math.abs(l.effet)),
+    }}));
+}}"""
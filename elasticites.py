@@ -0,0 +1,99 @@
+"""Gradient et élasticités des coûts par rapport aux 55 hypothèses
+
+Les dérivées sont exactes : elles sont obtenues par différentiation en mode
+inverse sur le graphe de calcul du modèle (graphe.py), une passe arrière par
+sous-total, chacune d'un coût comparable à une évaluation du modèle.
+
+L'élasticité d'un coût C par rapport à l'hypothèse x est dC/dx * x / C :
+la variation relative du coût pour 1 % de hausse de l'hypothèse."""
+
+from functools import lru_cache
+
+import numpy as np
+
+from graphe import GrapheModele
+from model import nb_variables, parametres
+
+
+class GradientModele:
+    """Coûts par naissance (total, par maladie, par secteur) et leurs
+    gradients par rapport aux hypothèses
+
+    sous_totaux : nom -> noeud du graphe"""
+
+    def __init__(self):
+        self.graphe = GrapheModele()
+        self.sous_totaux = self.graphe.ajoute_sous_totaux()
+
+        lignes = []
+        for i, (nom, sortie) in enumerate(self.sous_totaux.items()):
+            derivees = set()
+            for noeud, premiere, expression in self.graphe.adjoint(
+                sortie, lambda k: f"t[{k}]", lambda k: f"d{i}_{k}"
+            ):
+                operation = "=" if premiere else "+="
+                lignes.append(f"    d{i}_{noeud} {operation} {expression}")
+                derivees.add(noeud)
+            gradient = ", ".join(
+                f"d{i}_{slot}" if slot in derivees else "0.0"
+                for slot in range(nb_variables)
+            )
+            lignes.append(f"    g[{nom!r}] = [{gradient}]")
+
+        source = (
+            "def gradients(t):\n    g = {}\n" + "\n".join(lignes) + "\n    return g\n"
+        )
+        espace = {}
+        exec(compile(source, "<gradients>", "exec"), espace)
+        self._gradients = espace["gradients"]
+
+    def calcule(self, v):
+        """(valeurs, gradients) pour le jeu d'hypothèses v : dict nom ->
+        coût par naissance, et dict nom -> array (55,) de ses dérivées"""
+        t = self.graphe.evalue(v)
+        valeurs = {nom: t[noeud] for nom, noeud in self.sous_totaux.items()}
+        gradients = {nom: np.array(g) for nom, g in self._gradients(t).items()}
+        return valeurs, gradients
+
+
+@lru_cache(maxsize=1)
+def gradient_modele():
+    return GradientModele()
+
+
+def elasticites(v, valeur, gradient):
+    """Élasticités d'un coût de valeur valeur et de gradient gradient au
+    point v, nulles si le coût est nul"""
+    if valeur == 0:
+        return np.zeros(len(gradient))
+    return gradient * np.asarray(v, dtype=float) / valeur
+
+
+def compute_elasticites(v, naissances=1):
+    """Coût annuel, gradient et élasticités de chaque sous-total, dict
+    nom -> {"cout", "gradient", "elasticites"} avec les arrays indexés par
+    slot"""
+
+    valeurs, gradients = gradient_modele().calcule(v)
+    return {
+        nom: {
+            "cout": valeurs[nom] * naissances,
+            "gradient": gradients[nom] * naissances,
+            "elasticites": elasticites(v, valeurs[nom], gradients[nom]),
+        }
+        for nom in valeurs
+    }
+
+
+def classement_elasticites(v, n=10):
+    """Les n hypothèses dont le coût total par naissance dépend le plus au
+    point v : DataFrame trié par élasticité décroissante en valeur absolue"""
+    import pandas as pd
+
+    total = compute_elasticites(v)["Total"]
+    classement = pd.DataFrame(
+        {"Élasticité": total["elasticites"], "Dérivée": total["gradient"]},
+        index=parametres.noms,
+    )
+    ordre = np.argsort(-np.abs(classement["Élasticité"].values), kind="stable")
+    return classement.iloc[ordre[:n]]
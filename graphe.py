@@ -0,0 +1,352 @@
+"""Graphe de dépendances du modèle, pour un recalcul incrémental
+
+Le graphe est obtenu en exécutant le moteur de model.py sur des variables
+symboliques qui enregistrent chaque opération : un noeud par hypothèse, puis
+un noeud par opération, dans l'ordre du moteur (donc dans un ordre
+topologique). Quand des hypothèses changent, seuls les noeuds qui en
+dépendent sont recalculés, avec les mêmes opérations dans le même ordre :
+les résultats sont identiques au flottant près à process_vector.
+
+Le même graphe sert à l'export JavaScript (clientside.py)."""
+
+import math
+import threading
+
+from model import MALADIES, SECTEURS, _evaluate, nb_variables, slots_prevalences
+
+TRONQUE = "trunc"
+NB_RECALCULS_MAX = 256
+
+
+class _Constante:
+    """Opérande constant d'un noeud (un int serait pris pour un indice)"""
+
+    __slots__ = ("valeur",)
+
+    def __init__(self, valeur):
+        self.valeur = valeur
+
+
+def _est_nombre(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def _est_zero(x):
+    return _est_nombre(x) and x == 0
+
+
+class _Symbole:
+    """Valeur symbolique : chaque opération arithmétique ajoute un noeud au
+    graphe et renvoie le symbole de ce noeud"""
+
+    __slots__ = ("graphe", "noeud")
+
+    def __init__(self, graphe, noeud):
+        self.graphe = graphe
+        self.noeud = noeud
+
+    def _operation(self, operateur, a, b):
+        return self.graphe._ajoute(operateur, a, b)
+
+    def __add__(self, autre):
+        # x + 0 vaut x : inutile de l'enregistrer (sommes démarrant à zero)
+        return self if _est_zero(autre) else self._operation("+", self, autre)
+
+    def __radd__(self, autre):
+        return self if _est_zero(autre) else self._operation("+", autre, self)
+
+    def __sub__(self, autre):
+        return self._operation("-", self, autre)
+
+    def __rsub__(self, autre):
+        return self._operation("-", autre, self)
+
+    def __mul__(self, autre):
+        return self._operation("*", self, autre)
+
+    def __rmul__(self, autre):
+        return self._operation("*", autre, self)
+
+    def __truediv__(self, autre):
+        return self._operation("/", self, autre)
+
+    def __rtruediv__(self, autre):
+        return self._operation("/", autre, self)
+
+
+def _operande(x):
+    if isinstance(x, _Symbole):
+        return x.noeud
+    if _est_nombre(x):
+        return _Constante(x)
+    raise TypeError(f"Opérande non pris en charge : {x!r}")
+
+
+def _sorties(x):
+    """Structure du résultat où chaque valeur devient ("noeud", indice) ou
+    ("constante", valeur)"""
+    if isinstance(x, dict):
+        return {cle: _sorties(valeur) for cle, valeur in x.items()}
+    if isinstance(x, list):
+        return [_sorties(e) for e in x]
+    if isinstance(x, _Symbole):
+        return ("noeud", x.noeud)
+    return ("constante", x)
+
+
+class GrapheModele:
+    """Graphe de calcul de process_vector(v, niveau="detail")
+
+    - noeuds : (operateur, a, b) ; les nb_variables premiers sont les
+      hypothèses (operateur None), a et b sont des indices de noeuds ou des
+      _Constante, b vaut None pour la troncature
+    - sorties : structure du résultat "detail", chaque valeur étant
+      ("noeud", indice) ou ("constante", valeur)
+    - termes : nom -> noeud des termes intermédiaires et du coût par
+      naissance"""
+
+    def __init__(self, maladies=(True, True, True)):
+        self.noeuds = [(None, slot, None) for slot in range(nb_variables)]
+        v = [_Symbole(self, slot) for slot in range(nb_variables)]
+        detail = _evaluate(
+            v,
+            "detail",
+            tuple(maladies),
+            lambda x: self._ajoute(TRONQUE, x, None),
+            0,
+        )
+        self.sorties = _sorties(detail)
+
+        # hypothèses dont dépend chaque noeud, en masque de bits
+        self.masques = []
+        self._complete_masques()
+
+        self.termes = {
+            nom: ref[1]
+            for nom, ref in [
+                *self.sorties["termes"].items(),
+                ("cout_par_naissance", self.sorties["cout_par_naissance"]),
+            ]
+            if ref[0] == "noeud"
+        }
+
+        self._recalculs = {}
+        self._resultat = None
+        self._verrou = threading.Lock()
+
+    def _ajoute(self, operateur, a, b):
+        self.noeuds.append(
+            (operateur, _operande(a), None if b is None else _operande(b))
+        )
+        return _Symbole(self, len(self.noeuds) - 1)
+
+    def _complete_masques(self):
+        for operateur, a, b in self.noeuds[len(self.masques) :]:
+            if operateur is None:
+                self.masques.append(1 << a)
+            else:
+                self.masques.append(
+                    (0 if isinstance(a, _Constante) else self.masques[a])
+                    | (0 if b is None or isinstance(b, _Constante) else self.masques[b])
+                )
+
+    def __len__(self):
+        return len(self.noeuds)
+
+    def masque(self, slots):
+        masque = 0
+        for slot in slots:
+            masque |= 1 << slot
+        return masque
+
+    def dependants(self, masque=None):
+        """Indices des noeuds de calcul qui dépendent d'au moins une des
+        hypothèses du masque (tous si masque vaut None), dans l'ordre de
+        calcul"""
+        return [
+            k
+            for k in range(nb_variables, len(self.noeuds))
+            if masque is None or self.masques[k] & masque
+        ]
+
+    @staticmethod
+    def _code_operande(x, operande):
+        if isinstance(x, _Constante):
+            return repr(x.valeur) if x.valeur >= 0 else f"({x.valeur!r})"
+        return operande(x)
+
+    def code(self, noeud, operande):
+        """Expression d'un noeud de calcul, operande : indice d'un noeud ->
+        expression de sa valeur"""
+
+        operateur, a, b = self.noeuds[noeud]
+        a = self._code_operande(a, operande)
+        if operateur == TRONQUE:
+            return f"{TRONQUE}({a})"
+        return f"{a} {operateur} {self._code_operande(b, operande)}"
+
+    def ajoute_sous_totaux(self):
+        """Ajoute au graphe les coûts par naissance de chaque maladie et de
+        chaque secteur, calculés comme dans scenarios.evalue, et renvoie
+        nom -> noeud ("Total" pour le coût par naissance)"""
+
+        def symbole(ref):
+            return _Symbole(self, ref[1]) if ref[0] == "noeud" else ref[1]
+
+        total = symbole(self.sorties["cout_par_naissance"])
+        sous_totaux = {"Total": total}
+        for maladie, ligne, slot in zip(
+            MALADIES, self.sorties["couts_par_cas"], slots_prevalences
+        ):
+            sous_totaux[maladie] = symbole(ligne[2]) * (_Symbole(self, slot) / 100)
+        for secteur, part in zip(SECTEURS, self.sorties["repartition_secteur"]):
+            sous_totaux[secteur] = symbole(part) * total
+
+        # les recalculs déjà compilés ne couvrent pas les nouveaux noeuds
+        self._complete_masques()
+        self._recalculs.clear()
+        return {
+            nom: s.noeud for nom, s in sous_totaux.items() if isinstance(s, _Symbole)
+        }
+
+    def adjoint(self, sortie, valeur, derivee):
+        """Différentiation en mode inverse du noeud sortie
+
+        Renvoie les instructions (noeud, premiere, expression), du dernier
+        noeud au premier : la dérivée de sortie par rapport à noeud reçoit la
+        contribution expression (affectation si premiere, sinon ajout).
+        valeur et derivee : indice d'un noeud -> expression de sa valeur, de
+        sa dérivée. Les dérivées des hypothèses non atteintes sont nulles.
+
+        La troncature est dérivée comme l'identité : les coûts par cas sont
+        tronqués à l'euro, ce qui annulerait le gradient presque partout"""
+
+        atteints = {sortie}
+        instructions = [(sortie, True, "1.0")]
+        for k in range(sortie, nb_variables - 1, -1):
+            operateur, a, b = self.noeuds[k]
+            if k not in atteints or operateur is None:
+                continue
+
+            d = derivee(k)
+            if operateur in ("+", TRONQUE):
+                contributions = [(a, d), (b, d)]
+            elif operateur == "-":
+                contributions = [(a, d), (b, f"-{d}")]
+            elif operateur == "*":
+                contributions = [
+                    (a, f"{d} * {self._code_operande(b, valeur)}"),
+                    (b, f"{d} * {self._code_operande(a, valeur)}"),
+                ]
+            else:
+                diviseur = self._code_operande(b, valeur)
+                contributions = [
+                    (a, f"{d} / {diviseur}"),
+                    (b, f"-{d} * {valeur(k)} / {diviseur}"),
+                ]
+
+            for x, contribution in contributions:
+                if x is None or isinstance(x, _Constante):
+                    continue
+                instructions.append((x, x not in atteints, contribution))
+                atteints.add(x)
+        return instructions
+
+    def recalcul(self, masque):
+        """Fonction t -> None qui recalcule en place les noeuds dépendant des
+        hypothèses du masque (tous si masque vaut None), compilée au premier
+        appel pour ce masque"""
+        fonction = self._recalculs.get(masque)
+        if fonction is None:
+            lignes = [
+                f"    t[{k}] = {self.code(k, lambda x: f't[{x}]')}"
+                for k in self.dependants(masque)
+            ]
+            source = "def recalcule(t):\n" + ("\n".join(lignes) or "    pass") + "\n"
+            espace = {TRONQUE: math.trunc}
+            exec(compile(source, "<graphe>", "exec"), espace)
+            fonction = espace["recalcule"]
+            with self._verrou:
+                if len(self._recalculs) >= NB_RECALCULS_MAX:
+                    self._recalculs.clear()
+                self._recalculs[masque] = fonction
+        return fonction
+
+    def evalue(self, v):
+        """Valeurs de tous les noeuds pour le jeu d'hypothèses v"""
+        t = [float(x) for x in v] + [None] * (len(self.noeuds) - nb_variables)
+        self.recalcul(None)(t)
+        return t
+
+    def resultat(self, t):
+        """Résultat "detail" de process_vector à partir des valeurs des noeuds"""
+        if self._resultat is None:
+
+            def code(x):
+                if isinstance(x, dict):
+                    return (
+                        "{" + ", ".join(f"{k!r}: {code(e)}" for k, e in x.items()) + "}"
+                    )
+                if isinstance(x, list):
+                    return "[" + ", ".join(code(e) for e in x) + "]"
+                return f"t[{x[1]}]" if x[0] == "noeud" else repr(x[1])
+
+            self._resultat = eval(f"lambda t: {code(self.sorties)}")
+        return self._resultat(t)
+
+
+class CalculIncremental:
+    """Modèle qui garde les valeurs de tous les noeuds de son dernier calcul
+    et ne recalcule que ce qui dépend des hypothèses modifiées
+
+    deltas : nom -> (avant, après) pour les termes (graphe.termes) modifiés
+    par le dernier calcul"""
+
+    def __init__(self, graphe=None):
+        self.graphe = graphe or GrapheModele()
+        self.t = None
+        self.deltas = {}
+        self._verrou = threading.Lock()
+
+    def calcule(self, v):
+        """Comme process_vector(v, niveau="detail")"""
+        with self._verrou:
+            if self.t is None:
+                self.t = self.graphe.evalue(v)
+                self.deltas = {}
+                return self.graphe.resultat(self.t)
+
+            t = self.t
+            masque = 0
+            for slot, (avant, apres) in enumerate(zip(t, v)):
+                if avant != apres:
+                    masque |= 1 << slot
+                    t[slot] = float(apres)
+            if masque:
+                termes = [
+                    (nom, k)
+                    for nom, k in self.graphe.termes.items()
+                    if self.graphe.masques[k] & masque
+                ]
+                avant = [t[k] for _, k in termes]
+                self.graphe.recalcul(masque)(t)
+                self.deltas = {
+                    nom: (a, t[k]) for (nom, k), a in zip(termes, avant) if t[k] != a
+                }
+            else:
+                self.deltas = {}
+            return self.graphe.resultat(t)
+
+    def balayage(self, v, slot, valeurs, sortie="cout_par_naissance"):
+        """Valeurs du terme sortie quand l'hypothèse slot parcourt valeurs,
+        les autres restant à v (analyse un facteur à la fois) ; seuls les
+        noeuds qui dépendent de slot sont recalculés à chaque point"""
+        t = self.graphe.evalue(v)
+        recalcul = self.graphe.recalcul(1 << slot)
+        noeud = self.graphe.termes[sortie]
+        resultats = []
+        for valeur in valeurs:
+            t[slot] = float(valeur)
+            recalcul(t)
+            resultats.append(t[noeud])
+        return resultats
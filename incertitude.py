@@ -0,0 +1,94 @@
+import numpy as np
+
+from model import process_values_sensi_batch
+
+N_TIRAGES = 50000
+N_BARRES = 50
+
+# Loi de tirage de chaque variable entre ses bornes mini / maxi :
+# - "pert" : loi bêta-PERT centrée sur la valeur choisie (par défaut)
+# - "triangulaire" : loi triangulaire de mode la valeur choisie
+# - "uniforme" : loi uniforme entre mini et maxi
+# - "fixe" : la variable garde la valeur choisie
+LOIS = ["pert", "triangulaire", "uniforme", "fixe"]
+LOI_DEFAUT = "pert"
+distributions = {}
+
+
+def tirer_hypotheses(df_variables, valeurs, n_tirages, lois=None, seed=0):
+    """Tire n_tirages jeux d'hypothèses dans les intervalles [mini, maxi]
+
+    df_variables : df avec les infos sur les variables
+    valeurs : valeurs choisies pour chaque variable (mode des lois)
+    lois : dict nom_variable -> loi, complète distributions
+
+    Retourne un array (n_tirages, 55) utilisable par process_values_batch"""
+
+    lois = {**distributions, **(lois or {})}
+    rng = np.random.default_rng(seed)
+
+    mini = df_variables["mini"].values.astype(float)
+    maxi = df_variables["maxi"].values.astype(float)
+    mode = np.clip(np.asarray(valeurs, dtype=float), mini, maxi)
+    loi_variables = np.array(
+        [lois.get(nom, LOI_DEFAUT) for nom in df_variables["nom_variable"]]
+    )
+
+    inconnues = set(loi_variables) - set(LOIS)
+    if inconnues:
+        raise ValueError(f"Lois inconnues : {sorted(inconnues)}, attendues : {LOIS}")
+
+    X = np.empty((n_tirages, len(mode)))
+    X[:] = mode
+
+    cols = np.flatnonzero(loi_variables == "pert")
+    if len(cols):
+        a, b, m = mini[cols], maxi[cols], mode[cols]
+        alpha = 1 + 4 * (m - a) / (b - a)
+        beta = 1 + 4 * (b - m) / (b - a)
+        X[:, cols] = a + (b - a) * rng.beta(alpha, beta, size=(n_tirages, len(cols)))
+
+    cols = np.flatnonzero(loi_variables == "triangulaire")
+    if len(cols):
+        X[:, cols] = rng.triangular(
+            mini[cols], mode[cols], maxi[cols], size=(n_tirages, len(cols))
+        )
+
+    cols = np.flatnonzero(loi_variables == "uniforme")
+    if len(cols):
+        X[:, cols] = rng.uniform(mini[cols], maxi[cols], size=(n_tirages, len(cols)))
+
+    return X
+
+
+def compute_incertitude(
+    df_variables, valeurs, n_naissances, n_tirages=N_TIRAGES, lois=None, seed=0
+):
+    """Distribution du coût total annuel sur n_tirages jeux d'hypothèses
+
+    Retourne un dict avec la médiane, l'intervalle 5-95 % et l'histogramme
+    (effectifs, bornes) du coût total"""
+
+    X = tirer_hypotheses(df_variables, valeurs, n_tirages, lois, seed)
+    cout_total = process_values_sensi_batch(X) * n_naissances
+
+    p5, mediane, p95 = np.percentile(cout_total, [5, 50, 95])
+    effectifs, bornes = np.histogram(cout_total, bins=N_BARRES)
+
+    return {
+        "mediane": mediane,
+        "p5": p5,
+        "p95": p95,
+        "effectifs": effectifs,
+        "bornes": bornes,
+    }
+
+
+def multiplie_naissances(resultat, n_naissances):
+    """Résultat de compute_incertitude pour une naissance ramené à
+    n_naissances : le coût total est proportionnel au nombre de naissances,
+    les effectifs de l'histogramme ne changent pas"""
+    return {
+        cle: np.asarray(valeur) * (1 if cle == "effectifs" else n_naissances)
+        for cle, valeur in resultat.items()
+    }
@@ -0,0 +1,765 @@
+# DASH IMPORTS
+import dash_core_components as dcc
+import dash_bootstrap_components as dbc
+import dash_html_components as html
+import dash_table as dt
+
+# LOCAL IMPORTS
+from utils import make_group, generate_popovers, make_badge
+from utils import make_card_repartition, generate_form_naissances
+from utils import make_pie, compute_dataframes
+from utils import get_pitch, generate_item
+from model import df_variables, parametres
+from territoires import recherche_territoires
+from prevention import lignes_interventions
+
+# CSS SETTINGS
+eq_width = {"width": "25%", "text-align": "center", "font-weight": "bold"}
+tt = {"always_visible": False, "placement": "topLeft"}
+
+
+# DEPRESSION
+items_depression_mere = generate_item(df_variables, "depression_mere")
+items_depression_bebe = generate_item(df_variables, "depression_bebe")
+
+
+# ANXIETE
+items_anxiete_mere = generate_item(df_variables, "anxiete_mere")
+items_anxiete_bebe = generate_item(df_variables, "anxiete_bebe")
+
+
+# PSYCHOSE
+items_psychose_mere = generate_item(df_variables, "psychose_mere")
+items_psychose_bebe = generate_item(df_variables, "psychose_bebe")
+
+
+# MEDICAL ET ECONOMIQUE
+items_economique = generate_item(df_variables, "economique")
+items_medical = generate_item(df_variables, "medical")
+
+
+tabs_variables = dbc.Tabs(
+    [
+        dbc.Tab(
+            make_group("Variables médicales", items_medical, "Variables-Médicales"),
+            label="Variables médicales",
+            tab_style=eq_width,
+        ),
+        dbc.Tab(
+            make_group(
+                "Variables économiques", items_economique, "Variables-Economiques"
+            ),
+            label="Variables économiques",
+            tab_style=eq_width,
+        ),
+    ],
+)
+
+tabs_maladies = dbc.Tabs(
+    [
+        dbc.Tab(
+            [
+                make_group(
+                    "Coûts pour la mère", items_depression_mere, "Dépression-Mère"
+                ),
+                html.Hr(),
+                make_group(
+                    "Coûts pour le bébé", items_depression_bebe, "Dépression-Bébé"
+                ),
+            ],
+            label="Dépression de la mère",
+            tab_style=eq_width,
+        ),
+        dbc.Tab(
+            [
+                make_group("Coûts pour la mère", items_anxiete_mere, "Anxiété-Mère"),
+                html.Hr(),
+                make_group("Coûts pour le bébé", items_anxiete_bebe, "Anxiété-Bébé"),
+            ],
+            label="Anxiété de la mère",
+            tab_style=eq_width,
+        ),
+        dbc.Tab(
+            [
+                make_group("Coûts pour la mère", items_psychose_mere, "Psychose-Mère"),
+                html.Hr(),
+                make_group("Coûts pour le bébé", items_psychose_bebe, "Psychose-Bébé"),
+            ],
+            label="Psychose de la mère",
+            tab_style=eq_width,
+        ),
+    ],
+)
+
+
+lien_article_site = "http://alliance-psyperinat.org/2020/04/28/rapport-da-bauer-lse/"
+lien_nhs = (
+    "https://www.england.nhs.uk/2018/02/funding-boost-for-new-mums-mental-health/"
+)
+lien_nhs_2 = "https://www.england.nhs.uk/2016/02/fyfv-mh/"
+lien_nhs_3 = "https://www.england.nhs.uk/wp-content/uploads/2016/02/Mental-Health-Taskforce-FYFV-final.pdf"
+lien_govuk = (
+    "https://www.gov.uk/government/news/new-investment-in-mental-health-services"
+)
+
+
+pitch = get_pitch()
+
+mode_demploi_text = {
+    "mode_demploi_1": "Premièrement, il vous faudra choisir l’échelle à laquelle vous voulez évaluer le coût des maladies périnatales. Il est possible de choisir la France, l’une des 12 régions, l’un des 100 départements, l’une des 200 plus grandes villes ou l'une des 577 circonscriptions. Lorsque vous sélectionnez un territoire, le nombre de naissances en 2018 sur le territoire apparaît à droite. Vous pouvez toujours modifier directement ce chiffre à la main.",
+    "mode_demploi_2": "Vous pouvez alors cliquer sur Générer l'analyse, et voir les premiers résultats ! Une interface récapitulative des coûts à votre échelle et avec vos hypothèses apparaîtra : c’est le coût engendré par les maladies psychiques périnatales",
+    "mode_demploi_3": "Deuxièmement, si vous souhaitez aller plus loin dans l'estimation des coûts, vous pouvez ajuster les principales variables qui influent sur notre estimation. En effet, celle-ci est fondée sur des hypothèses (les plus crédibles selon nous), mais il vous est possible de les ajuster pour refléter au mieux vos convictions et vos questions. Par exemple, il est difficile de connaître précisément la prévalence de la dépression périnatale en France, mais les estimations communément admises sont de 10%. Libre à vous de modifier la valeur si vous pensez que cette estimation est différente de la votre.",
+    "mode_demploi_4": "Troisièmement, si vous souhaitez plonger en détail dans l’utilisation de l’outil, il est possible de modifier toutes les hypothèses initiales de l'article, mais celles-ci sont plus techniques. Par exemple, vous aurez la possibilité de modifier le coût d’une hospitalisation liée à une dépression, ou encore les coûts supplémentaires pour la santé, l'éducation voire la justice des troubles du comportement liés à l’anxiété périnatale.",
+    "mode_demploi_5": "Tout au long de votre parcours, n’hésitez pas à cliquer sur les petits points d’interrogation, ils vous donneront des informations supplémentaires.",
+}
+
+mode_demploi = html.Div(
+    [
+        html.Div(
+            html.Ul(
+                [
+                    html.Li(html.Span(parag), style={"margin": "0 0 0.7em 0"})
+                    for parag in mode_demploi_text.values()
+                ],
+                style={
+                    "list-style-position": "outside",
+                    "text-align": "justify",
+                    "font-size": "1.2em",
+                },
+            ),
+        ),
+    ],
+    style={
+        "border": "1px solid black",
+        "padding": "1.5em 1.5em 1.5em 1.5em",
+        "border-radius": "3px",
+    },
+)
+
+
+presentation_alliance_1 = "L’Alliance francophone pour la santé mentale périnatale ambitionne de regrouper le plus grand nombre d’associations nationales d’usager.e.s et de sociétés savantes pour plaider à tout moment et en tout lieu pour une authentique priorisation dans toutes les politiques publiques de la période périnatale, et plus particulièrement de sa dimension psychique. "
+
+presentation_alliance_2 = "Elle n’est, à ce jour, ni une société scientifique de plus, ni une association, ni une fédération. "
+
+presentation_alliance_3 = "Les (futurs) bébés et les (futurs) parents méritent une attention soutenue, au-delà de leurs proches, de la part de toute la société, attention qui commence par celle de l’ensemble des professionnels actifs dans cette période. Rassemblant des personnes morales, elle est rendue possible par l’engagement citoyen de tout membre de ses associations et sociétés. "
+
+qui_sommes_nous = html.Div(
+    [
+        html.Div(
+            # "L'Alliance Francophone de Santé Mentale Périnatale est ",
+            [
+                html.Div(txt, style={"padding": "0 0 0.6em 0"})
+                for txt in [
+                    presentation_alliance_1,
+                    presentation_alliance_2,
+                    presentation_alliance_3,
+                ]
+            ],
+            style={"font-size": "1.2em", "text-align": "justify"},
+        )
+    ],
+    style={
+        "border": "1px solid black",
+        "padding": "1.5em 1.5em 1.5em 1.5em",
+        "border-radius": "3px",
+    },
+)
+
+telechargement_rapport = html.Div(
+    [
+        html.Div(
+            [
+                # html.Li(
+                #     "Test Téléchargement rapport FR"
+                # ),
+                html.Div(
+                    dbc.Button(
+                        "Rapport traduit en français",
+                        id="rapportbauer-fr-download",
+                        href="http://alliance-psyperinat.org/wp-content/uploads/2020/10/Article-Bauer-et-al-traduction-franc%CC%A7aise.pdf",
+                        target="_blank",
+                        color="secondary",
+                        outline=True,
+                        style={"display": "flex", "justify-content": "center"},
+                    )
+                ),
+                # html.Li(
+                #           "Test Téléchargement rapport EN"
+                #       ),
+                html.Hr(),
+                html.Div(
+                    dbc.Button(
+                        "Rapport original en anglais",
+                        id="rapportbauer-en-download",
+                        href="http://alliance-psyperinat.org/wp-content/uploads/2020/04/LSE-%C3%A9tude-de-co%C3%BBts-1.pdf",
+                        target="_blank",
+                        color="secondary",
+                        outline=True,
+                        style={"display": "flex", "justify-content": "center"},
+                    )
+                ),
+            ]
+        ),
+    ],
+    style={
+        "border": "1px solid black",
+        "padding": "1.5em 1.5em 1.5em 1.5em",
+        "border-radius": "3px",
+    },
+)
+
+tabs_intro = dbc.Tabs(
+    [
+        dbc.Tab(
+            pitch,
+            label="Raison d'être",
+            tab_style=eq_width,
+        ),
+        dbc.Tab(
+            mode_demploi,
+            label="Mode d'emploi",
+            tab_style=eq_width,
+        ),
+        dbc.Tab(
+            qui_sommes_nous,
+            label="Qui sommes-nous ?",
+            tab_style=eq_width,
+        ),
+        dbc.Tab(
+            telechargement_rapport,
+            label="Télécharger le rapport",
+            tab_style=eq_width,
+        ),
+    ],
+)
+
+tabs_intro_title = html.Div(
+    [html.H3("Introduction à l'outil", style={"color": "#8ec63f"}), tabs_intro]
+)
+
+
+button_generate = dbc.Button(
+    "Générer l'analyse !",
+    color="primary",
+    block=True,
+    id="button-generate",
+    size="lg",
+)
+
+button_adjust = dbc.Button(
+    "Ajuster l'analyse !",
+    color="primary",
+    block=True,
+    id="button-adjust",
+    size="lg",
+)
+
+
+logo_alliance = "http://alliancefrancophonepourlasantementaleperinatale.com/wp-content/uploads/2020/03/cropped-cropped-cropped-alliance-francaise-AFSMP-2-1-300x246.png"
+
+navbar = dbc.Navbar(
+    [
+        html.A(
+            dbc.Row(
+                [
+                    dbc.Col(html.Img(src=logo_alliance, height="70px")),
+                    dbc.Col(dbc.NavbarBrand("Outil Psypérinathon")),
+                ],
+                align="center",
+                no_gutters=False,
+            ),
+            href="http://alliance-psyperinat.org/",
+            target="_blank",
+            style={"float": "left"},
+        ),
+        html.A(
+            "Alliance francophone pour la santé mentale périnatale",
+            href="http://alliance-psyperinat.org/",
+            target="_blank",
+            style={"margin-left": "auto", "margin-right": "0", "color": "black"},
+        ),
+    ],
+    color="#1b75bc",
+    light=True,
+    sticky="top",
+    style={"width": "100%", "float": "left"},
+)
+
+
+form_naissances = generate_form_naissances(recherche_territoires())
+
+title = html.H1(
+    "Estimer le coût des maladies psypérinatales",
+    style={"padding": "3em 0 0.5em 0", "text-align": "center", "color": "#1b75bc"},
+)
+
+tabs_and_title_variables = html.Div(
+    [
+        html.H2(
+            "Deuxième étape : ajustement des variables principales",
+            style={"color": "#8ec63f"},
+        ),
+        tabs_variables,
+    ],
+    style={"padding": "0.5em 0 0.5em 0"},
+)
+
+tabs_and_title_maladies = html.Div(
+    [
+        html.H2(
+            "Troisième étape : pour aller plus loin...", style={"color": "#8ec63f"}
+        ),
+        tabs_maladies,
+    ],
+    style={"padding": "0.5em 0 0.5em 0"},
+)
+
+pp_tableaux = dbc.Popover(
+    [
+        dbc.PopoverHeader("Coût par cas / coût par naissance"),
+        dbc.PopoverBody(
+            [
+                html.Span("Le "),
+                html.Span("coût par cas", style={"font-weight": "bold"}),
+                html.Span(
+                    " désigne l’ensemble des coûts inhérents à l’occurence chez une mère d’une des trois maladies. "
+                ),
+                html.Br(),
+                html.Span("Le "),
+                html.Span("coût par naissance", style={"font-weight": "bold"}),
+                html.Span(
+                    " désigne le coût total rapporté au nombre de naissances, c’est-à-dire combien coûte "
+                ),
+                html.Span("en moyenne", style={"font-style": "italic"}),
+                html.Span(" les maladies. "),
+            ]
+        ),
+    ],
+    id={"type": "popover", "index": "cout-cas"},
+    target="badge-cout-cas",
+    is_open=False,
+)
+
+question_mark_tableaux = make_badge("cout-cas")
+
+# hypothèses les plus influentes, calculées dans le navigateur à chaque
+# mouvement des sliders (clientside.export_callback_elasticites)
+COLONNES_ELASTICITES = {
+    "hypothese": "Hypothèse",
+    "elasticite": "Élasticité",
+    "effet": "Effet d'une hausse de 10 % sur le coût annuel",
+}
+
+elasticites = html.Div(
+    [
+        html.H4("Les hypothèses qui comptent le plus ici"),
+        html.P(
+            "Élasticité : variation en % du coût total pour une hausse de 1 % "
+            "de l'hypothèse, les autres restant fixées.",
+            style={"font-style": "italic"},
+        ),
+        dt.DataTable(
+            id="table-elasticites",
+            columns=[
+                {"name": nom, "id": id_colonne}
+                for id_colonne, nom in COLONNES_ELASTICITES.items()
+            ],
+            style_cell={"text-align": "left"},
+            style_as_list_view=True,
+        ),
+    ],
+    style={"padding": "0 0 1em 0"},
+)
+
+sensibilite = html.Div(
+    [
+        html.H3("Analyse de sensibilité", style={"color": "#8ec63f"}),
+        elasticites,
+        dbc.Button(
+            "Afficher l'analyse de sensibilité",
+            color="secondary",
+            outline=True,
+            id="button-sensibilite",
+        ),
+        dbc.Collapse(
+            [
+                dbc.Row(
+                    [
+                        dbc.Col([dcc.Graph(id="graph-sensibilite")], width=8),
+                        dbc.Col([dcc.Graph(id="graph-sensibilite-categorie")], width=4),
+                    ]
+                ),
+                dbc.Row([dbc.Col([dcc.Graph(id="graph-sobol")])]),
+            ],
+            id="collapse-sensibilite",
+        ),
+    ],
+    style={"padding": "0.5em 0 0.5em 0"},
+)
+
+
+# etat initial du coût total, de la carte et du camembert, mis à jour ensuite
+# dans le navigateur
+_, df_par_naissance_initial, df_repartition_initial, _ = compute_dataframes(
+    parametres.defaut, None
+)
+proportion_mere_initiale = (
+    100
+    * df_par_naissance_initial["Mère"].sum()
+    / (df_par_naissance_initial["Mère"].sum() + df_par_naissance_initial["Bébé"].sum())
+)
+
+graphiques = dbc.Row(
+    [
+        dbc.Col(
+            [
+                html.H4(
+                    f"A l'échelle de ce territoire, les coûts associés aux problèmes de santé mentale périnatale représentent chaque année :",
+                    style={"text-align": "center"},
+                ),
+                html.H1(id="total-couts", style={"text-align": "center"}),
+                dbc.Checklist(
+                    options=[{"label": "Mode incertitude", "value": "incertitude"}],
+                    value=[],
+                    switch=True,
+                    id="switch-incertitude",
+                    style={"text-align": "center"},
+                ),
+                html.Div(id="texte-incertitude", style={"text-align": "center"}),
+            ],
+            style={"border": "0px solid black", "padding": "10% 2% 0 0"},
+        ),
+        dbc.Col(
+            [html.Div(make_card_repartition(proportion_mere_initiale), id="draw1")],
+            style={"border": "0px solid black", "padding": "5% 0 0 2%"},
+        ),
+        dbc.Col(
+            [
+                dcc.Graph(
+                    id="example-graph-pie", figure=make_pie(df_repartition_initial)
+                )
+            ],
+            style={"border": "0px solid black", "padding": "5% 0 0 0"},
+        ),
+    ],
+)
+
+# ids courts : ils sont répétés à chaque ligne des données de la table
+COLONNES_CLASSEMENT = {
+    "nom": "Nom de l'échelon",
+    "naissances": "Nombre de naissances (2018)",
+    "total": "Coût total",
+    "par_naissance": "Coût par naissance",
+    "mere": "Mère",
+    "bebe": "Bébé",
+}
+
+classement_territoires = html.Div(
+    [
+        html.H3("Comparaison des territoires", style={"color": "#8ec63f"}),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="dd-classement-echelon",
+                        options=[
+                            {"label": e, "value": e}
+                            for e in recherche_territoires()
+                            .bdd_naissances["Echelon"]
+                            .unique()
+                        ],
+                        value="Département",
+                        clearable=False,
+                    ),
+                    width=3,
+                ),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="dd-classement-colonne",
+                        options=[
+                            {"label": c, "value": c}
+                            for c in ["Coût total", "Coût par naissance"]
+                        ],
+                        value="Coût total",
+                        clearable=False,
+                    ),
+                    width=3,
+                ),
+                dbc.Col(
+                    dbc.Input(
+                        id="classement-n", type="number", min=1, step=1, value=20
+                    ),
+                    width=2,
+                ),
+            ],
+            style={"padding": "0 0 1em 0"},
+        ),
+        dt.DataTable(
+            id="table-territoires",
+            columns=[
+                {"name": nom, "id": id_colonne}
+                for id_colonne, nom in COLONNES_CLASSEMENT.items()
+            ],
+            style_cell={"text-align": "left"},
+            style_as_list_view=True,
+        ),
+    ],
+    style={"padding": "0.5em 0 0.5em 0"},
+)
+
+bibliotheque_scenarios = html.Div(
+    [
+        html.H3("Bibliothèque de scénarios", style={"color": "#8ec63f"}),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.Input(id="nom-scenario", placeholder="Nom du scénario"),
+                    width=4,
+                ),
+                dbc.Col(
+                    dbc.Input(id="proprietaire-scenario", placeholder="Auteur"),
+                    width=3,
+                ),
+                dbc.Col(
+                    dbc.Button(
+                        "Enregistrer les hypothèses",
+                        color="secondary",
+                        outline=True,
+                        id="button-enregistrer-scenario",
+                    ),
+                    width=3,
+                ),
+            ],
+            style={"padding": "0 0 0.5em 0"},
+        ),
+        html.Div(id="message-scenario", style={"font-style": "italic"}),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="dd-scenarios",
+                        multi=True,
+                        placeholder="Rechercher un scénario enregistré",
+                    ),
+                    width=7,
+                ),
+                dbc.Col(
+                    dbc.Button(
+                        "Charger",
+                        color="secondary",
+                        outline=True,
+                        id="button-charger-scenario",
+                    ),
+                    width=2,
+                ),
+                dbc.Col(
+                    dbc.Button(
+                        "Comparer",
+                        color="secondary",
+                        outline=True,
+                        id="button-comparer-scenarios",
+                    ),
+                    width=2,
+                ),
+            ],
+            style={"padding": "0.5em 0 1em 0"},
+        ),
+        dt.DataTable(
+            id="table-comparaison",
+            style_cell={"text-align": "left"},
+            style_as_list_view=True,
+        ),
+    ],
+    style={"padding": "0.5em 0 0.5em 0"},
+)
+
+# une ligne par effet d'une intervention, comme dans interventions.csv
+COLONNES_INTERVENTIONS = {
+    "intervention": "Intervention",
+    "cout_par_naissance": "Coût par naissance couverte (€)",
+    "variable": "Hypothèse modifiée",
+    "effet": "Effet à couverture totale (%)",
+}
+
+prevention = html.Div(
+    [
+        html.H3("Prévention : où investir ?", style={"color": "#8ec63f"}),
+        html.P(
+            "Répartition d'un budget annuel entre des interventions de "
+            "prévention, pour les hypothèses et le territoire choisis. Les "
+            "interventions ci-dessous sont des exemples à adapter : coût par "
+            "naissance couverte et effet sur les hypothèses du modèle.",
+            style={"font-style": "italic"},
+        ),
+        dt.DataTable(
+            id="table-interventions",
+            columns=[
+                {"name": COLONNES_INTERVENTIONS["intervention"], "id": "intervention"},
+                {
+                    "name": COLONNES_INTERVENTIONS["cout_par_naissance"],
+                    "id": "cout_par_naissance",
+                    "type": "numeric",
+                },
+                {
+                    "name": COLONNES_INTERVENTIONS["variable"],
+                    "id": "variable",
+                    "presentation": "dropdown",
+                },
+                {
+                    "name": COLONNES_INTERVENTIONS["effet"],
+                    "id": "effet",
+                    "type": "numeric",
+                },
+            ],
+            data=[
+                {id_colonne: ligne[id_colonne] for id_colonne in COLONNES_INTERVENTIONS}
+                for ligne in lignes_interventions()
+            ],
+            dropdown={
+                "variable": {
+                    "options": [{"label": nom, "value": nom} for nom in parametres.noms]
+                }
+            },
+            editable=True,
+            row_deletable=True,
+            style_cell={"text-align": "left"},
+            style_as_list_view=True,
+        ),
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.Button(
+                        "Ajouter un effet",
+                        color="secondary",
+                        outline=True,
+                        id="button-ajout-intervention",
+                    ),
+                    width=2,
+                ),
+                dbc.Col(
+                    dbc.Input(
+                        id="budget-prevention",
+                        type="number",
+                        min=0,
+                        placeholder="Budget annuel (€), sans limite si vide",
+                    ),
+                    width=4,
+                ),
+                dbc.Col(
+                    dbc.Button(
+                        "Optimiser",
+                        color="secondary",
+                        outline=True,
+                        id="button-prevention",
+                    ),
+                    width=2,
+                ),
+            ],
+            style={"padding": "1em 0 1em 0"},
+        ),
+        html.Div(id="texte-prevention"),
+        dbc.Row(
+            [
+                dbc.Col([dcc.Graph(id="graph-frontiere")], width=7),
+                dbc.Col(
+                    [
+                        dt.DataTable(
+                            id="table-allocation",
+                            columns=[
+                                {"name": "Intervention", "id": "intervention"},
+                                {"name": "Couverture", "id": "couverture"},
+                                {"name": "Dépense", "id": "depense"},
+                            ],
+                            style_cell={"text-align": "left"},
+                            style_as_list_view=True,
+                        )
+                    ],
+                    width=5,
+                ),
+            ]
+        ),
+    ],
+    style={"padding": "0.5em 0 0.5em 0"},
+)
+
+permalien = dbc.Row(
+    [
+        dbc.Col(
+            dbc.Button(
+                "Lien à partager",
+                color="secondary",
+                outline=True,
+                id="button-permalien",
+            ),
+            width=2,
+        ),
+        dbc.Col(dbc.Input(id="lien-permalien", type="url"), width=10),
+    ],
+    style={"padding": "0 0 1em 0"},
+)
+
+charts_coll = dbc.Collapse(
+    [
+        html.H3("Principaux enseignements", style={"color": "#8ec63f"}),
+        permalien,
+        graphiques,
+        dbc.Collapse(
+            [dcc.Graph(id="histogramme-incertitude")],
+            id="collapse-incertitude",
+        ),
+        html.H3(
+            ["Tableaux récapitulatifs  ", question_mark_tableaux],
+            style={"color": "#8ec63f"},
+        ),
+        dbc.Row([dbc.Col([html.Div(id="table1")]), dbc.Col([html.Div(id="table2")])]),
+        html.Hr(),
+        sensibilite,
+        html.Hr(),
+        classement_territoires,
+        html.Hr(),
+        bibliotheque_scenarios,
+        html.Hr(),
+        prevention,
+        html.Hr(),
+        tabs_and_title_variables,
+        html.Hr(),
+        tabs_and_title_maladies,
+        html.Hr(),
+        button_adjust,
+        html.Hr(),
+    ],
+    id="collapsed-graphs",
+)
+
+
+layout = html.Div(
+    [
+        # lien permanent (?s=...) : permaliens.py
+        dcc.Location(id="url", refresh=False),
+        dcc.Store(id="permalien-applique"),
+        # compteur des hypothèses chargées (territoire, lien, scénario) :
+        # déclenche le calcul des tableaux de coûts
+        dcc.Store(id="hypotheses-chargees"),
+        navbar,
+        dbc.Container(
+            [
+                title,
+                html.Hr(),
+                tabs_intro_title,
+                # pitch,
+                html.Hr(),
+                # mode_demploi,
+                html.Hr(),
+                form_naissances,
+                html.Hr(),
+                button_generate,
+                html.Hr(),
+                charts_coll,
+                html.Hr(),
+            ]
+            + generate_popovers()
+            + [pp_tableaux],
+            id="main-container",
+        ),
+    ]
+)
@@ -0,0 +1,155 @@
+"""Métriques au format texte Prometheus (/metrics) et en-tête Server-Timing
+
+Les compteurs et histogrammes sont propres à chaque processus : avec
+plusieurs workers gunicorn, chaque scrape ne voit que le worker qui répond
+(label pid pour les distinguer). Les hits / misses du cache viennent de la
+base SQLite, partagée entre les workers."""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import flask
+
+# bornes des histogrammes de durée, en secondes
+BORNES = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5]
+
+_verrou = threading.Lock()
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Compteur:
+    def __init__(self, nom, aide):
+        self.nom = nom
+        self.aide = aide
+        self.valeurs = {}
+
+    def incremente(self, valeur=1, **labels):
+        cle = tuple(sorted(labels.items()))
+        with _verrou:
+            self.valeurs[cle] = self.valeurs.get(cle, 0) + valeur
+
+    def expose(self):
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} counter"]
+        for cle, valeur in sorted(self.valeurs.items()):
+            lignes.append(f"{self.nom}{_labels(dict(cle))} {valeur}")
+        return lignes
+
+
+class Histogramme:
+    def __init__(self, nom, aide, bornes=BORNES):
+        self.nom = nom
+        self.aide = aide
+        self.bornes = bornes
+        # labels -> [effectif par intervalle (+Inf en dernier), somme]
+        self.valeurs = {}
+
+    def observe(self, valeur, **labels):
+        cle = tuple(sorted(labels.items()))
+        with _verrou:
+            effectifs, somme = self.valeurs.get(cle, ([0] * (len(self.bornes) + 1), 0))
+            effectifs[bisect.bisect_left(self.bornes, valeur)] += 1
+            self.valeurs[cle] = (effectifs, somme + valeur)
+
+    def expose(self):
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} histogram"]
+        for cle, (effectifs, somme) in sorted(self.valeurs.items()):
+            labels = dict(cle)
+            cumul = 0
+            for borne, effectif in zip(self.bornes + ["+Inf"], effectifs):
+                cumul += effectif
+                le = _labels({**labels, "le": borne})
+                lignes.append(f"{self.nom}_bucket{le} {cumul}")
+            lignes.append(f"{self.nom}_sum{_labels(labels)} {somme}")
+            lignes.append(f"{self.nom}_count{_labels(labels)} {cumul}")
+        return lignes
+
+
+requetes = Compteur(
+    "psyperinathon_requetes_total", "Requêtes HTTP par route et code de réponse"
+)
+duree_requetes = Histogramme(
+    "psyperinathon_requete_duree_secondes", "Durée des requêtes HTTP par route"
+)
+duree_etapes = Histogramme(
+    "psyperinathon_etape_duree_secondes",
+    "Durée des étapes des callbacks (compute_costs.modele...)",
+)
+
+
+@contextmanager
+def etape(nom):
+    """Chronomètre un bloc : la durée va dans duree_etapes et, pendant une
+    requête, dans son en-tête Server-Timing"""
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree = time.perf_counter() - debut
+        duree_etapes.observe(duree, etape=nom)
+        if flask.has_request_context():
+            flask.g.setdefault("etapes", []).append((nom, duree))
+
+
+def _route():
+    regle = flask.request.url_rule
+    return regle.rule if regle is not None else "inconnue"
+
+
+def init_metriques(server, cache=None):
+    """Route /metrics, comptage et durée des requêtes, en-tête Server-Timing
+
+    À appeler avant init_statique : les réponses servies depuis son cache le
+    sont dans un before_request, qui court-circuite ceux ajoutés après lui"""
+
+    pid = str(os.getpid())
+
+    @server.before_request
+    def debut_requete():
+        flask.g.debut_requete = time.perf_counter()
+
+    @server.after_request
+    def fin_requete(reponse):
+        debut = flask.g.get("debut_requete")
+        if debut is None:
+            return reponse
+        duree = time.perf_counter() - debut
+        route = _route()
+        requetes.incremente(route=route, code=reponse.status_code, pid=pid)
+        duree_requetes.observe(duree, route=route, pid=pid)
+
+        etapes = flask.g.get("etapes", [])
+        reponse.headers["Server-Timing"] = ", ".join(
+            [f"{nom};dur={1000 * d:.2f}" for nom, d in etapes]
+            + [f"total;dur={1000 * duree:.2f}"]
+        )
+        return reponse
+
+    @server.route("/metrics")
+    def metrics():
+        lignes = requetes.expose() + duree_requetes.expose() + duree_etapes.expose()
+        if cache is not None:
+            stats = cache.stats()
+            nom = "psyperinathon_cache_requetes_total"
+            lignes += [
+                f"# HELP {nom} Lectures du cache de résultats (tous workers)",
+                f"# TYPE {nom} counter",
+                f'{nom}{{resultat="hit"}} {stats["hits"]}',
+                f'{nom}{{resultat="miss"}} {stats["misses"]}',
+                "# HELP psyperinathon_cache_taux_hits Part des lectures trouvées",
+                "# TYPE psyperinathon_cache_taux_hits gauge",
+                f"psyperinathon_cache_taux_hits {stats['taux_hits']}",
+                "# HELP psyperinathon_cache_entrees Entrées du cache de résultats",
+                "# TYPE psyperinathon_cache_entrees gauge",
+                f"psyperinathon_cache_entrees {stats['taille']}",
+            ]
+        return flask.Response(
+            "\n".join(lignes) + "\n", mimetype="text/plain; version=0.0.4"
+        )
@@ -1,12 +1,11 @@
+import math
+from array import array
+
 import pandas as pd
 import numpy as np
 
 
-def val(df, col):
-    return df.loc[col][-1]
-
-
-def get_revenu_moyen_femme(df):
+def get_revenu_moyen_femme(v):
     """return (
         val(df, "Revenu hebdomadaire moyen d'une femme")
         * val(df, "Part des femmes employées avant la naissance")
@@ -17,658 +16,503 @@ def get_revenu_moyen_femme(df):
         * 0.5
     )"""
 
-    return val(df, "Revenu horaire moyen d'une femme") * 35 * 0.74 * 0.75 * 0.60
-
-
-def process_values(df_variables, depression=True, anxiete=True, psychose=True):
-
-    if "nom_variable" in df_variables.columns:
-        df_variables = df_variables.set_index("nom_variable")
-
-    revenu_moyen_hebdo_femme_post_naissance = get_revenu_moyen_femme(df_variables)
-    print(revenu_moyen_hebdo_femme_post_naissance)
-
-    if depression:
-        # DEPRESSION MERE
-        cdmsp_sante_social = val(
-            df_variables,
-            "Coûts attribuables à dépréssion périnatale pour le secteur public",
-        )
-        cdmsoc_qaly = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Indice de perte de qualité de vie pour la dépression")
-            * val(df_variables, "Valeur d'une année de QALY")
-        )
-
-        cdmsoc_perte_prod = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Réduction des semaines de travail chaque année")
-            * revenu_moyen_hebdo_femme_post_naissance
-        )
-
-        # DEPRESSION BEBE
-        # Secteur Public
-        cdbsp_sante_social = (
-            val(
-                df_variables,
-                "Coût pour la Sécu d'une naissance prématurée liée à la dépression maternelle",
-            )
-            + val(df_variables, "Coût des problèmes émotionnels pour le bébé")
-            + (
-                val(
-                    df_variables,
-                    "Probabilité supplémentaire de troubles du comportement",
-                )
-                / 100
-            )
-            * val(
-                df_variables, "Coût pour la Sécu des troubles du comportement par cas"
-            )
-        )
-
-        cdbsp_educ = val(df_variables, "Coûts supplémentaires pour l'éducation")
-        cdbsp_justice = val(df_variables, "Coût total pour la justice")
-
-        # Société
-        cdbsoc_qaly = (
-            -0
-            - 0
-            + val(
-                df_variables,
-                "Perte de qualité vie due à des troubles du comportement (en QALY)",
-            )
-            * val(df_variables, "Valeur d'une année de QALY")
-            * val(
-                df_variables, "Probabilité supplémentaire de troubles du comportement"
-            )
-            / 100
-            + val(
-                df_variables,
-                "Coûts supplémentaires des problèmes émotionnels (en QALY)",
-            )
-            + val(df_variables, "Probabilité supplémentaire de mort de l'enfant")
-            / 100
-            * val(df_variables, "Prix d'une vie")
-            * int(1e6)
-        )
-
-        cdbsoc_perte_prod = (
-            val(df_variables, "Coût en perte de productivité des problèmes émotionnels")
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(
-                df_variables, "Probabilité supplémentaire de troubles du comportement"
-            )
-            / 100
-            + val(df_variables, "Coût lié à l'abandon de l'école sans qualification")
-        )
-
-        cdbsoc_autres = (
-            val(df_variables, "Coût suppl total pour victimes crimes et délits par cas")
-            * val(
-                df_variables, "Probabilité supplémentaire de troubles du comportement"
-            )
-            / 100
-        )
-
-    if anxiete:
-        # ANXIETE MERE
-        camsp_sante_social = val(
-            df_variables, "Coût attribuable à l'anxiété périnat par femme chaque année"
-        ) * val(df_variables, "Durée moyenne de l'anxiété")
+    return v[slots["Revenu horaire moyen d'une femme"]] * 35 * 0.74 * 0.75 * 0.60
 
-        camsoc_qaly = (
-            val(df_variables, "Perte de qualité de vie pour la mère en cas d'anxiété")
-            * val(df_variables, "Durée moyenne de l'anxiété")
-            * val(df_variables, "Valeur d'une année de QALY")
-        )
 
-        camsoc_perte_prod = (
-            val(df_variables, "Nombre de semaines de travail perdues chaque année")
-            * revenu_moyen_hebdo_femme_post_naissance
-            * val(df_variables, "Durée moyenne de l'anxiété")
-        )
+# REGISTRE DES PARAMETRES
+BDD_VARIABLES = "resources/bdd_variables.csv"
+COL_TYPES = {"maxi": float, "mini": int, "val": float, "step": float}
 
-        # ANXIETE BEBE
-        cabsp_sante_social = (
-            val(df_variables, "Coût pour le service public d'une naissance prématurée")
-            * val(
-                df_variables, "Risque suppl. de naissance prématurée en cas d'anxiété"
-            )
-            / 100
-            + val(df_variables, "Coût des problèmes émotionnels en cas d'anxiété")
-            + val(
-                df_variables, "Coût pour la Sécu des troubles du comportement par cas"
-            )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-            + val(
-                df_variables,
-                "Coût pour le service public de douleur abdominale chronique pédiatrique par an",
-            )
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-            )
-            / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
-        )
 
-        cabsp_educ = val(df_variables, "Coût lié aux problèmes émotionnels si anxiété")
+class Parametres:
+    """Registre des variables du modèle : chaque nom_variable reçoit une fois
+    pour toutes une position fixe (slot) dans un vecteur de 55 flottants,
+    dans l'ordre de bdd_variables.csv"""
 
-        cabsp_justice = (
-            val(
-                df_variables,
-                "Coût pour la justice des troubles du comportement par cas",
-            )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-        )
+    __slots__ = ("noms", "slots", "defaut", "mini", "maxi", "step", "categories")
 
-        cabsoc_qaly = (
-            val(df_variables, "Coût de perte de qualité de vie si anxiété (en QALY)")
-            + val(df_variables, "Coûts des problème emotionnels (en QALY)")
-            + val(df_variables, "Coûts des troubles du comportement par cas (en QALY)")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-        )
+    def __init__(self, df_variables):
+        self.noms = list(df_variables["nom_variable"])
+        self.slots = {nom: i for i, nom in enumerate(self.noms)}
+        self.defaut = df_variables["val"].values.astype(float)
+        self.mini = df_variables["mini"].values.astype(float)
+        self.maxi = df_variables["maxi"].values.astype(float)
+        self.step = df_variables["step"].values.astype(float)
+        self.categories = list(df_variables["category"])
 
-        cabsoc_perte_prod = (
-            val(
-                df_variables,
-                "Coût de pertes de productivité liées aux problèmes émotionnels",
-            )
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
-            / 100
-            + val(df_variables, "Coût lié aux douleurs abdominales chroniques")
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-            )
-            / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
-        )
+    def __len__(self):
+        return len(self.noms)
 
-        cabsoc_autres = val(
-            df_variables, "Coût suppl total pour victimes crimes et délits par cas"
-        ) * val(
-            df_variables, "Risque supplémentaire de troubles du comportement"
-        ) / 100 + (
-            val(df_variables, "Coût unpaid care douleurs abdo chroniques")
-            + val(df_variables, "Coût out-of-pocket lié douleurs abdo chroniques")
-        ) * val(
-            df_variables,
-            "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-        ) / 100 * val(
-            df_variables, "Durée moyenne des douleurs abdominales chroniques en année"
-        )
+    def vecteur(self, valeurs=None):
+        """Vecteur float64 (array('d')) des valeurs, dans l'ordre des slots ;
+        les valeurs par défaut si valeurs est None"""
+        return array("d", self.defaut if valeurs is None else valeurs)
 
-    if psychose:
-        # PSYCHOSE MERE
-        cpmsp_sante_social = val(df_variables, "Coût pour la Sécu d'une psychose")
-
-        cpmsoc_qaly = val(
-            df_variables, "Risque supplémentaire de suicide en cas de psychose"
-        ) / 100 * val(df_variables, "Prix d'une vie") * int(1e6) + val(
-            df_variables, "Perte de qualité de vie pour une psychose"
-        ) * val(
-            df_variables, "Durée moyenne d'une psychose"
-        ) * val(
-            df_variables, "Valeur d'une année de QALY"
-        )
+    def from_df(self, df_variables):
+        """Vecteur des valeurs d'un df de variables (dernière colonne, comme val)"""
+        if "nom_variable" in df_variables.columns:
+            df_variables = df_variables.set_index("nom_variable")
+        valeurs = df_variables.iloc[:, -1]
+        return array("d", valeurs.loc[self.noms].values.astype(float))
 
-        cpmsoc_perte_prod = (
-            val(df_variables, "Perte de productivité en cas d'épisode de schizophrènie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
 
-        cpmsoc_autres = (
-            val(df_variables, "Coût unpaid care en cas de schizophrénie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
+# seule lecture de bdd_variables.csv, partagée par l'app et le layout
+df_variables = pd.read_csv(BDD_VARIABLES, dtype=COL_TYPES)
+parametres = Parametres(df_variables)
+slots = parametres.slots
+nb_variables = len(parametres)
+slots_prevalences = [
+    slots["Prévalence de " + mal]
+    for mal in ["la dépression", "l'anxiété", "la psychose"]
+]
 
-        # PSYCHOSE BEBE
-        cpbsp_sante_social = (
-            val(df_variables, "Risque supplémentaire de naissance prématurée")
-            / 100
-            * val(
-                df_variables, "Coût pour le service public d'une naissance prématurée"
-            )
-        )
 
-        cpbsoc_qaly = (
-            val(df_variables, "Risque supplémentaire de mort de l'enfant")
-            / 100
-            * val(df_variables, "Prix d'une vie")
-            * int(1e6)
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
+# MOTEUR
+def _termes(v, depression=True, anxiete=True, psychose=True):
+    """Termes intermédiaires du modèle pour le vecteur d'hypothèses v, indexé
+    par slot : un vecteur de flottants, ou un array (55, n) pour n jeux
+    d'hypothèses à la fois. Seules les maladies actives sont calculées"""
 
-    # COUT DEPRESSION
-    cout_depression_mere_SP = cdmsp_sante_social
-    cout_depression_mere_SOC = cdmsoc_qaly + cdmsoc_perte_prod
-
-    cout_depression_bebe_SP = cdbsp_sante_social + cdbsp_educ + cdbsp_justice
-    cout_depression_bebe_SOC = cdbsoc_qaly + cdbsoc_perte_prod + cdbsoc_autres
-
-    # COUT ANXIETE
-    cout_anxiete_mere_SP = camsp_sante_social
-    cout_anxiete_mere_SOC = camsoc_qaly + camsoc_perte_prod
-
-    cout_anxiete_bebe_SP = cabsp_sante_social + cabsp_educ + cabsp_justice
-    cout_anxiete_bebe_SOC = cabsoc_qaly + cabsoc_perte_prod + cabsoc_autres
-
-    # COUT PSYCHOSE
-    cout_psychose_mere_SP = cpmsp_sante_social
-    cout_psychose_mere_SOC = cpmsoc_qaly + cpmsoc_perte_prod + cpmsoc_autres
-
-    cout_psychose_bebe_SP = cpbsp_sante_social
-    cout_psychose_bebe_SOC = cpbsoc_qaly
-
-    # COUT PAR MALADIE
-    cout_depression_mere = int(cout_depression_mere_SP + cout_depression_mere_SOC)
-    cout_depression_bebe = int(cout_depression_bebe_SP + cout_depression_bebe_SOC)
-
-    cout_anxiete_mere = int(cout_anxiete_mere_SP + cout_anxiete_mere_SOC)
-    cout_anxiete_bebe = int(cout_anxiete_bebe_SP + cout_anxiete_bebe_SOC)
-
-    cout_psychose_mere = int(cout_psychose_mere_SP + cout_psychose_mere_SOC)
-    cout_psychose_bebe = int(cout_psychose_bebe_SP + cout_psychose_bebe_SOC)
-
-    # TOTAL PAR MALADIE
-    cout_depression = cout_depression_mere + cout_depression_bebe
-    cout_anxiete = cout_anxiete_mere + cout_anxiete_bebe
-    cout_psychose = cout_psychose_mere + cout_psychose_bebe
-
-    couts = [
-        [
-            cout_depression_mere,
-            cout_depression_bebe,
-            cout_depression_mere + cout_depression_bebe,
-        ],
-        [cout_anxiete_mere, cout_anxiete_bebe, cout_anxiete_mere + cout_anxiete_bebe],
-        [
-            cout_psychose_mere,
-            cout_psychose_bebe,
-            cout_psychose_mere + cout_psychose_bebe,
-        ],
-    ]
+    def col(nom):
+        return v[slots[nom]]
 
-    df_par_cas = pd.DataFrame(
-        couts,
-        columns=["Mère", "Bébé", "Total"],
-        index=["Dépression périnatale", "Anxiété périnatale", "Psychose périnatale"],
-    )
+    termes = {}
 
-    # Calcul de la répartition des dépenses en fonction du secteur
-    total_sante_social = sum(
-        [
-            cdmsp_sante_social,
-            cdbsp_sante_social,
-            camsp_sante_social,
-            cabsp_sante_social,
-            cpmsp_sante_social,
-            cpbsp_sante_social,
-        ]
-    )
-    total_autre_servicepublic = sum(
-        [cdbsp_educ, cdbsp_justice, cabsp_educ, cabsp_justice]
+    revenu_moyen_hebdo_femme_post_naissance = get_revenu_moyen_femme(v)
+    qaly = col("Valeur d'une année de QALY")
+    prix_vie = col("Prix d'une vie")
+    cout_secu_comportement = col(
+        "Coût pour la Sécu des troubles du comportement par cas"
     )
-    total_societe_entiere = sum(
-        [
-            cout_depression_mere_SOC,
-            cout_depression_bebe_SOC,
-            cout_anxiete_mere_SOC,
-            cout_anxiete_bebe_SOC,
-            cout_psychose_mere_SOC,
-            cout_psychose_bebe_SOC,
-        ]
+    cout_prod_comportement = col(
+        "Coût en perte de productivité des troubles du comportement par cas"
     )
-
-    total_secteurs = (
-        total_sante_social + total_autre_servicepublic + total_societe_entiere
-    )
-
-    repartition = {
-        "Santé et social": int(total_sante_social) / total_secteurs,
-        "Secteur public <br>(éducation, justice, etc.)": int(total_autre_servicepublic)
-        / total_secteurs,
-        "Société entière<br>(perte de chance, <br>de qualité de vie, <br>de productivité, etc.)": int(
-            total_societe_entiere
-        )
-        / total_secteurs,
-    }
-
-    df_repartition_secteur = pd.DataFrame(
-        repartition, index=["Répartition des coûts par secteur"]
-    ).T
-
-    return df_par_cas, df_repartition_secteur
-
-
-def process_values_sensi(df_variables, depression=True, anxiete=True, psychose=True):
-
-    if "nom_variable" in df_variables.columns:
-        df_variables = df_variables.set_index("nom_variable")
-
-    revenu_moyen_hebdo_femme_post_naissance = get_revenu_moyen_femme(df_variables)
+    cout_crimes = col("Coût suppl total pour victimes crimes et délits par cas")
+    cout_premature = col("Coût pour le service public d'une naissance prématurée")
 
     if depression:
         # DEPRESSION MERE
-        cdmsp_sante_social = val(
-            df_variables,
-            "Coûts attribuables à dépréssion périnatale pour le secteur public",
+        duree = col("Durée moyenne d'une dépréssion périnatale")
+        proba_comportement = col(
+            "Probabilité supplémentaire de troubles du comportement"
+        )
+
+        cdmsp_sante_social = col(
+            "Coûts attribuables à dépréssion périnatale pour le secteur public"
         )
         cdmsoc_qaly = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Indice de perte de qualité de vie pour la dépression")
-            * val(df_variables, "Valeur d'une année de QALY")
+            duree * col("Indice de perte de qualité de vie pour la dépression") * qaly
         )
-
         cdmsoc_perte_prod = (
-            val(df_variables, "Durée moyenne d'une dépréssion périnatale")
-            * val(df_variables, "Réduction des semaines de travail chaque année")
+            duree
+            * col("Réduction des semaines de travail chaque année")
             * revenu_moyen_hebdo_femme_post_naissance
         )
 
         # DEPRESSION BEBE
-        # Secteur Public
         cdbsp_sante_social = (
-            val(
-                df_variables,
-                "Coût pour la Sécu d'une naissance prématurée liée à la dépression maternelle",
-            )
-            + val(df_variables, "Coût des problèmes émotionnels pour le bébé")
-            + (
-                val(
-                    df_variables,
-                    "Probabilité supplémentaire de troubles du comportement",
-                )
-                / 100
-            )
-            * val(
-                df_variables, "Coût pour la Sécu des troubles du comportement par cas"
+            col(
+                "Coût pour la Sécu d'une naissance prématurée liée à la dépression maternelle"
             )
+            + col("Coût des problèmes émotionnels pour le bébé")
+            + (proba_comportement / 100) * cout_secu_comportement
         )
+        cdbsp_educ = col("Coûts supplémentaires pour l'éducation")
+        cdbsp_justice = col("Coût total pour la justice")
 
-        cdbsp_educ = val(df_variables, "Coûts supplémentaires pour l'éducation")
-        cdbsp_justice = val(df_variables, "Coût total pour la justice")
-
-        # Société
         cdbsoc_qaly = (
-            -0
-            - 0
-            + val(
-                df_variables,
-                "Perte de qualité vie due à des troubles du comportement (en QALY)",
-            )
-            * val(df_variables, "Valeur d'une année de QALY")
-            * val(
-                df_variables, "Probabilité supplémentaire de troubles du comportement"
-            )
+            col("Perte de qualité vie due à des troubles du comportement (en QALY)")
+            * qaly
+            * proba_comportement
             / 100
-            + val(
-                df_variables,
-                "Coûts supplémentaires des problèmes émotionnels (en QALY)",
-            )
-            + val(df_variables, "Probabilité supplémentaire de mort de l'enfant")
+            + col("Coûts supplémentaires des problèmes émotionnels (en QALY)")
+            + col("Probabilité supplémentaire de mort de l'enfant")
             / 100
-            * val(df_variables, "Prix d'une vie")
+            * prix_vie
             * int(1e6)
         )
-
         cdbsoc_perte_prod = (
-            val(df_variables, "Coût en perte de productivité des problèmes émotionnels")
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(
-                df_variables, "Probabilité supplémentaire de troubles du comportement"
-            )
-            / 100
-            + val(df_variables, "Coût lié à l'abandon de l'école sans qualification")
+            col("Coût en perte de productivité des problèmes émotionnels")
+            + cout_prod_comportement * proba_comportement / 100
+            + col("Coût lié à l'abandon de l'école sans qualification")
         )
+        cdbsoc_autres = cout_crimes * proba_comportement / 100
 
-        cdbsoc_autres = (
-            val(df_variables, "Coût suppl total pour victimes crimes et délits par cas")
-            * val(
-                df_variables, "Probabilité supplémentaire de troubles du comportement"
-            )
-            / 100
+        termes.update(
+            cdmsp_sante_social=cdmsp_sante_social,
+            cdmsoc_qaly=cdmsoc_qaly,
+            cdmsoc_perte_prod=cdmsoc_perte_prod,
+            cdbsp_sante_social=cdbsp_sante_social,
+            cdbsp_educ=cdbsp_educ,
+            cdbsp_justice=cdbsp_justice,
+            cdbsoc_qaly=cdbsoc_qaly,
+            cdbsoc_perte_prod=cdbsoc_perte_prod,
+            cdbsoc_autres=cdbsoc_autres,
         )
 
     if anxiete:
         # ANXIETE MERE
-        camsp_sante_social = val(
-            df_variables, "Coût attribuable à l'anxiété périnat par femme chaque année"
-        ) * val(df_variables, "Durée moyenne de l'anxiété")
+        duree = col("Durée moyenne de l'anxiété")
+        risque_comportement = col("Risque supplémentaire de troubles du comportement")
+        risque_abdo = col(
+            "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété"
+        )
+        duree_abdo = col("Durée moyenne des douleurs abdominales chroniques en année")
 
+        camsp_sante_social = (
+            col("Coût attribuable à l'anxiété périnat par femme chaque année") * duree
+        )
         camsoc_qaly = (
-            val(df_variables, "Perte de qualité de vie pour la mère en cas d'anxiété")
-            * val(df_variables, "Durée moyenne de l'anxiété")
-            * val(df_variables, "Valeur d'une année de QALY")
+            col("Perte de qualité de vie pour la mère en cas d'anxiété") * duree * qaly
         )
-
         camsoc_perte_prod = (
-            val(df_variables, "Nombre de semaines de travail perdues chaque année")
+            col("Nombre de semaines de travail perdues chaque année")
             * revenu_moyen_hebdo_femme_post_naissance
-            * val(df_variables, "Durée moyenne de l'anxiété")
+            * duree
         )
 
         # ANXIETE BEBE
         cabsp_sante_social = (
-            val(df_variables, "Coût pour le service public d'une naissance prématurée")
-            * val(
-                df_variables, "Risque suppl. de naissance prématurée en cas d'anxiété"
-            )
+            cout_premature
+            * col("Risque suppl. de naissance prématurée en cas d'anxiété")
             / 100
-            + val(df_variables, "Coût des problèmes émotionnels en cas d'anxiété")
-            + val(
-                df_variables, "Coût pour la Sécu des troubles du comportement par cas"
+            + col("Coût des problèmes émotionnels en cas d'anxiété")
+            + cout_secu_comportement * risque_comportement / 100
+            + col(
+                "Coût pour le service public de douleur abdominale chronique pédiatrique par an"
             )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
+            * risque_abdo
             / 100
-            + val(
-                df_variables,
-                "Coût pour le service public de douleur abdominale chronique pédiatrique par an",
-            )
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-            )
-            / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
+            * duree_abdo
         )
-
-        cabsp_educ = val(df_variables, "Coût lié aux problèmes émotionnels si anxiété")
-
+        cabsp_educ = col("Coût lié aux problèmes émotionnels si anxiété")
         cabsp_justice = (
-            val(
-                df_variables,
-                "Coût pour la justice des troubles du comportement par cas",
-            )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
+            col("Coût pour la justice des troubles du comportement par cas")
+            * risque_comportement
             / 100
         )
 
         cabsoc_qaly = (
-            val(df_variables, "Coût de perte de qualité de vie si anxiété (en QALY)")
-            + val(df_variables, "Coûts des problème emotionnels (en QALY)")
-            + val(df_variables, "Coûts des troubles du comportement par cas (en QALY)")
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
+            col("Coût de perte de qualité de vie si anxiété (en QALY)")
+            + col("Coûts des problème emotionnels (en QALY)")
+            + col("Coûts des troubles du comportement par cas (en QALY)")
+            * risque_comportement
             / 100
         )
-
         cabsoc_perte_prod = (
-            val(
-                df_variables,
-                "Coût de pertes de productivité liées aux problèmes émotionnels",
-            )
-            + val(
-                df_variables,
-                "Coût en perte de productivité des troubles du comportement par cas",
-            )
-            * val(df_variables, "Risque supplémentaire de troubles du comportement")
+            col("Coût de pertes de productivité liées aux problèmes émotionnels")
+            + cout_prod_comportement * risque_comportement / 100
+            + col("Coût lié aux douleurs abdominales chroniques")
+            * risque_abdo
             / 100
-            + val(df_variables, "Coût lié aux douleurs abdominales chroniques")
-            * val(
-                df_variables,
-                "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
+            * duree_abdo
+        )
+        cabsoc_autres = (
+            cout_crimes * risque_comportement / 100
+            + (
+                col("Coût unpaid care douleurs abdo chroniques")
+                + col("Coût out-of-pocket lié douleurs abdo chroniques")
             )
+            * risque_abdo
             / 100
-            * val(
-                df_variables,
-                "Durée moyenne des douleurs abdominales chroniques en année",
-            )
+            * duree_abdo
         )
 
-        cabsoc_autres = val(
-            df_variables, "Coût suppl total pour victimes crimes et délits par cas"
-        ) * val(
-            df_variables, "Risque supplémentaire de troubles du comportement"
-        ) / 100 + (
-            val(df_variables, "Coût unpaid care douleurs abdo chroniques")
-            + val(df_variables, "Coût out-of-pocket lié douleurs abdo chroniques")
-        ) * val(
-            df_variables,
-            "Risque suppl. d'avoir des douleurs abdominales chroniques si anxiété",
-        ) / 100 * val(
-            df_variables, "Durée moyenne des douleurs abdominales chroniques en année"
+        termes.update(
+            camsp_sante_social=camsp_sante_social,
+            camsoc_qaly=camsoc_qaly,
+            camsoc_perte_prod=camsoc_perte_prod,
+            cabsp_sante_social=cabsp_sante_social,
+            cabsp_educ=cabsp_educ,
+            cabsp_justice=cabsp_justice,
+            cabsoc_qaly=cabsoc_qaly,
+            cabsoc_perte_prod=cabsoc_perte_prod,
+            cabsoc_autres=cabsoc_autres,
         )
 
     if psychose:
         # PSYCHOSE MERE
-        cpmsp_sante_social = val(df_variables, "Coût pour la Sécu d'une psychose")
-
-        cpmsoc_qaly = val(
-            df_variables, "Risque supplémentaire de suicide en cas de psychose"
-        ) / 100 * val(df_variables, "Prix d'une vie") * int(1e6) + val(
-            df_variables, "Perte de qualité de vie pour une psychose"
-        ) * val(
-            df_variables, "Durée moyenne d'une psychose"
-        ) * val(
-            df_variables, "Valeur d'une année de QALY"
-        )
+        part_schizo = col("Pourcentage de schizophrènes parmi psychose")
 
+        cpmsp_sante_social = col("Coût pour la Sécu d'une psychose")
+        cpmsoc_qaly = (
+            col("Risque supplémentaire de suicide en cas de psychose")
+            / 100
+            * prix_vie
+            * int(1e6)
+            + col("Perte de qualité de vie pour une psychose")
+            * col("Durée moyenne d'une psychose")
+            * qaly
+        )
         cpmsoc_perte_prod = (
-            val(df_variables, "Perte de productivité en cas d'épisode de schizophrènie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
+            col("Perte de productivité en cas d'épisode de schizophrènie")
+            * part_schizo
             / 100
         )
-
         cpmsoc_autres = (
-            val(df_variables, "Coût unpaid care en cas de schizophrénie")
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
+            col("Coût unpaid care en cas de schizophrénie") * part_schizo / 100
         )
 
         # PSYCHOSE BEBE
         cpbsp_sante_social = (
-            val(df_variables, "Risque supplémentaire de naissance prématurée")
-            / 100
-            * val(
-                df_variables, "Coût pour le service public d'une naissance prématurée"
-            )
+            col("Risque supplémentaire de naissance prématurée") / 100 * cout_premature
         )
-
         cpbsoc_qaly = (
-            val(df_variables, "Risque supplémentaire de mort de l'enfant")
+            col("Risque supplémentaire de mort de l'enfant")
             / 100
-            * val(df_variables, "Prix d'une vie")
+            * prix_vie
             * int(1e6)
-            * val(df_variables, "Pourcentage de schizophrènes parmi psychose")
-            / 100
-        )
-
-    # COUT DEPRESSION
-    cout_depression_mere_SP = cdmsp_sante_social
-    cout_depression_mere_SOC = cdmsoc_qaly + cdmsoc_perte_prod
-
-    cout_depression_bebe_SP = cdbsp_sante_social + cdbsp_educ + cdbsp_justice
-    cout_depression_bebe_SOC = cdbsoc_qaly + cdbsoc_perte_prod + cdbsoc_autres
-
-    # COUT ANXIETE
-    cout_anxiete_mere_SP = camsp_sante_social
-    cout_anxiete_mere_SOC = camsoc_qaly + camsoc_perte_prod
-
-    cout_anxiete_bebe_SP = cabsp_sante_social + cabsp_educ + cabsp_justice
-    cout_anxiete_bebe_SOC = cabsoc_qaly + cabsoc_perte_prod + cabsoc_autres
-
-    # COUT PSYCHOSE
-    cout_psychose_mere_SP = cpmsp_sante_social
-    cout_psychose_mere_SOC = cpmsoc_qaly + cpmsoc_perte_prod + cpmsoc_autres
-
-    cout_psychose_bebe_SP = cpbsp_sante_social
-    cout_psychose_bebe_SOC = cpbsoc_qaly
-
-    # COUT PAR MALADIE
-    cout_depression_mere = int(cout_depression_mere_SP + cout_depression_mere_SOC)
-    cout_depression_bebe = int(cout_depression_bebe_SP + cout_depression_bebe_SOC)
-
-    cout_anxiete_mere = int(cout_anxiete_mere_SP + cout_anxiete_mere_SOC)
-    cout_anxiete_bebe = int(cout_anxiete_bebe_SP + cout_anxiete_bebe_SOC)
-
-    cout_psychose_mere = int(cout_psychose_mere_SP + cout_psychose_mere_SOC)
-    cout_psychose_bebe = int(cout_psychose_bebe_SP + cout_psychose_bebe_SOC)
-
-    # TOTAL PAR MALADIE
-    cout_depression = cout_depression_mere + cout_depression_bebe
-    cout_anxiete = cout_anxiete_mere + cout_anxiete_bebe
-    cout_psychose = cout_psychose_mere + cout_psychose_bebe
-
-    couts = [
-        [
-            cout_depression_mere,
-            cout_depression_bebe,
-            cout_depression_mere + cout_depression_bebe,
-        ],
-        [cout_anxiete_mere, cout_anxiete_bebe, cout_anxiete_mere + cout_anxiete_bebe],
-        [
-            cout_psychose_mere,
-            cout_psychose_bebe,
-            cout_psychose_mere + cout_psychose_bebe,
-        ],
+            * part_schizo
+            / 100
+        )
+        termes.update(
+            cpmsp_sante_social=cpmsp_sante_social,
+            cpmsoc_qaly=cpmsoc_qaly,
+            cpmsoc_perte_prod=cpmsoc_perte_prod,
+            cpmsoc_autres=cpmsoc_autres,
+            cpbsp_sante_social=cpbsp_sante_social,
+            cpbsoc_qaly=cpbsoc_qaly,
+        )
+
+    return termes
+
+
+MALADIES = ["Dépression périnatale", "Anxiété périnatale", "Psychose périnatale"]
+SECTEURS = [
+    "Santé et social",
+    "Secteur public <br>(éducation, justice, etc.)",
+    "Société entière<br>(perte de chance, <br>de qualité de vie, <br>de productivité, etc.)",
+]
+NIVEAUX = ["total", "maladie", "detail"]
+
+# Termes composant le coût par cas de chaque maladie :
+# (mère, bébé) x (secteur public, société entière)
+COMPOSANTES = [
+    (
+        (["cdmsp_sante_social"], ["cdmsoc_qaly", "cdmsoc_perte_prod"]),
+        (
+            ["cdbsp_sante_social", "cdbsp_educ", "cdbsp_justice"],
+            ["cdbsoc_qaly", "cdbsoc_perte_prod", "cdbsoc_autres"],
+        ),
+    ),
+    (
+        (["camsp_sante_social"], ["camsoc_qaly", "camsoc_perte_prod"]),
+        (
+            ["cabsp_sante_social", "cabsp_educ", "cabsp_justice"],
+            ["cabsoc_qaly", "cabsoc_perte_prod", "cabsoc_autres"],
+        ),
+    ),
+    (
+        (
+            ["cpmsp_sante_social"],
+            ["cpmsoc_qaly", "cpmsoc_perte_prod", "cpmsoc_autres"],
+        ),
+        (["cpbsp_sante_social"], ["cpbsoc_qaly"]),
+    ),
+]
+TERMES_SANTE_SOCIAL = [
+    "cdmsp_sante_social",
+    "cdbsp_sante_social",
+    "camsp_sante_social",
+    "cabsp_sante_social",
+    "cpmsp_sante_social",
+    "cpbsp_sante_social",
+]
+TERMES_AUTRE_SERVICEPUBLIC = [
+    "cdbsp_educ",
+    "cdbsp_justice",
+    "cabsp_educ",
+    "cabsp_justice",
+]
+
+
+def _somme(termes, noms, zero):
+    total = zero
+    for nom in noms:
+        if nom in termes:
+            total = total + termes[nom]
+    return total
+
+
+def _evaluate(v, niveau, maladies, tronque, zero):
+    """Moteur commun aux versions scalaire et vectorisée
+
+    maladies : (depression, anxiete, psychose), les maladies désactivées ne
+    sont pas calculées et leurs coûts valent zero
+    tronque : troncature vers zéro des coûts par cas (comme int())"""
+
+    if niveau not in NIVEAUX:
+        raise ValueError(f"Niveau {niveau!r} inconnu, attendu parmi {NIVEAUX}")
+
+    termes = _termes(v, *maladies)
+
+    # COUT PAR CAS, PAR MALADIE
+    couts = []
+    couts_societe = []
+    for actif, composantes in zip(maladies, COMPOSANTES):
+        if not actif:
+            couts.append([zero, zero, zero])
+            continue
+        ligne = []
+        for termes_sp, termes_soc in composantes:
+            cout_soc = _somme(termes, termes_soc, zero)
+            couts_societe.append(cout_soc)
+            ligne.append(tronque(_somme(termes, termes_sp, zero) + cout_soc))
+        ligne.append(ligne[0] + ligne[1])
+        couts.append(ligne)
+
+    # COUT PAR NAISSANCE : coût par cas pondéré par la prévalence
+    if niveau != "maladie":
+        cout_par_naissance = zero
+        for actif, ligne, slot in zip(maladies, couts, slots_prevalences):
+            if actif:
+                cout_par_naissance = cout_par_naissance + ligne[2] * (v[slot] / 100)
+        if niveau == "total":
+            return cout_par_naissance
+
+    # REPARTITION PAR SECTEUR
+    secteurs = [
+        _somme(termes, TERMES_SANTE_SOCIAL, zero),
+        _somme(termes, TERMES_AUTRE_SERVICEPUBLIC, zero),
+        sum(couts_societe, zero),
     ]
+    total_secteurs = secteurs[0] + secteurs[1] + secteurs[2]
+    repartition = [tronque(s) / total_secteurs for s in secteurs]
+
+    if niveau == "maladie":
+        return couts, repartition
+
+    return {
+        "termes": termes,
+        "couts_par_cas": couts,
+        "secteurs": secteurs,
+        "repartition_secteur": repartition,
+        "cout_par_naissance": cout_par_naissance,
+    }
+
+
+def process_vector(v, depression=True, anxiete=True, psychose=True, niveau="maladie"):
+    """Modèle pour un jeu d'hypothèses v (Parametres.vecteur), sans pandas
+
+    niveau :
+    - "total" : coût total par naissance (float)
+    - "maladie" : (couts_par_cas, repartition_secteur), une liste 3 x 3
+      d'entiers maladie x (Mère, Bébé, Total) et la part de chaque secteur
+    - "detail" : dict avec en plus les termes intermédiaires, les coûts par
+      cas de chaque secteur et le coût par naissance"""
+
+    return _evaluate(v, niveau, (depression, anxiete, psychose), math.trunc, 0)
+
+
+def make_dataframes(couts, repartition):
+    """DataFrames (df_par_cas, df_repartition_secteur) à partir des résultats
+    de process_vector"""
 
     df_par_cas = pd.DataFrame(
         couts,
         columns=["Mère", "Bébé", "Total"],
-        index=["Dépression périnatale", "Anxiété périnatale", "Psychose périnatale"],
+        index=MALADIES,
     )
 
-    prevalences = (
-        df_variables.loc[
-            [
-                "Prévalence de " + mal
-                for mal in ["la dépression", "l'anxiété", "la psychose"]
-            ]
-        ]
-        .iloc[:, -1]
-        .values
-        / 100
+    df_repartition_secteur = pd.DataFrame(
+        dict(zip(SECTEURS, repartition)),
+        index=["Répartition des coûts par secteur"],
+    ).T
+
+    return df_par_cas, df_repartition_secteur
+
+
+def process_values(df_variables, depression=True, anxiete=True, psychose=True):
+
+    couts, repartition = process_vector(
+        parametres.from_df(df_variables), depression, anxiete, psychose
+    )
+
+    return make_dataframes(couts, repartition)
+
+
+def process_values_sensi(df_variables, depression=True, anxiete=True, psychose=True):
+    """Coût total par naissance, sans construire de DataFrame"""
+
+    return process_vector(
+        parametres.from_df(df_variables), depression, anxiete, psychose, "total"
     )
 
-    df_par_naissance = df_par_cas.copy()
-    # print(df_par_naissance.iloc[:, 1:])
-    df_par_naissance.iloc[:, :] = df_par_naissance.iloc[:, :].mul(prevalences, axis=0)
 
-    return df_par_naissance["Total"].sum()
+# MOTEUR VECTORISE
+TAILLE_BLOC = 1 << 14
+
+
+def _concatene(blocs):
+    """Recolle les résultats "detail" de plusieurs blocs"""
+    premier = blocs[0]
+    if isinstance(premier, dict):
+        return {cle: _concatene([b[cle] for b in blocs]) for cle in premier}
+    if isinstance(premier, list):
+        return [_concatene([b[i] for b in blocs]) for i in range(len(premier))]
+    return np.concatenate(blocs)
+
+
+def process_values_batch(
+    X, depression=True, anxiete=True, psychose=True, niveau="maladie"
+):
+    """Version vectorisée de process_vector.
+
+    X : array (N, 55), un jeu d'hypothèses par ligne, colonnes dans l'ordre
+    de bdd_variables.csv
+
+    Avec niveau="maladie", retourne (couts_par_cas, repartition_secteur) :
+    - couts_par_cas : array (N, 3, 3), maladie (dépression, anxiété, psychose)
+      x (Mère, Bébé, Total), tronqués comme dans process_values
+    - repartition_secteur : array (N, 3), part des coûts pour santé et social,
+      secteur public, société entière
+    Avec niveau="total", retourne le coût total par naissance, array (N,), et
+    avec niveau="detail" le dict de process_vector, chaque valeur étant un
+    array (N,)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[np.newaxis, :]
+    if X.shape[1] != nb_variables:
+        raise ValueError(
+            f"{X.shape[1]} colonnes reçues, {nb_variables} variables attendues"
+        )
+
+    n = X.shape[0]
+    maladies = (depression, anxiete, psychose)
+    if niveau == "total":
+        total = np.empty(n)
+    elif niveau == "maladie":
+        couts = np.empty((n, 3, 3))
+        repartition = np.empty((n, 3))
+    else:
+        blocs = []
+
+    # traitement par blocs pour que les intermédiaires restent en cache
+    for debut in range(0, n, TAILLE_BLOC):
+        fin = min(debut + TAILLE_BLOC, n)
+        v = np.ascontiguousarray(X[debut:fin].T)
+        resultat = _evaluate(v, niveau, maladies, np.trunc, np.zeros(fin - debut))
+
+        if niveau == "total":
+            total[debut:fin] = resultat
+        elif niveau == "maladie":
+            for i, ligne in enumerate(resultat[0]):
+                for j, cout in enumerate(ligne):
+                    couts[debut:fin, i, j] = cout
+            for i, part in enumerate(resultat[1]):
+                repartition[debut:fin, i] = part
+        else:
+            blocs.append(resultat)
+
+    if niveau == "total":
+        return total
+    if niveau == "maladie":
+        return couts, repartition
+    return _concatene(blocs)
+
+
+def process_values_sensi_batch(X, depression=True, anxiete=True, psychose=True):
+    """Version vectorisée de process_values_sensi : coût total par naissance
+    de chaque ligne de X, array (N,)"""
+    return process_values_batch(X, depression, anxiete, psychose, niveau="total")
@@ -0,0 +1,121 @@
+"""Liens permanents : un jeu d'hypothèses, un territoire et un nombre de
+naissances encodés dans l'URL (?s=...)
+
+Seules les différences avec la référence sont encodées : valeurs par défaut
+(colonne val de bdd_variables.csv), salaire horaire et nombre de naissances
+du territoire. Le code est une suite d'éléments séparés par "_" :
+
+- t<identifiant> : territoire (TERRITOIRE_DEFAUT si absent)
+- n<nombre> : nombre de naissances, s'il diffère de celui du territoire
+- <slot>~<valeur> : hypothèse qui diffère de sa référence
+
+Les valeurs sont écrites avec repr : le décodage les retrouve exactement.
+Ex. : t75_n5000_3~1.5_41~11.16"""
+
+import math
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from model import nb_variables, parametres
+from scenarios import ErreurScenario
+from territoires import recherche_territoires, slot_salaire
+
+PARAMETRE = "s"
+TERRITOIRE_DEFAUT = 0
+TAILLE_MAX = 2000
+
+
+def _nombre(x):
+    texte = repr(float(x))
+    return texte[:-2] if texte.endswith(".0") else texte
+
+
+def _lit_nombre(texte):
+    try:
+        x = float(texte)
+    except ValueError:
+        raise ErreurScenario(f"Nombre invalide dans le lien : {texte!r}")
+    if not math.isfinite(x):
+        raise ErreurScenario(f"Nombre invalide dans le lien : {texte!r}")
+    return x
+
+
+def reference(territoire=TERRITOIRE_DEFAUT):
+    """Hypothèses et nombre de naissances de référence d'un territoire, tels
+    que les remplit le choix du territoire dans l'app (upd_hypotheses)"""
+    try:
+        infos = recherche_territoires().get(territoire)
+    except KeyError:
+        raise ErreurScenario(f"Territoire inconnu : {territoire!r}")
+    valeurs = np.array(parametres.defaut)
+    valeurs[slot_salaire] = infos["Salaire horaire des femmes"]
+    return valeurs, int(infos["Nombre de naissances (2018)"])
+
+
+def encode_permalien(valeurs, territoire=None, naissances=None):
+    """Code du lien permanent d'un jeu d'hypothèses (55 valeurs), d'un
+    territoire et d'un nombre de naissances"""
+
+    if territoire is None:
+        territoire = TERRITOIRE_DEFAUT
+    valeurs_reference, naissances_reference = reference(territoire)
+
+    elements = []
+    if territoire != TERRITOIRE_DEFAUT:
+        elements.append(f"t{territoire}")
+    if naissances is not None and float(naissances) != naissances_reference:
+        elements.append(f"n{_nombre(naissances)}")
+    for slot, (valeur, valeur_reference) in enumerate(
+        zip(np.asarray(valeurs, dtype=float).tolist(), valeurs_reference.tolist())
+    ):
+        if valeur != valeur_reference:
+            elements.append(f"{slot}~{_nombre(valeur)}")
+    return "_".join(elements)
+
+
+def decode_permalien(code):
+    """(valeurs, territoire, naissances) d'un code de lien permanent ;
+    ErreurScenario si le code est invalide"""
+
+    if len(code) > TAILLE_MAX:
+        raise ErreurScenario("Lien trop long")
+    elements = code.split("_") if code else []
+
+    territoire = TERRITOIRE_DEFAUT
+    if elements and elements[0].startswith("t"):
+        try:
+            territoire = int(elements.pop(0)[1:])
+        except ValueError:
+            raise ErreurScenario(f"Territoire invalide dans le lien : {code!r}")
+    valeurs, naissances = reference(territoire)
+
+    if elements and elements[0].startswith("n"):
+        naissances = _lit_nombre(elements.pop(0)[1:])
+        if naissances < 0:
+            raise ErreurScenario("Nombre de naissances négatif")
+
+    vus = set()
+    for element in elements:
+        slot, _, texte = element.partition("~")
+        if not slot.isdigit() or int(slot) >= nb_variables or int(slot) in vus:
+            raise ErreurScenario(f"Élément invalide dans le lien : {element!r}")
+        slot = int(slot)
+        vus.add(slot)
+        valeur = _lit_nombre(texte)
+        if not parametres.mini[slot] <= valeur <= parametres.maxi[slot]:
+            raise ErreurScenario(
+                f"{parametres.noms[slot]} : {valeur} hors de "
+                f"[{parametres.mini[slot]}, {parametres.maxi[slot]}]"
+            )
+        valeurs[slot] = valeur
+
+    return valeurs, territoire, naissances
+
+
+def code_permalien(search):
+    """Code du lien contenu dans la partie ?... d'une URL, ou None"""
+    if not search:
+        return None
+    codes = parse_qs(search.lstrip("?"), keep_blank_values=True).get(PARAMETRE)
+    return codes[0] if codes else None
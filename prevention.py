@@ -0,0 +1,190 @@
+"""Optimisation d'un budget de prévention
+
+Une intervention a un coût par naissance couverte et des effets, en %, sur
+des hypothèses du modèle (prévalences, durées, risques de complications) :
+à la couverture a (part des naissances couvertes, entre 0 et 1), l'hypothèse
+x devient x * (1 + a * effet / 100). Les effets de plusieurs interventions
+sur une même hypothèse se multiplient.
+
+Les allocations (une couverture par intervention) sont parcourues sur une
+grille et évaluées en un seul appel du moteur vectorisé (scenarios.evalue).
+La frontière efficace est l'ensemble des allocations qu'aucune autre ne
+domine : pas d'autre allocation qui évite plus de coûts pour une dépense au
+plus égale."""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from model import parametres
+from scenarios import ErreurScenario, evalue
+
+CHEMIN_INTERVENTIONS = "resources/interventions.csv"
+# couvertures 0, 10 %, ..., 100 %, moins de niveaux au-delà de
+# NB_ALLOCATIONS_MAX combinaisons
+NIVEAUX = 11
+NB_ALLOCATIONS_MAX = 50000
+NB_INTERVENTIONS_MAX = 8
+
+
+def interventions_depuis_lignes(lignes):
+    """Interventions à partir de lignes {"intervention", "cout_par_naissance",
+    "variable", "effet"} (une ligne par effet, comme dans interventions.csv),
+    dans l'ordre de leur première ligne"""
+
+    interventions = {}
+    for ligne in lignes:
+        nom = ligne.get("intervention")
+        if not nom:
+            continue
+        intervention = interventions.setdefault(
+            nom,
+            {
+                "nom": nom,
+                "cout_par_naissance": ligne.get("cout_par_naissance"),
+                "effets": {},
+            },
+        )
+        if ligne.get("variable"):
+            intervention["effets"][ligne["variable"]] = ligne.get("effet")
+    return list(interventions.values())
+
+
+def lignes_interventions(chemin=CHEMIN_INTERVENTIONS):
+    return pd.read_csv(chemin).to_dict("records")
+
+
+def charge_interventions(chemin=CHEMIN_INTERVENTIONS):
+    return interventions_depuis_lignes(lignes_interventions(chemin))
+
+
+def _nombre(x, description):
+    try:
+        x = float(x)
+    except (TypeError, ValueError):
+        raise ErreurScenario(f"{description} : nombre attendu, reçu {x!r}")
+    if not math.isfinite(x):
+        raise ErreurScenario(f"{description} : nombre attendu, reçu {x!r}")
+    return x
+
+
+def lit_interventions(interventions):
+    """Noms, coûts par naissance (J,) et effets [(intervention, slot, effet
+    en fraction)] d'une liste d'interventions {"nom", "cout_par_naissance",
+    "effets": {nom_variable: effet en %}}"""
+
+    if not isinstance(interventions, list) or not interventions:
+        raise ErreurScenario("interventions : liste non vide attendue")
+    if len(interventions) > NB_INTERVENTIONS_MAX:
+        raise ErreurScenario(f"Au plus {NB_INTERVENTIONS_MAX} interventions")
+
+    noms, couts, effets = [], [], []
+    for j, intervention in enumerate(interventions):
+        nom = intervention.get("nom") if isinstance(intervention, dict) else None
+        if not isinstance(nom, str) or not nom.strip():
+            raise ErreurScenario(f"Intervention invalide : {intervention!r}")
+        # les résultats sont indexés par nom
+        if nom.strip() in (n.strip() for n in noms):
+            raise ErreurScenario(f"Intervention en double : {nom!r}")
+        cout = _nombre(intervention.get("cout_par_naissance"), nom)
+        if cout < 0:
+            raise ErreurScenario(f"{nom} : coût par naissance négatif")
+
+        effets_intervention = intervention.get("effets", {})
+        if not isinstance(effets_intervention, dict):
+            raise ErreurScenario(f"{nom} : effets, dict variable -> effet attendu")
+        for variable, effet in effets_intervention.items():
+            if variable not in parametres.slots:
+                raise ErreurScenario(f"{nom} : variable inconnue {variable!r}")
+            effet = _nombre(effet, f"{nom}, {variable}")
+            if effet < -100:
+                raise ErreurScenario(f"{nom}, {variable} : effet inférieur à -100 %")
+            effets.append((j, parametres.slots[variable], effet / 100))
+
+        noms.append(nom)
+        couts.append(cout)
+    return noms, np.array(couts), effets
+
+
+def grille_allocations(nb_interventions, niveaux=NIVEAUX):
+    """Toutes les combinaisons de couvertures (m, nb_interventions), la
+    première étant l'absence d'intervention"""
+    while niveaux > 2 and niveaux**nb_interventions > NB_ALLOCATIONS_MAX:
+        niveaux -= 1
+    couvertures = np.linspace(0, 1, niveaux)
+    grilles = np.meshgrid(*[couvertures] * nb_interventions, indexing="ij")
+    return np.stack(grilles, axis=-1).reshape(-1, nb_interventions)
+
+
+def frontiere_efficace(depenses, evites):
+    """Indices des allocations non dominées, par dépense croissante"""
+    ordre = np.lexsort((-evites, depenses))
+    meilleurs = np.maximum.accumulate(evites[ordre])
+    garde = np.empty(len(ordre), dtype=bool)
+    garde[0] = True
+    garde[1:] = evites[ordre][1:] > meilleurs[:-1]
+    return ordre[garde]
+
+
+def optimise(v, naissances, interventions, budget=None, niveaux=NIVEAUX):
+    """Allocations d'un budget de prévention pour le jeu d'hypothèses v et
+    naissances naissances, et renvoie un dict :
+    - interventions : noms ; couts_par_naissance : (J,)
+    - couvertures : (m, J) allocations évaluées
+    - depense, cout_evite, net : (m,) coûts annuels, net = évité - dépense
+    - cout_reference : coût annuel sans intervention
+    - frontiere : indices de la frontière efficace, par dépense croissante
+    - optimum : indice de l'allocation au gain net maximal parmi celles qui
+      respectent le budget (tout le budget n'est pas forcément dépensé)
+
+    ErreurScenario si le budget n'est pas un nombre fini positif ou nul"""
+
+    if budget is not None:
+        budget = _nombre(budget, "budget")
+        if budget < 0:
+            raise ErreurScenario(f"budget : montant positif attendu, reçu {budget}")
+    noms, couts, effets = lit_interventions(interventions)
+    couvertures = grille_allocations(len(noms), niveaux)
+
+    X = np.tile(np.asarray(v, dtype=float), (len(couvertures), 1))
+    for j, slot, effet in effets:
+        X[:, slot] *= 1 + couvertures[:, j] * effet
+    cout_total = evalue(X, np.full(len(X), float(naissances)))["cout_total"]
+
+    depense = couvertures @ couts * naissances
+    # la première allocation de la grille est l'absence d'intervention
+    cout_evite = cout_total[0] - cout_total
+    net = cout_evite - depense
+
+    admissibles = np.ones(len(net), dtype=bool)
+    if budget is not None:
+        admissibles = depense <= budget * (1 + 1e-9)
+    optimum = int(np.argmax(np.where(admissibles, net, -np.inf)))
+
+    return {
+        "interventions": noms,
+        "couts_par_naissance": couts,
+        "couvertures": couvertures,
+        "depense": depense,
+        "cout_evite": cout_evite,
+        "net": net,
+        "cout_reference": cout_total[0],
+        "frontiere": frontiere_efficace(depense, cout_evite),
+        "optimum": optimum,
+    }
+
+
+def tableau_allocations(resultat, indices):
+    """DataFrame des allocations indices : dépense, coût évité, gain net et
+    couverture de chaque intervention (en %)"""
+    tableau = pd.DataFrame(
+        {
+            "Dépense": resultat["depense"][indices],
+            "Coût évité": resultat["cout_evite"][indices],
+            "Gain net": resultat["net"][indices],
+        }
+    )
+    for j, nom in enumerate(resultat["interventions"]):
+        tableau[nom] = 100 * resultat["couvertures"][indices, j]
+    return tableau.reset_index(drop=True)
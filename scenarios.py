@@ -0,0 +1,427 @@
+import argparse
+import json
+import math
+import multiprocessing
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from model import nb_variables, parametres, process_values_batch, slots
+from model import slots_prevalences
+from territoires import MALADIES, SECTEURS, recherche_territoires
+from territoires import slot_salaire
+
+# les scénarios sont évalués par blocs : la mémoire ne dépend que de la
+# taille des blocs, quel que soit le nombre de scénarios
+TAILLE_BLOC_SCENARIOS = 1024
+TAILLE_BLOC_FICHIER = 10000
+PERSONNES = ["Mère", "Bébé", "Total"]
+COLONNES_SCENARIO = ["id", "territoire", "naissances"]
+# types acceptés pour les nombres des scénarios : pas bool ni str
+TYPES_NOMBRES = {int, float, np.int64, np.float64}
+
+
+class ErreurScenario(ValueError):
+    pass
+
+
+def lit_scenario(scenario):
+    """Jeu d'hypothèses et nombre de naissances d'un scénario
+
+    scenario : dict avec les clés optionnelles
+    - valeurs : dict nom_variable -> valeur, ou liste des 55 valeurs dans
+      l'ordre de bdd_variables.csv ; les variables absentes gardent leur
+      valeur par défaut
+    - territoire : identifiant du territoire (comme dans dd-echelle), qui
+      fixe le nombre de naissances et le salaire horaire des femmes
+    - naissances : nombre de naissances, 1 par défaut (coût par naissance)
+
+    ErreurScenario si une valeur n'est pas un nombre fini dans les bornes de
+    la variable (colonnes mini / maxi de bdd_variables.csv)"""
+
+    if not isinstance(scenario, dict):
+        raise ErreurScenario(f"Scénario invalide : {scenario!r}")
+
+    x = np.array(parametres.defaut)
+    naissances = 1
+
+    territoire = scenario.get("territoire")
+    if territoire is not None:
+        if isinstance(territoire, bool) or not isinstance(territoire, int):
+            raise ErreurScenario(f"Territoire invalide : {territoire!r}")
+        try:
+            infos = recherche_territoires().get(territoire)
+        except KeyError:
+            raise ErreurScenario(f"Territoire inconnu : {territoire!r}")
+        naissances = infos["Nombre de naissances (2018)"]
+        x[slot_salaire] = infos["Salaire horaire des femmes"]
+
+    valeurs = scenario.get("valeurs", {})
+    if isinstance(valeurs, dict):
+        inconnues = set(valeurs) - set(slots)
+        if inconnues:
+            raise ErreurScenario(f"Variables inconnues : {sorted(inconnues)}")
+        positions = np.array([slots[nom] for nom in valeurs], dtype=int)
+        valeurs = list(valeurs.values())
+    elif isinstance(valeurs, list) and len(valeurs) == len(x):
+        positions = np.arange(len(x))
+    else:
+        raise ErreurScenario(f"valeurs : dict ou liste de {len(x)} valeurs attendu")
+
+    naissances = scenario.get("naissances", naissances)
+    # true ou "12" ne sont pas des nombres, même si float les accepte
+    if not set(map(type, [naissances, *valeurs])) <= TYPES_NOMBRES:
+        raise ErreurScenario(f"Valeur non numérique dans le scénario : {scenario!r}")
+    valeurs, naissances = np.array(valeurs, dtype=float), float(naissances)
+
+    # null est lu comme NaN, 1e400 comme inf
+    mini, maxi = parametres.mini[positions], parametres.maxi[positions]
+    hors_bornes = ~(np.isfinite(valeurs) & (mini <= valeurs) & (valeurs <= maxi))
+    if hors_bornes.any():
+        k = np.flatnonzero(hors_bornes)[0]
+        raise ErreurScenario(
+            f"{parametres.noms[positions[k]]} : {valeurs[k]} hors de "
+            f"[{mini[k]}, {maxi[k]}]"
+        )
+    if not math.isfinite(naissances) or naissances < 0:
+        raise ErreurScenario(f"Nombre de naissances invalide : {naissances}")
+    x[positions] = valeurs
+
+    return x, naissances
+
+
+def matrice_scenarios(bloc):
+    """Jeux d'hypothèses (m, 55) et nombres de naissances (m,) d'une liste de
+    scénarios"""
+    lignes = [lit_scenario(scenario) for scenario in bloc]
+    X = np.array([x for x, _ in lignes]).reshape(len(lignes), nb_variables)
+    naissances = np.array([n for _, n in lignes], dtype=float)
+    return X, naissances
+
+
+def matrice_csv(morceau):
+    """Comme matrice_scenarios, pour un DataFrame lu d'un csv de scénarios
+    (voir lit_fichier), sans passer par une ligne Python par scénario"""
+
+    inconnues = set(morceau.columns) - set(COLONNES_SCENARIO) - set(slots)
+    if inconnues:
+        raise ErreurScenario(f"Variables inconnues : {sorted(inconnues)}")
+
+    X = np.tile(parametres.defaut, (len(morceau), 1))
+    naissances = np.ones(len(morceau))
+
+    if "territoire" in morceau.columns:
+        avec_territoire = morceau["territoire"].notna().values
+        ids = pd.to_numeric(morceau["territoire"], errors="coerce").values
+        bdd_naissances = recherche_territoires().bdd_naissances
+
+        # identifiants entiers, comme dans lit_scenario (1.5 n'est pas 1)
+        entiers = np.isfinite(ids) & (ids == np.round(ids))
+        connus = entiers.copy()
+        connus[entiers] = np.isin(ids[entiers], bdd_naissances.index)
+        for lignes, erreur in [
+            (avec_territoire & ~entiers, "Territoire invalide"),
+            (avec_territoire & ~connus, "Territoire inconnu"),
+        ]:
+            _verifie_lignes(
+                morceau,
+                lignes,
+                lambda k: f"{erreur} : {morceau['territoire'].iloc[k]!r}",
+            )
+
+        territoires = bdd_naissances.loc[ids[avec_territoire].astype(np.int64)]
+        naissances[avec_territoire] = territoires["Nombre de naissances (2018)"]
+        X[avec_territoire, slot_salaire] = territoires["Salaire horaire des femmes"]
+
+    for colonne in morceau.columns:
+        if colonne in COLONNES_SCENARIO[:2]:
+            continue
+        vides = morceau[colonne].isna().values
+        valeurs = pd.to_numeric(morceau[colonne], errors="coerce").values
+        _verifie_lignes(
+            morceau,
+            np.isnan(valeurs) & ~vides,
+            lambda k: f"Valeur non numérique dans la colonne {colonne!r} : "
+            f"{morceau[colonne].iloc[k]!r}",
+        )
+        remplies = ~vides
+
+        # mêmes contrôles que lit_scenario : inf passe to_numeric
+        if colonne == "naissances":
+            _verifie_lignes(
+                morceau,
+                remplies & ~(np.isfinite(valeurs) & (valeurs >= 0)),
+                lambda k: f"Nombre de naissances invalide : {valeurs[k]}",
+            )
+            naissances[remplies] = valeurs[remplies]
+        else:
+            slot = slots[colonne]
+            mini, maxi = parametres.mini[slot], parametres.maxi[slot]
+            _verifie_lignes(
+                morceau,
+                remplies
+                & ~(np.isfinite(valeurs) & (mini <= valeurs) & (valeurs <= maxi)),
+                lambda k: f"{colonne} : {valeurs[k]} hors de [{mini}, {maxi}]",
+            )
+            X[remplies, slot] = valeurs[remplies]
+
+    return X, naissances
+
+
+def _verifie_lignes(morceau, lignes, message):
+    """ErreurScenario pour la première ligne invalide du csv, avec son numéro
+    de ligne dans le fichier ; message(k) décrit l'erreur de la k-ième ligne
+    du morceau"""
+    if lignes.any():
+        k = np.flatnonzero(lignes)[0]
+        # index de read_csv : 0 pour la ligne 2 du fichier (en-tête)
+        raise ErreurScenario(f"Ligne {morceau.index[k] + 2} : {message(k)}")
+
+
+def evalue(X, naissances):
+    """Évalue les jeux d'hypothèses X avec process_values_batch, le moteur de
+    compute_costs, et renvoie un dict d'arrays :
+    - naissances, cout_total, cout_par_naissance : (m,)
+    - couts_par_cas : (m, 3, 3) maladie x (Mère, Bébé, Total)
+    - couts_maladies, couts_secteurs : (m, 3), coûts totaux"""
+
+    couts, repartition = process_values_batch(X)
+
+    # coût par naissance : coût par cas pondéré par la prévalence
+    par_naissance = couts[:, :, 2] * (X[:, slots_prevalences] / 100)
+    cout_par_naissance = par_naissance[:, 0] + par_naissance[:, 1] + par_naissance[:, 2]
+    cout_total = cout_par_naissance * naissances
+
+    return {
+        "naissances": naissances,
+        "cout_total": cout_total,
+        "cout_par_naissance": cout_par_naissance,
+        "couts_par_cas": couts.astype(np.int64),
+        "couts_maladies": par_naissance * naissances[:, np.newaxis],
+        "couts_secteurs": repartition * cout_total[:, np.newaxis],
+    }
+
+
+def evalue_scenarios(
+    scenarios, taille_bloc=TAILLE_BLOC_SCENARIOS, erreurs_en_ligne=False
+):
+    """Évalue un itérable de scénarios bloc par bloc, et génère un dict de
+    résultats par scénario (format de l'API)
+
+    Un scénario invalide lève ErreurScenario, ou avec erreurs_en_ligne donne
+    {"erreur": ...} à sa place sans interrompre les autres (de même pour une
+    ErreurScenario de lit_ndjson à la place d'un scénario)"""
+
+    scenarios = iter(scenarios)
+    while True:
+        bloc = list(islice(scenarios, taille_bloc))
+        if not bloc:
+            return
+
+        lus = []
+        for scenario in bloc:
+            try:
+                if isinstance(scenario, ErreurScenario):
+                    raise scenario
+                lus.append(lit_scenario(scenario))
+            except ErreurScenario as e:
+                if not erreurs_en_ligne:
+                    raise
+                lus.append(e)
+
+        valides = [lu for lu in lus if not isinstance(lu, ErreurScenario)]
+        if valides:
+            X = np.array([x for x, _ in valides]).reshape(len(valides), nb_variables)
+            naissances = np.array([n for _, n in valides], dtype=float)
+            resultats = {
+                cle: valeurs.tolist() for cle, valeurs in evalue(X, naissances).items()
+            }
+
+        k = 0
+        for scenario, lu in zip(bloc, lus):
+            if isinstance(lu, ErreurScenario):
+                resultat = {"erreur": str(lu)}
+            else:
+                resultat = {
+                    "naissances": resultats["naissances"][k],
+                    "cout_total": resultats["cout_total"][k],
+                    "cout_par_naissance": resultats["cout_par_naissance"][k],
+                    "maladies": {
+                        maladie: {
+                            "cout_total": resultats["couts_maladies"][k][i],
+                            "par_cas": dict(
+                                zip(PERSONNES, resultats["couts_par_cas"][k][i])
+                            ),
+                        }
+                        for i, maladie in enumerate(MALADIES)
+                    },
+                    "secteurs": dict(zip(SECTEURS, resultats["couts_secteurs"][k])),
+                }
+                k += 1
+            if isinstance(scenario, dict) and "id" in scenario:
+                resultat = {"id": scenario["id"], **resultat}
+            yield resultat
+
+
+def tableau(ids, X, naissances):
+    """Résultats en DataFrame, une ligne par scénario (mêmes colonnes que
+    iter_territoires, plus les coûts par cas)"""
+
+    resultats = evalue(X, naissances)
+    tableau = pd.DataFrame(
+        {
+            "id": ids,
+            "Nombre de naissances": resultats["naissances"],
+            "Coût total": resultats["cout_total"],
+            "Coût par naissance": resultats["cout_par_naissance"],
+        }
+    )
+    for i, secteur in enumerate(SECTEURS):
+        tableau[secteur] = resultats["couts_secteurs"][:, i]
+    for i, maladie in enumerate(MALADIES):
+        tableau[maladie] = resultats["couts_maladies"][:, i]
+        for j, personne in enumerate(PERSONNES):
+            colonne = f"{maladie} - {personne} (par cas)"
+            tableau[colonne] = resultats["couts_par_cas"][:, i, j]
+    return tableau
+
+
+def lit_ndjson(lignes, erreurs_en_ligne=False):
+    """Scénarios d'un flux NDJSON / JSONL, un scénario par ligne
+
+    Une ligne invalide lève ErreurScenario, ou avec erreurs_en_ligne la
+    génère à la place du scénario (voir evalue_scenarios)"""
+    for numero, ligne in enumerate(lignes, 1):
+        if ligne.strip():
+            try:
+                yield json.loads(ligne)
+            except ValueError:
+                erreur = ErreurScenario(f"Ligne {numero} : JSON invalide")
+                if not erreurs_en_ligne:
+                    raise erreur
+                yield erreur
+
+
+def lit_fichier(chemin, taille_bloc=TAILLE_BLOC_FICHIER):
+    """Lit un fichier de scénarios par blocs de taille_bloc scénarios
+
+    - .jsonl : un scénario par ligne, au format de l'API
+      ({"id": ..., "territoire": ..., "naissances": ..., "valeurs": {...}})
+    - .csv : colonnes optionnelles id, territoire, naissances, et une colonne
+      par variable modifiée (nom_variable) ; une case vide garde la valeur
+      par défaut. Les blocs sont alors des DataFrame, convertis par
+      matrice_csv dans les processus du pool"""
+
+    if chemin.endswith(".jsonl"):
+        with open(chemin, encoding="utf-8") as f:
+            lignes = lit_ndjson(f)
+            while True:
+                bloc = list(islice(lignes, taille_bloc))
+                if not bloc:
+                    return
+                yield bloc
+    else:
+        yield from pd.read_csv(
+            chemin, chunksize=taille_bloc, float_precision="round_trip"
+        )
+
+
+def _evalue_fichier(args):
+    debut, bloc = args
+    try:
+        if isinstance(bloc, pd.DataFrame):
+            ids = bloc["id"].values if "id" in bloc.columns else None
+            return tableau(ids, *matrice_csv(bloc))
+        return tableau([s.get("id") for s in bloc], *matrice_scenarios(bloc))
+    except ErreurScenario as e:
+        raise ErreurScenario(f"Scénarios {debut + 1} à {debut + len(bloc)} : {e}")
+
+
+def _blocs_en_parallele(blocs, n_processus):
+    """Évalue les blocs dans un pool de processus, dans l'ordre,
+    sans lire plus de 2 blocs d'avance par processus"""
+
+    if n_processus == 1:
+        yield from map(_evalue_fichier, blocs)
+        return
+
+    with multiprocessing.Pool(n_processus) as pool:
+        en_cours = deque()
+        for args in blocs:
+            en_cours.append(pool.apply_async(_evalue_fichier, (args,)))
+            if len(en_cours) >= 2 * n_processus:
+                yield en_cours.popleft().get()
+        while en_cours:
+            yield en_cours.popleft().get()
+
+
+def run_scenarios(entree, sortie, n_processus=None, taille_bloc=TAILLE_BLOC_FICHIER):
+    """Évalue les scénarios du fichier entree et écrit les résultats au fil de
+    l'eau dans sortie (.csv ou .parquet), renvoie le nombre de scénarios"""
+
+    n_processus = n_processus or multiprocessing.cpu_count()
+
+    def blocs():
+        debut = 0
+        for bloc in lit_fichier(entree, taille_bloc):
+            yield debut, bloc
+            debut += len(bloc)
+
+    n = 0
+    writer = None
+    try:
+        for tableau in _blocs_en_parallele(blocs(), n_processus):
+            if sortie.endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(tableau, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(sortie, table.schema)
+                writer.write_table(table)
+            else:
+                tableau.to_csv(
+                    sortie, mode="w" if n == 0 else "a", header=n == 0, index=False
+                )
+            n += len(tableau)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Coûts des maladies psypérinatales pour un fichier de scénarios"
+    )
+    parser.add_argument("entree", help="fichier de scénarios .csv ou .jsonl")
+    parser.add_argument("sortie", help="fichier de résultats .csv ou .parquet")
+    parser.add_argument(
+        "--processus",
+        type=int,
+        default=None,
+        help="nombre de processus (par défaut, un par coeur)",
+    )
+    parser.add_argument(
+        "--taille-bloc",
+        type=int,
+        default=TAILLE_BLOC_FICHIER,
+        help="nombre de scénarios lus et évalués à la fois",
+    )
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    try:
+        n = run_scenarios(args.entree, args.sortie, args.processus, args.taille_bloc)
+    except ErreurScenario as e:
+        sys.exit(f"Erreur : {e}")
+    duree = time.perf_counter() - debut
+    print(
+        f"{n} scénarios écrits dans {args.sortie} en {duree:.3f} s "
+        f"({n / duree:.0f} scénarios / s)"
+    )
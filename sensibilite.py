@@ -0,0 +1,151 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from model import process_values_sensi_batch
+
+N_POINTS = 100
+
+
+@lru_cache(maxsize=128)
+def _bauer_hamby(mini, valeurs, n_points):
+    """Fait varier chaque variable sur linspace(mini, 2 * valeur), les autres
+    restant fixées, et évalue les 55 x n_points jeux d'hypothèses d'un coup"""
+
+    valeurs = np.array(valeurs)
+    nb_variables = len(valeurs)
+
+    grilles = np.linspace(np.array(mini, dtype=float), 2 * valeurs, n_points).T
+    X = np.tile(valeurs, (nb_variables, n_points, 1))
+    X[np.arange(nb_variables), :, np.arange(nb_variables)] = grilles
+
+    couts = process_values_sensi_batch(X.reshape(-1, nb_variables))
+    couts = couts.reshape(nb_variables, n_points)
+
+    cout_min = couts.min(axis=1)
+    cout_max = couts.max(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        indices = np.where(cout_max > 0, 1 - cout_min / cout_max, 0)
+
+    resultat = np.stack([indices, cout_min, cout_max], axis=1)
+    resultat.flags.writeable = False
+    return resultat
+
+
+def compute_bauer_hamby(df_variables, valeurs, n_points=N_POINTS):
+    """Indice de Bauer-Hamby de chaque variable autour du jeu d'hypothèses
+    valeurs, trié par ordre croissant
+
+    Le résultat est mis en cache par jeu d'hypothèses"""
+
+    resultat = _bauer_hamby(
+        tuple(df_variables["mini"].astype(float)),
+        tuple(float(v) for v in valeurs),
+        n_points,
+    )
+
+    return pd.DataFrame(
+        {
+            "Indice de Bauer-Hamby": resultat[:, 0],
+            "Coût min": resultat[:, 1],
+            "Coût max": resultat[:, 2],
+            "Catégorie": df_variables["category"].values,
+        },
+        index=df_variables["nom_variable"].values,
+    ).sort_values(by="Indice de Bauer-Hamby", ascending=True)
+
+
+def bauer_hamby_par_categorie(bauer_hamby):
+    """Moyenne des indices de Bauer-Hamby par catégorie de variables"""
+    return (
+        bauer_hamby.groupby("Catégorie")["Indice de Bauer-Hamby"]
+        .mean()
+        .to_frame()
+        .sort_values(by="Indice de Bauer-Hamby")
+    )
+
+
+N_BASE_SOBOL = 1 << 14
+TAILLE_BLOC_SOBOL = 1024
+
+
+@lru_cache(maxsize=8)
+def _sobol(mini, maxi, n_base, taille_bloc, seed):
+    """Estimateurs de Saltelli (1er ordre) et de Jansen (total), accumulés
+    bloc par bloc : la mémoire ne dépend que de taille_bloc
+
+    Chaque bloc de m tirages évalue les matrices A, B et les 55 matrices AB_i
+    (A dont la colonne i vient de B), soit m x 57 jeux d'hypothèses"""
+
+    mini = np.array(mini)
+    maxi = np.array(maxi)
+    nb_variables = len(mini)
+    rng = np.random.default_rng(seed)
+
+    decalage = None
+    somme_f = somme_f2 = 0.0
+    somme_premier_ordre = np.zeros(nb_variables)
+    somme_total = np.zeros(nb_variables)
+
+    for debut in range(0, n_base, taille_bloc):
+        m = min(taille_bloc, n_base - debut)
+        A = rng.uniform(mini, maxi, size=(m, nb_variables))
+        B = rng.uniform(mini, maxi, size=(m, nb_variables))
+        AB = np.repeat(A[np.newaxis], nb_variables, axis=0)
+        AB[np.arange(nb_variables), :, np.arange(nb_variables)] = B.T
+
+        f = process_values_sensi_batch(
+            np.concatenate([A, B, AB.reshape(-1, nb_variables)])
+        )
+
+        # on centre sur la moyenne du premier bloc pour limiter les erreurs d'arrondi
+        if decalage is None:
+            decalage = f[:m].mean()
+        f -= decalage
+        f_A, f_B = f[:m], f[m : 2 * m]
+        f_AB = f[2 * m :].reshape(nb_variables, m)
+
+        somme_f += f_A.sum() + f_B.sum()
+        somme_f2 += (f_A**2).sum() + (f_B**2).sum()
+        somme_premier_ordre += (f_B * (f_AB - f_A)).sum(axis=1)
+        somme_total += ((f_A - f_AB) ** 2).sum(axis=1)
+
+    variance = somme_f2 / (2 * n_base) - (somme_f / (2 * n_base)) ** 2
+
+    resultat = np.stack(
+        [
+            somme_premier_ordre / n_base / variance,
+            somme_total / (2 * n_base) / variance,
+        ],
+        axis=1,
+    )
+    resultat.flags.writeable = False
+    return resultat
+
+
+def compute_sobol(
+    df_variables, n_base=N_BASE_SOBOL, taille_bloc=TAILLE_BLOC_SOBOL, seed=0
+):
+    """Indices de Sobol du 1er ordre et totaux du coût par naissance, les 55
+    variables étant tirées uniformément entre leurs bornes mini et maxi
+
+    Coûte n_base x 57 évaluations du modèle (~10^6 par défaut). Le résultat
+    est trié par indice total croissant"""
+
+    resultat = _sobol(
+        tuple(df_variables["mini"].astype(float)),
+        tuple(df_variables["maxi"].astype(float)),
+        n_base,
+        taille_bloc,
+        seed,
+    )
+
+    return pd.DataFrame(
+        {
+            "Indice de Sobol (1er ordre)": resultat[:, 0],
+            "Indice de Sobol total": resultat[:, 1],
+            "Catégorie": df_variables["category"].values,
+        },
+        index=df_variables["nom_variable"].values,
+    ).sort_values(by="Indice de Sobol total", ascending=True)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+
+import flask
+import plotly
+
+# fichiers de assets/ : leurs URL contiennent un hash du contenu (utils.url_asset)
+DUREE_CACHE_ASSETS = 365 * 24 * 3600
+
+# compression des réponses par Flask-Compress (activé par Dash) : brotli si
+# le client l'accepte, gzip sinon (liste d'algorithmes : Flask-Compress >= 1.9)
+ALGORITHMES_COMPRESSION = ["br", "gzip"]
+TAILLE_MIN_COMPRESSION = 500
+
+# fichiers dont dépend le layout : le snapshot est ignoré si l'un d'eux change
+SOURCES_LAYOUT = [
+    "layout.py",
+    "utils.py",
+    "model.py",
+    "territoires.py",
+    "prevention.py",
+    "resources/bdd_variables.csv",
+    "resources/naissance_salaires_echelons.csv",
+    "resources/interventions.csv",
+    "assets/card_image_transparent.png",
+]
+LIBRAIRIES_LAYOUT = [
+    "dash",
+    "dash_core_components",
+    "dash_html_components",
+    "dash_bootstrap_components",
+    "dash_table",
+]
+
+
+def empreinte_layout():
+    """Hash des sources du layout et des versions des librairies de composants"""
+    h = hashlib.sha1()
+    for chemin in SOURCES_LAYOUT:
+        with open(chemin, "rb") as f:
+            h.update(f.read())
+    for librairie in LIBRAIRIES_LAYOUT:
+        h.update(__import__(librairie).__version__.encode())
+    return h.hexdigest()
+
+
+def charge_snapshot(chemin):
+    """Layout sérialisé par ecrit_snapshot, ou None si le fichier n'existe pas
+    ou ne correspond plus aux sources"""
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, "rb") as f:
+        empreinte = f.readline().decode().strip()
+        if empreinte != empreinte_layout():
+            return None
+        return f.read()
+
+
+def ecrit_snapshot(chemin, layout):
+    """Écrit le layout sérialisé, précédé de l'empreinte de ses sources ;
+    l'écriture passe par un fichier temporaire (plusieurs workers gunicorn
+    peuvent écrire en même temps)"""
+    temporaire = f"{chemin}.{os.getpid()}"
+    with open(temporaire, "wb") as f:
+        f.write(empreinte_layout().encode() + b"\n")
+        f.write(json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder).encode())
+    os.replace(temporaire, chemin)
+
+
+def _fige(reponse):
+    reponse.add_etag()
+    return reponse.get_data(), reponse.mimetype, reponse.get_etag()[0]
+
+
+def init_statique(app, layout_json=None):
+    """Cache navigateur et compression des réponses statiques de l'app Dash
+
+    - assets/ servi avec Cache-Control max-age d'un an
+    - layout et dépendances sérialisés une seule fois, avec un ETag calculé
+      sur leur contenu : les visiteurs qui les ont déjà reçoivent un 304
+    - compression brotli / gzip des réponses JSON
+
+    layout_json : layout déjà sérialisé (charge_snapshot), servi à la place
+    de app.layout"""
+
+    server = app.server
+    server.config["SEND_FILE_MAX_AGE_DEFAULT"] = DUREE_CACHE_ASSETS
+    server.config["COMPRESS_ALGORITHM"] = ALGORITHMES_COMPRESSION
+    server.config["COMPRESS_MIN_SIZE"] = TAILLE_MIN_COMPRESSION
+
+    prefixe = app.config.routes_pathname_prefix
+    vues = {
+        prefixe + "_dash-layout": app.serve_layout,
+        prefixe + "_dash-dependencies": app.dependencies,
+    }
+    reponses = {}
+    if layout_json is not None:
+        reponses[prefixe + "_dash-layout"] = _fige(
+            flask.Response(layout_json, mimetype="application/json")
+        )
+
+    @server.before_request
+    def reponse_statique():
+        chemin = flask.request.path
+        if chemin not in vues or flask.request.method != "GET":
+            return None
+
+        # un layout fonction est recalculé à chaque requête
+        if chemin not in reponses and callable(app.layout):
+            return None
+
+        if chemin not in reponses:
+            reponses[chemin] = _fige(vues[chemin]())
+        contenu, mimetype, etag = reponses[chemin]
+
+        # Flask-Compress suffixe l'ETag par l'algorithme ("<etag>:gzip")
+        etags_client = {e.split(":")[0] for e in flask.request.if_none_match.as_set()}
+        if etag in etags_client:
+            reponse = flask.Response(status=304)
+        else:
+            reponse = flask.Response(contenu, mimetype=mimetype)
+        reponse.set_etag(etag)
+        reponse.headers["Cache-Control"] = "no-cache"
+        return reponse
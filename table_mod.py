@@ -1,4 +1,39 @@
 import dash_html_components as html
+import numpy as np
+
+
+def format_euros(valeurs):
+    """Montants au format 1 234 €, tronqués à l'euro (comme astype(int))
+
+    Le tableau est converti en une fois ; le formatage par élément reste en
+    Python, plus rapide que np.char pour les séparateurs de milliers"""
+    entiers = np.asarray(valeurs, dtype=float).astype(np.int64).tolist()
+    return ["{:,} €".format(x).replace(",", " ") for x in entiers]
+
+
+def generate_table(cls, entetes, colonnes, italic_last=True, **table_kwargs):
+    """Table à partir de colonnes déjà formatées (listes de même longueur),
+    sans passer par un DataFrame
+
+    entetes : noms des colonnes, ou None pour une table sans en-tête"""
+
+    lignes = list(zip(*colonnes))
+    corps = [html.Tr([html.Td(cellule) for cellule in ligne]) for ligne in lignes]
+    if italic_last and lignes:
+        corps[-1] = html.Tr([html.Td(html.I(cellule)) for cellule in lignes[-1]])
+
+    table = []
+    if entetes is not None:
+        table.append(html.Thead(html.Tr(children=[html.Th(e) for e in entetes])))
+    table.append(html.Tbody(corps))
+    return cls(table, **table_kwargs)
+
+
+def donnees_datatable(colonnes):
+    """Propriété data d'un dash_table.DataTable à partir d'un dict
+    id de colonne -> liste de valeurs"""
+    ids = list(colonnes)
+    return [dict(zip(ids, ligne)) for ligne in zip(*colonnes.values())]
 
 
 def generate_table_from_df(
@@ -41,7 +76,6 @@ def generate_table_from_df(
         Additional arguments to pass to the table component. See
         dash_bootstrap_components.Table for details.
     """
-    import numpy as np
     import pandas as pd
 
     if columns is not None:
@@ -71,34 +105,14 @@ def generate_table_from_df(
                 )
         elif isinstance(header, dict):
             df = df.rename(columns=header)
-        table = [
-            html.Thead(html.Tr(children=[html.Th(col) for col in df.columns]))
-        ]
+        entetes = list(df.columns)
     else:
-        table = []
-
-    def generate_row(df):
-        row_html = list()
-        for i in range(len(df)):
-            if i == len(df) - 1:
-                row_html.append(html.Tr([html.Td(html.I(df.iloc[i][col])) for col in df.columns]))
-            else:
-                row_html.append(html.Tr([html.Td(df.iloc[i][col]) for col in df.columns]))
-        return row_html
-
-    if italic_last:
-        table.append(
-            html.Tbody(
-                generate_row(df)
-            )
-        )
-    else:
-        table.append(
-            html.Tbody(
-                [
-                    html.Tr([html.Td(df.iloc[i][col]) for col in df.columns])
-                    for i in range(len(df))
-                ]
-            )
-        )
-    return cls(table, **table_kwargs)
+        entetes = None
+
+    return generate_table(
+        cls,
+        entetes,
+        [df.iloc[:, j].tolist() for j in range(df.shape[1])],
+        italic_last=italic_last,
+        **table_kwargs
+    )
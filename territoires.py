@@ -0,0 +1,269 @@
+import argparse
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from model import process_values_batch, slots, slots_prevalences
+
+BDD_NAISSANCES = "resources/naissance_salaires_echelons.csv"
+TAILLE_BLOC = 1 << 14
+NB_SUGGESTIONS = 50
+
+MALADIES = ["Dépression périnatale", "Anxiété périnatale", "Psychose périnatale"]
+SECTEURS = ["Santé et social", "Secteur public", "Société entière"]
+
+slot_salaire = slots["Revenu horaire moyen d'une femme"]
+
+
+def load_territoires(chemin=BDD_NAISSANCES):
+    return pd.read_csv(chemin, index_col=0)
+
+
+def iter_territoires(bdd_naissances, valeurs, taille_bloc=TAILLE_BLOC):
+    """Coûts de chaque territoire sous le jeu d'hypothèses valeurs, par blocs
+    de taille_bloc territoires
+
+    Comme dans l'app, le salaire horaire du territoire remplace la variable
+    "Revenu horaire moyen d'une femme". Chaque bloc est un DataFrame avec le
+    coût total, par naissance, mère / bébé, par secteur et par maladie"""
+
+    valeurs = np.asarray(valeurs, dtype=float)
+
+    for debut in range(0, len(bdd_naissances), taille_bloc):
+        bloc = bdd_naissances.iloc[debut : debut + taille_bloc]
+        naissances = bloc["Nombre de naissances (2018)"].values
+
+        X = np.tile(valeurs, (len(bloc), 1))
+        X[:, slot_salaire] = bloc["Salaire horaire des femmes"].values
+        couts, repartition = process_values_batch(X)
+
+        # coût par naissance : coût par cas pondéré par la prévalence
+        par_naissance = couts * (X[:, slots_prevalences] / 100)[:, :, np.newaxis]
+        total_par_naissance = (
+            par_naissance[:, 0, 2] + par_naissance[:, 1, 2] + par_naissance[:, 2, 2]
+        )
+        cout_total = total_par_naissance * naissances
+
+        resultat = pd.DataFrame(
+            {
+                "Nom de l'échelon": bloc["Nom de l'échelon"].values,
+                "Echelon": bloc["Echelon"].values,
+                "Nombre de naissances (2018)": naissances,
+                "Salaire horaire des femmes": X[:, slot_salaire],
+                "Coût total": cout_total,
+                "Coût par naissance": total_par_naissance,
+                "Mère": par_naissance[:, :, 0].sum(axis=1) * naissances,
+                "Bébé": par_naissance[:, :, 1].sum(axis=1) * naissances,
+            },
+            index=bloc.index,
+        )
+        for i, secteur in enumerate(SECTEURS):
+            resultat[secteur] = repartition[:, i] * cout_total
+        for i, maladie in enumerate(MALADIES):
+            resultat[maladie] = par_naissance[:, i, 2] * naissances
+
+        yield resultat
+
+
+def compute_territoires(bdd_naissances, valeurs):
+    """Coûts de tous les territoires, un DataFrame indexé comme bdd_naissances"""
+    return pd.concat(list(iter_territoires(bdd_naissances, valeurs)))
+
+
+class IndexTerritoires:
+    """Index en mémoire des coûts par territoire, construit une fois par jeu
+    d'hypothèses à partir de compute_territoires
+
+    - get : coûts d'un territoire (par nom ou identifiant) en O(1)
+    - top : les n premiers territoires d'un échelon selon une colonne en O(n)
+    - filtre : territoires dont une colonne est dans [mini, maxi] en O(log N)
+
+    Les tris par (échelon, colonne) sont calculés à la première demande"""
+
+    def __init__(self, resultats):
+        self.resultats = resultats
+        self.colonnes = {
+            col: resultats[col].values
+            for col in resultats.columns
+            if resultats[col].dtype != "object"
+        }
+        self.echelons = resultats["Echelon"].values
+        self._positions = {
+            nom: i for i, nom in enumerate(resultats["Nom de l'échelon"])
+        }
+        self._positions.update({idx: i for i, idx in enumerate(resultats.index)})
+        self._lignes_echelon = {
+            echelon: np.flatnonzero(self.echelons == echelon)
+            for echelon in pd.unique(self.echelons)
+        }
+        self._tris = {}
+
+    def _tri(self, colonne, echelon=None):
+        """Positions des territoires de l'échelon triées par colonne croissante,
+        et valeurs correspondantes"""
+        if (colonne, echelon) not in self._tris:
+            lignes = (
+                np.arange(len(self.echelons))
+                if echelon is None
+                else self._lignes_echelon.get(echelon, np.array([], dtype=int))
+            )
+            valeurs = self.colonnes[colonne][lignes]
+            ordre = np.argsort(valeurs, kind="stable")
+            self._tris[colonne, echelon] = (lignes[ordre], valeurs[ordre])
+        return self._tris[colonne, echelon]
+
+    def get(self, territoire):
+        """Coûts d'un territoire, désigné par son nom ou son identifiant"""
+        return self.resultats.iloc[self._positions[territoire]]
+
+    def top(self, n=20, colonne="Coût total", echelon=None, croissant=False):
+        """Les n territoires (d'un échelon) au coût le plus élevé, ou le plus
+        faible si croissant ; au moins un territoire, même si n < 1"""
+        n = max(int(n), 1)
+        positions, _ = self._tri(colonne, echelon)
+        positions = positions[:n] if croissant else positions[::-1][:n]
+        return self.resultats.iloc[positions]
+
+    def filtre(self, colonne, mini=-np.inf, maxi=np.inf, echelon=None):
+        """Territoires (d'un échelon) dont la colonne est dans [mini, maxi],
+        triés par valeur croissante"""
+        positions, valeurs = self._tri(colonne, echelon)
+        debut = np.searchsorted(valeurs, mini, side="left")
+        fin = np.searchsorted(valeurs, maxi, side="right")
+        return self.resultats.iloc[positions[debut:fin]]
+
+
+def normalise(texte):
+    """Minuscules, sans accents ni ponctuation : Île-de-France -> ile de france"""
+    texte = unicodedata.normalize("NFKD", texte)
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return " ".join(re.split(r"[^0-9a-z]+", texte.lower())).strip()
+
+
+class RechercheTerritoires:
+    """Recherche des territoires par nom pour le choix de l'échelle
+
+    Chaque territoire est identifié par son identifiant dans bdd_naissances
+    (première colonne du csv). La recherche porte sur le début de chacun des
+    mots du nom, sans tenir compte des accents ni de la casse : "paris" et
+    "75106" trouvent "75106 – Paris 6e Arrondissement". Les clés sont triées
+    une fois pour toutes, une recherche est une dichotomie en O(log N)"""
+
+    def __init__(self, bdd_naissances):
+        self.bdd_naissances = bdd_naissances
+        self.ids = bdd_naissances.index.values
+        self.noms = bdd_naissances["Nom de l'échelon"].values
+        self.naissances = bdd_naissances["Nombre de naissances (2018)"].values
+        self.salaires = bdd_naissances["Salaire horaire des femmes"].values
+        self._positions = {idx: i for i, idx in enumerate(self.ids)}
+
+        # une clé par début de mot : "ile de france", "de france", "france"
+        cles = []
+        for i, nom in enumerate(self.noms):
+            mots = normalise(nom).split(" ")
+            cles.extend((" ".join(mots[j:]), i) for j in range(len(mots)))
+        cles.sort()
+        self._cles = [cle for cle, _ in cles]
+        self._lignes = np.array([i for _, i in cles], dtype=int)
+
+    def get(self, territoire):
+        """Nom, nombre de naissances et salaire horaire d'un territoire"""
+        i = self._positions[territoire]
+        return {
+            "Nom de l'échelon": self.noms[i],
+            "Nombre de naissances (2018)": self.naissances[i],
+            "Salaire horaire des femmes": self.salaires[i],
+        }
+
+    def cherche(self, texte, n=NB_SUGGESTIONS):
+        """Identifiants des n territoires les plus peuplés dont un mot du nom
+        commence par texte (plusieurs mots : débuts de mots consécutifs)"""
+        prefixe = normalise(texte)
+        debut = bisect_left(self._cles, prefixe)
+        fin = bisect_left(self._cles, prefixe + "\uffff", debut)
+
+        lignes = np.unique(self._lignes[debut:fin])
+        lignes = lignes[np.argsort(-self.naissances[lignes], kind="stable")][:n]
+        return self.ids[lignes]
+
+    def options(self, territoires):
+        """Options de dcc.Dropdown pour une liste d'identifiants"""
+        return [
+            {"label": self.noms[self._positions[t]], "value": int(t)}
+            for t in territoires
+        ]
+
+
+@lru_cache(maxsize=1)
+def recherche_territoires(chemin=BDD_NAISSANCES):
+    """RechercheTerritoires sur bdd_naissances, chargée une seule fois"""
+    return RechercheTerritoires(load_territoires(chemin))
+
+
+@lru_cache(maxsize=32)
+def _index_territoires(chemin, valeurs):
+    return IndexTerritoires(compute_territoires(load_territoires(chemin), valeurs))
+
+
+def index_territoires(valeurs, chemin=BDD_NAISSANCES):
+    """IndexTerritoires pour le jeu d'hypothèses valeurs, mis en cache
+
+    Le salaire horaire est remplacé par celui de chaque territoire : il ne
+    fait pas partie de la clé du cache"""
+    valeurs = [float(v) for v in valeurs]
+    valeurs[slot_salaire] = 0.0
+    return _index_territoires(chemin, tuple(valeurs))
+
+
+def export_territoires(bdd_naissances, valeurs, chemin, taille_bloc=TAILLE_BLOC):
+    """Écrit les coûts de tous les territoires en CSV ou en Parquet (selon
+    l'extension de chemin) au fil des blocs, et renvoie le nombre de lignes"""
+
+    n = 0
+    if chemin.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        for bloc in iter_territoires(bdd_naissances, valeurs, taille_bloc):
+            table = pa.Table.from_pandas(bloc)
+            if writer is None:
+                writer = pq.ParquetWriter(chemin, table.schema)
+            writer.write_table(table)
+            n += len(bloc)
+        if writer is not None:
+            writer.close()
+    else:
+        for bloc in iter_territoires(bdd_naissances, valeurs, taille_bloc):
+            bloc.to_csv(chemin, mode="w" if n == 0 else "a", header=n == 0)
+            n += len(bloc)
+
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Coûts des maladies psypérinatales pour tous les territoires"
+    )
+    parser.add_argument("sortie", help="fichier .csv ou .parquet")
+    parser.add_argument(
+        "--variables",
+        default="resources/bdd_variables.csv",
+        help="jeu d'hypothèses (colonne upd_variables)",
+    )
+    args = parser.parse_args()
+
+    df_variables = pd.read_csv(args.variables)
+
+    debut = time.perf_counter()
+    n = export_territoires(
+        load_territoires(), df_variables["upd_variables"].values, args.sortie
+    )
+    print(
+        f"{n} territoires écrits dans {args.sortie} en {time.perf_counter() - debut:.3f} s"
+    )
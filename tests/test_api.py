@@ -0,0 +1,112 @@
+import json
+
+import flask
+import pytest
+
+import api
+from bibliotheque import BibliothequeScenarios
+
+PREVALENCE = "Prévalence de la dépression"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        api, "bibliotheque", BibliothequeScenarios(str(tmp_path / "s.sqlite"))
+    )
+    server = flask.Flask(__name__)
+    server.register_blueprint(api.api)
+    return server.test_client()
+
+
+def test_costs(client):
+    reponse = client.post(
+        "/api/v1/costs",
+        json={"scenarios": [{"territoire": 0}, {"naissances": 10}]},
+    )
+    assert reponse.status_code == 200
+    resultats = reponse.get_json()["resultats"]
+    assert resultats[1]["cout_total"] == pytest.approx(
+        10 * resultats[1]["cout_par_naissance"]
+    )
+
+
+@pytest.mark.parametrize(
+    "corps",
+    [
+        {"scenarios": 5},
+        {"scenarios": [5]},
+        {"territoire": [1]},
+        {"territoire": {"a": 1}},
+        {"territoire": True},
+        {"valeurs": {PREVALENCE: None}},
+        {"valeurs": {PREVALENCE: 1000}},
+        {"naissances": -3},
+    ],
+)
+def test_costs_invalide(client, corps):
+    reponse = client.post("/api/v1/costs", json=corps)
+    assert reponse.status_code == 400
+    assert "erreur" in reponse.get_json()
+
+
+def enregistre(client, **scenario):
+    return client.post("/api/v1/scenarios", json=scenario)
+
+
+def test_scenarios_proprietaire(client):
+    identifiant = enregistre(client, nom="x", proprietaire="alice").get_json()["id"]
+    autre = enregistre(client, nom="x", proprietaire="bob").get_json()["id"]
+    assert autre != identifiant
+    # même (propriétaire, nom) : le scénario est remplacé
+    reponse = enregistre(client, nom="x", proprietaire="alice", naissances=3)
+    assert reponse.get_json()["id"] == identifiant
+
+    url = f"/api/v1/scenarios/{identifiant}"
+    assert client.delete(url).status_code == 403
+    assert client.delete(url + "?proprietaire=bob").status_code == 403
+    assert client.delete(url + "?proprietaire=alice").status_code == 204
+    assert client.delete(url + "?proprietaire=alice").status_code == 404
+    assert client.get(f"/api/v1/scenarios/{autre}").status_code == 200
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        {"nom": ["x"]},
+        {"nom": ""},
+        {"proprietaire": "a"},
+        {"nom": "x", "proprietaire": 5},
+        {"nom": "x", "territoire": [1]},
+    ],
+)
+def test_scenarios_invalides(client, scenario):
+    assert enregistre(client, **scenario).status_code == 400
+
+
+def test_scenarios_limite(client):
+    for k in range(3):
+        enregistre(client, nom=f"s{k}", territoire=k)
+
+    def liste(q):
+        return client.get(f"/api/v1/scenarios{q}").get_json()["scenarios"]
+
+    assert len(liste("")) == 3
+    assert len(liste("?limite=-1")) == 1
+    assert len(liste("?limite=0")) == 1
+    assert len(liste("?limite=2")) == 2
+    assert [s["nom"] for s in liste("?territoire=1")] == ["s1"]
+    for q in ["?territoire=abc", "?territoire=1.5", "?limite=x"]:
+        assert client.get(f"/api/v1/scenarios{q}").status_code == 400
+
+
+def test_costs_ndjson_erreur_par_ligne(client):
+    corps = '{"id": "a"}\n{"id": "b", "naissances": true}\n{"id": "c"}\n'
+    reponse = client.post(
+        "/api/v1/costs", data=corps, content_type="application/x-ndjson"
+    )
+    assert reponse.status_code == 200
+    lignes = [json.loads(ligne) for ligne in reponse.data.decode().splitlines()]
+    assert [ligne["id"] for ligne in lignes] == ["a", "b", "c"]
+    assert "erreur" in lignes[1]
+    assert lignes[0]["cout_total"] == lignes[2]["cout_total"]
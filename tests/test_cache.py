@@ -0,0 +1,58 @@
+import threading
+
+import numpy as np
+
+from cache import CacheResultats, cle_hypotheses
+from model import df_variables
+
+
+def test_get_set(tmp_path):
+    cache = CacheResultats(str(tmp_path / "c.sqlite"))
+    assert cache.get("a") is None
+    cache.set("a", {"x": np.arange(3), "y": "é"})
+    assert cache.get("a") == {"x": [0, 1, 2], "y": "é"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["taille"]) == (1, 1, 1)
+
+
+def test_partage_entre_instances_et_threads(tmp_path):
+    # deux instances sur le même fichier : deux workers gunicorn
+    chemin = str(tmp_path / "c.sqlite")
+    CacheResultats(chemin).set("a", 1)
+    cache = CacheResultats(chemin)
+    lus = []
+    threads = [
+        threading.Thread(target=lambda: lus.append(cache.get("a"))) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lus == [1] * 4
+
+
+def test_lru(tmp_path):
+    cache = CacheResultats(str(tmp_path / "c.sqlite"), taille_max=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_ttl(tmp_path):
+    cache = CacheResultats(str(tmp_path / "c.sqlite"), ttl=-1)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["taille"] == 0
+
+
+def test_cle_hypotheses():
+    valeurs = df_variables["val"].values.astype(float)
+    pas = df_variables["step"].values
+    cle = cle_hypotheses(valeurs, df_variables, "tableaux")
+    # en dessous du millième de pas : même clé
+    assert cle_hypotheses(valeurs + pas / 10000, df_variables, "tableaux") == cle
+    assert cle_hypotheses(valeurs + pas / 100, df_variables, "tableaux") != cle
+    assert cle_hypotheses(valeurs, df_variables, "incertitude") != cle
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from graphe import CalculIncremental
+from model import parametres, process_vector
+
+
+def hypotheses(rng, v, nb_slots):
+    """v avec nb_slots hypothèses tirées entre leurs bornes"""
+    v = np.array(v, dtype=float)
+    slots = rng.choice(len(v), nb_slots, replace=False)
+    v[slots] = rng.uniform(parametres.mini[slots], parametres.maxi[slots])
+    return v
+
+
+def test_calcule_comme_process_vector():
+    rng = np.random.default_rng(0)
+    calcul = CalculIncremental()
+    v = np.array(parametres.defaut)
+    for nb_slots in [0, 1, 1, 3, 0, 10, 55, 2]:
+        v = hypotheses(rng, v, nb_slots)
+        assert calcul.calcule(v.tolist()) == process_vector(v, niveau="detail")
+
+
+def test_retour_aux_valeurs_par_defaut():
+    calcul = CalculIncremental()
+    defaut = list(parametres.defaut)
+    attendu = process_vector(defaut, niveau="detail")
+    calcul.calcule(defaut)
+    calcul.calcule(hypotheses(np.random.default_rng(1), defaut, 5).tolist())
+    assert calcul.calcule(defaut) == attendu
+
+
+def test_deltas():
+    calcul = CalculIncremental()
+    v = list(parametres.defaut)
+    calcul.calcule(v)
+    assert calcul.deltas == {}
+
+    v[3] = parametres.maxi[3]
+    calcul.calcule(v)
+    avant, apres = calcul.deltas["cout_par_naissance"]
+    assert avant == process_vector(parametres.defaut, niveau="total")
+    assert apres == process_vector(v, niveau="total")
+
+    calcul.calcule(v)
+    assert calcul.deltas == {}
+
+
+def test_balayage():
+    v = list(parametres.defaut)
+    valeurs = np.linspace(parametres.mini[3], parametres.maxi[3], 7)
+    attendus = []
+    for valeur in valeurs:
+        v[3] = valeur
+        attendus.append(process_vector(v, niveau="total"))
+    resultats = CalculIncremental().balayage(parametres.defaut, 3, valeurs)
+    assert resultats == pytest.approx(attendus, rel=1e-12)
@@ -0,0 +1,14 @@
+import numpy as np
+
+from incertitude import compute_incertitude, multiplie_naissances
+from model import df_variables
+
+
+def test_multiplie_naissances():
+    valeurs = df_variables["val"].values
+    par_naissance = compute_incertitude(df_variables, valeurs, 1, n_tirages=2000)
+    attendu = compute_incertitude(df_variables, valeurs, 4342, n_tirages=2000)
+    resultat = multiplie_naissances(par_naissance, 4342)
+    assert resultat.keys() == attendu.keys()
+    for cle in attendu:
+        np.testing.assert_allclose(resultat[cle], attendu[cle], rtol=1e-9)
@@ -0,0 +1,46 @@
+import pytest
+
+from model import parametres
+from permaliens import decode_permalien, encode_permalien
+from scenarios import ErreurScenario
+from territoires import recherche_territoires, slot_salaire
+
+
+def hypotheses_territoire(territoire):
+    """Naissances et sliders tels que upd_hypotheses les remplit au choix
+    du territoire"""
+    infos = recherche_territoires().get(territoire)
+    sliders = list(parametres.defaut)
+    sliders[slot_salaire] = float(infos["Salaire horaire des femmes"])
+    return int(infos["Nombre de naissances (2018)"]), sliders
+
+
+@pytest.mark.parametrize("territoire", [1, 75])
+def test_territoire_choisi(territoire):
+    naissances, sliders = hypotheses_territoire(territoire)
+    assert encode_permalien(sliders, territoire, naissances) == f"t{territoire}"
+
+
+def test_decode_naissances_entieres():
+    naissances, sliders = hypotheses_territoire(1)
+    valeurs, territoire, naissances_lues = decode_permalien("t1")
+    assert territoire == 1
+    assert naissances_lues == naissances
+    assert isinstance(naissances_lues, int)
+    assert valeurs.tolist() == sliders
+
+
+def test_aller_retour():
+    naissances, sliders = hypotheses_territoire(75)
+    sliders[3] = 1.5
+    code = encode_permalien(sliders, 75, 5000)
+    assert code == "t75_n5000_3~1.5"
+    valeurs, territoire, naissances_lues = decode_permalien(code)
+    assert (territoire, naissances_lues) == (75, 5000)
+    assert valeurs.tolist() == sliders
+
+
+@pytest.mark.parametrize("code", ["tx", "t1_n-3", "3~nan", "3~1e400", "99~1"])
+def test_code_invalide(code):
+    with pytest.raises(ErreurScenario):
+        decode_permalien(code)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from model import parametres
+from prevention import charge_interventions, optimise
+from scenarios import ErreurScenario
+
+NAISSANCES = 4342
+
+
+def test_optimum_dans_le_budget():
+    resultat = optimise(
+        parametres.defaut, NAISSANCES, charge_interventions(), budget=200000
+    )
+    optimum = resultat["optimum"]
+    assert resultat["depense"][optimum] <= 200000 * (1 + 1e-9)
+    admissibles = resultat["depense"] <= 200000 * (1 + 1e-9)
+    assert resultat["net"][optimum] == resultat["net"][admissibles].max()
+
+
+def test_budget_nul():
+    resultat = optimise(parametres.defaut, NAISSANCES, charge_interventions(), 0)
+    assert resultat["depense"][resultat["optimum"]] == 0
+
+
+@pytest.mark.parametrize("budget", [-1, -1e-3, np.inf, -np.inf, np.nan, "1e400", "x"])
+def test_budget_invalide(budget):
+    with pytest.raises(ErreurScenario):
+        optimise(parametres.defaut, NAISSANCES, charge_interventions(), budget)
+
+
+@pytest.mark.parametrize(
+    "interventions",
+    [
+        [],
+        [{"nom": ["a"], "cout_par_naissance": 10}],
+        [{"nom": "  ", "cout_par_naissance": 10}],
+        [{"cout_par_naissance": 10}],
+        ["a"],
+        [
+            {"nom": "a", "cout_par_naissance": 10},
+            {"nom": "a ", "cout_par_naissance": 5},
+        ],
+        [{"nom": "a", "cout_par_naissance": -1}],
+        [{"nom": "a", "cout_par_naissance": 10, "effets": {"inconnue": -10}}],
+    ],
+)
+def test_interventions_invalides(interventions):
+    with pytest.raises(ErreurScenario):
+        optimise(parametres.defaut, NAISSANCES, interventions, 1000)
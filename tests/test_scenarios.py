@@ -0,0 +1,113 @@
+import io
+
+import pandas as pd
+import pytest
+
+from model import parametres, slots
+from scenarios import ErreurScenario, evalue_scenarios, lit_fichier, lit_ndjson
+from scenarios import lit_scenario, matrice_csv
+from territoires import recherche_territoires, slot_salaire
+
+PREVALENCE = "Prévalence de la dépression"
+
+
+def lit_csv(texte, taille_bloc=10000):
+    chemin = io.StringIO(texte)
+    return list(pd.read_csv(chemin, chunksize=taille_bloc))
+
+
+def test_matrice_csv():
+    (morceau,) = lit_csv(f"id,territoire,naissances,{PREVALENCE}\na,1,,12\nb,,50,\n")
+    X, naissances = matrice_csv(morceau)
+    infos = recherche_territoires().get(1)
+    assert naissances.tolist() == [infos["Nombre de naissances (2018)"], 50]
+    assert X[0, slots[PREVALENCE]] == 12
+    assert X[0, slot_salaire] == infos["Salaire horaire des femmes"]
+    assert X[1].tolist() == list(parametres.defaut)
+
+
+@pytest.mark.parametrize(
+    "texte, erreur",
+    [
+        ("territoire\n0\n1.5\n", "Ligne 3 : Territoire invalide"),
+        ("territoire\nabc\n", "Ligne 2 : Territoire invalide"),
+        ("territoire\n999999\n", "Ligne 2 : Territoire inconnu"),
+        ("naissances\n12\nabc\n", "Ligne 3 : Valeur non numérique"),
+        ("naissances\n-5\n", "Ligne 2 : Nombre de naissances invalide"),
+        ("naissances\ninf\n", "Ligne 2 : Nombre de naissances invalide"),
+        (f"{PREVALENCE}\n10\n1e12\n", f"Ligne 3 : {PREVALENCE}"),
+        (f"{PREVALENCE}\ninf\n", f"Ligne 2 : {PREVALENCE}"),
+        ("inconnue\n1\n", "Variables inconnues"),
+    ],
+)
+def test_matrice_csv_invalide(texte, erreur):
+    (morceau,) = lit_csv(texte)
+    with pytest.raises(ErreurScenario, match=erreur):
+        matrice_csv(morceau)
+
+
+def test_matrice_csv_numero_de_ligne_par_blocs():
+    morceaux = lit_csv("naissances\n" + "1\n" * 25 + "-1\n", taille_bloc=10)
+    for morceau in morceaux[:-1]:
+        matrice_csv(morceau)
+    with pytest.raises(ErreurScenario, match="Ligne 27 "):
+        matrice_csv(morceaux[-1])
+
+
+def test_lit_fichier_jsonl(tmp_path):
+    chemin = tmp_path / "scenarios.jsonl"
+    chemin.write_text('{"id": 1, "territoire": 0}\n\n{"naissances": 3}\n')
+    assert list(lit_fichier(str(chemin))) == [
+        [{"id": 1, "territoire": 0}, {"naissances": 3}]
+    ]
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        5,
+        {"territoire": [1]},
+        {"territoire": True},
+        {"territoire": 1.5},
+        {"territoire": 999999},
+        {"naissances": True},
+        {"naissances": "12"},
+        {"naissances": -3},
+        {"naissances": float("inf")},
+        {"valeurs": {PREVALENCE: None}},
+        {"valeurs": {PREVALENCE: "12"}},
+        {"valeurs": {PREVALENCE: [1]}},
+        {"valeurs": {PREVALENCE: float("nan")}},
+        {"valeurs": {PREVALENCE: 1e12}},
+        {"valeurs": {"inconnue": 1}},
+        {"valeurs": [1, 2]},
+    ],
+)
+def test_lit_scenario_invalide(scenario):
+    with pytest.raises(ErreurScenario):
+        lit_scenario(scenario)
+
+
+def test_lit_scenario():
+    x, naissances = lit_scenario({"territoire": 1, "valeurs": {PREVALENCE: 12}})
+    infos = recherche_territoires().get(1)
+    assert naissances == infos["Nombre de naissances (2018)"]
+    assert x[slots[PREVALENCE]] == 12
+    assert x[slot_salaire] == infos["Salaire horaire des femmes"]
+    assert lit_scenario({"naissances": 7})[1] == 7
+
+
+def test_evalue_scenarios_erreurs_en_ligne():
+    lignes = ['{"id": 1}', "", "{pas du json", '{"id": 2, "naissances": -1}', "{}"]
+    resultats = list(
+        evalue_scenarios(
+            lit_ndjson(lignes, erreurs_en_ligne=True), erreurs_en_ligne=True
+        )
+    )
+    assert [r.get("id") for r in resultats] == [1, None, 2, None]
+    assert resultats[1] == {"erreur": "Ligne 3 : JSON invalide"}
+    assert "erreur" in resultats[2] and "erreur" not in resultats[3]
+    assert resultats[0]["cout_total"] == resultats[3]["cout_total"]
+
+    with pytest.raises(ErreurScenario):
+        list(evalue_scenarios([{}, {"naissances": -1}]))
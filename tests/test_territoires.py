@@ -0,0 +1,29 @@
+import pytest
+
+from model import parametres
+from territoires import index_territoires
+
+
+@pytest.fixture(scope="module")
+def index():
+    return index_territoires(parametres.defaut)
+
+
+@pytest.mark.parametrize("n, attendu", [(5, 5), (1, 1), (0, 1), (-3, 1), (2.7, 2)])
+def test_top_n(index, n, attendu):
+    assert len(index.top(n)) == attendu
+    assert len(index.top(n, croissant=True)) == attendu
+
+
+def test_top_ordre(index):
+    couts = index.top(10, "Coût total")["Coût total"].values
+    assert (couts[:-1] >= couts[1:]).all()
+    assert couts[0] == index.colonnes["Coût total"].max()
+
+
+def test_filtre(index):
+    mini, maxi = 1e6, 1e8
+    couts = index.filtre("Coût total", mini, maxi)["Coût total"].values
+    attendus = index.colonnes["Coût total"]
+    assert len(couts) == ((attendus >= mini) & (attendus <= maxi)).sum()
+    assert (couts[:-1] <= couts[1:]).all()
@@ -1,25 +1,33 @@
 import pandas as pd
 import numpy as np
-import base64
+import hashlib
 import math
 import dash
 import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import dash_html_components as html
-import plotly.express as px
-import plotly.graph_objs as go
 
 from itertools import chain
 from dash.dependencies import Input, Output, State
 
+from model import df_variables, parametres, make_dataframes
+from model import slots_prevalences
+from graphe import CalculIncremental
 
 # CSS SETTINGS
 eq_width = {"width": "20%", "text-align": "center"}
 tt = {"always_visible": False, "placement": "topLeft"}
 
-# VARIABLES
-global df_variables
-df_variables = pd.read_csv("resources/bdd_variables.csv")
+# ASSETS : servis par Dash depuis assets/, avec un cache d'un an (statique.py)
+IMAGE_CARTE = "card_image_transparent.png"
+
+
+def url_asset(nom):
+    """URL d'un fichier de assets/, suffixée par un hash de son contenu pour
+    que le cache navigateur soit invalidé quand le fichier change"""
+    with open(f"assets/{nom}", "rb") as f:
+        empreinte = hashlib.md5(f.read()).hexdigest()[:12]
+    return f"/assets/{nom}?v={empreinte}"
 
 
 def marker(num):
@@ -81,7 +89,7 @@ def make_group(title, items, item_name):
             className="ml-1",
             size="sm",
             style={"float": "right"},
-            id=f"open-tab-{item_name}",
+            id={"type": "open-tab", "index": item_name},
         )
 
     card_header = dbc.CardHeader(
@@ -110,7 +118,7 @@ def make_group(title, items, item_name):
         card_content = [
             dbc.Collapse(
                 card_content,
-                id=f"collapsible-{item_name}",
+                id={"type": "collapsible", "index": item_name},
                 style={"padding": "0 0 1em 0"},
             )
         ]
@@ -122,22 +130,36 @@ def make_group(title, items, item_name):
     )
 
 
+def make_badge(index):
+    """Point d'interrogation qui ouvre le popover {"type": "popover", "index": index}
+
+    Le popover se place sur l'id texte badge-{index} (dbc n'accepte pas d'id
+    dict pour target), le clic est lu sur l'id dict du badge par un callback
+    MATCH unique pour tous les popovers"""
+
+    return html.Span(
+        dbc.Badge("?", pill=True, color="light", id={"type": "badge", "index": index}),
+        id=f"badge-{index}",
+    )
+
+
 def generate_qm(item):
-    id_hash = df_variables[df_variables["nom_variable"] == item].index.values[0]
-    question_mark = dbc.Badge("?", pill=True, color="light", id="badge-" + str(id_hash))
+    question_mark = make_badge(parametres.slots[item])
 
     return dbc.Col(question_mark, width=1, style={"padding": "5px"})
 
 
 def generate_popovers():
     popovers = list()
-    for i in range(df_variables.shape[0]):
+    for i, (nom, explication) in enumerate(
+        zip(df_variables["nom_variable"], df_variables["explication"])
+    ):
         pp = dbc.Popover(
             [
-                dbc.PopoverHeader(df_variables.iloc[i, :]["nom_variable"]),
-                dbc.PopoverBody(df_variables.iloc[i, :]["explication"]),
+                dbc.PopoverHeader(nom),
+                dbc.PopoverBody(explication),
             ],
-            id=f"popover-{i}",
+            id={"type": "popover", "index": i},
             target=f"badge-{i}",
             is_open=False,
         )
@@ -149,15 +171,50 @@ def make_row(it):
     return dbc.Row([dbc.Col(html.Label(it)), dbc.Col(question_mark)])
 
 
-def make_card_repartition(df_par_naissance):
+# modèle incrémental partagé par les callbacks : seuls les termes qui
+# dépendent des sliders modifiés depuis le calcul précédent sont recalculés
+calcul_incremental = CalculIncremental()
+
+
+def compute_dataframes(sliders, n_naissances):
+    """Coûts par cas, par naissance, par secteur et coût total pour les valeurs
+    des sliders"""
+
+    v = parametres.vecteur(sliders)
+    detail = calcul_incremental.calcule(v)
+    df_par_cas, df_repartition = make_dataframes(
+        detail["couts_par_cas"], detail["repartition_secteur"]
+    )
+    df_par_cas = df_par_cas.reset_index()
 
-    total_mere = df_par_naissance["Mère"].sum()
-    total_bebe = df_par_naissance["Bébé"].sum()
+    prevalences = np.array([v[slot] for slot in slots_prevalences]) / 100
 
-    proportion_mere = 100 * total_mere / (total_mere + total_bebe)
+    df_par_naissance = df_par_cas.copy()
+    df_par_naissance.iloc[:, 1:] = df_par_naissance.iloc[:, 1:].mul(prevalences, axis=0)
 
-    image_filename = "resources/card_image_transparent.png"
-    encoded_image = base64.b64encode(open(image_filename, "rb").read())
+    # for df in [df_par_naissance]:
+    df_par_naissance.loc["3 maladies"] = ["Total des trois maladies"] + np.sum(
+        df_par_naissance.values[:, 1:], axis=0
+    ).tolist()
+
+    total_par_cas = df_par_naissance["Total"].iloc[:-1].sum()
+
+    if n_naissances is None:
+        n_naissances = 1  # set 1 as default to avoid problems if values is not defined
+
+    cout_total = total_par_cas * n_naissances
+
+    df_repartition["couts_totaux"] = (
+        df_repartition["Répartition des coûts par secteur"] * cout_total
+    )
+    df_repartition["couts_lisibles"] = df_repartition["couts_totaux"].apply(millify)
+
+    return df_par_cas, df_par_naissance, df_repartition, cout_total
+
+
+def make_card_repartition(proportion_mere):
+    """Carte de répartition des coûts mère / bébé, les pourcentages sont mis
+    à jour côté navigateur (ids proportion-mere et proportion-bebe)"""
 
     card = html.Div(
         [
@@ -166,9 +223,7 @@ def make_card_repartition(df_par_naissance):
                     dbc.Col(
                         [
                             html.Img(
-                                src="data:image/png;base64,{}".format(
-                                    encoded_image.decode()
-                                ),
+                                src=url_asset(IMAGE_CARTE),
                                 alt="Mère et bébé",
                                 width=130,
                             ),
@@ -179,6 +234,7 @@ def make_card_repartition(df_par_naissance):
                         [
                             html.H1(
                                 f"{proportion_mere: .0f} %",
+                                id="proportion-mere",
                                 style={
                                     "color": "#1b75bc",
                                     "font-weight": "bold",
@@ -187,6 +243,7 @@ def make_card_repartition(df_par_naissance):
                             html.P("de ces coûts sont liés à la mère"),
                             html.H1(
                                 f"{100 - proportion_mere: .0f} %",
+                                id="proportion-bebe",
                                 style={
                                     "color": "#8ec63f",
                                     "font-weight": "bold",
@@ -206,6 +263,166 @@ def make_card_repartition(df_par_naissance):
     return card
 
 
+# camembert par secteur : figure construite une fois, seules values et
+# customdata changent d'un jeu d'hypothèses à l'autre. Le template plotly
+# est réduit aux propriétés utilisées par un camembert
+FIGURE_PIE = {
+    "data": [
+        {
+            "type": "pie",
+            "labels": [],
+            "values": [],
+            "customdata": [],
+            "domain": {"x": [0.0, 1.0], "y": [0.0, 1.0]},
+            "hovertemplate": "<b>%{label}</b><br>Coût : %{customdata[0]}",
+            "legendgroup": "",
+            "marker": {"colors": ["#d91b5c", "#f7a5ab", "#8ec63f"]},
+            "name": "",
+            "showlegend": True,
+            "insidetextorientation": "horizontal",
+            "sort": False,
+            "textinfo": "label+percent",
+            "textposition": "auto",
+        }
+    ],
+    "layout": {
+        "legend": {"tracegroupgap": 0},
+        "piecolorway": ["#d91b5c", "#f7a5ab", "#8ec63f"],
+        "title": {"text": "<b>Répartition des coûts par secteur</b>"},
+        "height": 350,
+        "width": 350,
+        "showlegend": False,
+        "template": {
+            "data": {"pie": [{"automargin": True, "type": "pie"}]},
+            "layout": {
+                "font": {"color": "#2a3f5f"},
+                "hoverlabel": {"align": "left"},
+                "hovermode": "closest",
+                "paper_bgcolor": "white",
+                "title": {"x": 0.05},
+            },
+        },
+    },
+}
+
+
+def make_pie(df_repartition):
+    """Camembert de répartition des coûts par secteur, df_repartition contient
+    les colonnes couts_totaux et couts_lisibles"""
+
+    trace = {
+        **FIGURE_PIE["data"][0],
+        "labels": list(df_repartition.index),
+        "values": df_repartition["couts_totaux"].tolist(),
+        "customdata": df_repartition["couts_lisibles"].tolist(),
+    }
+    return {**FIGURE_PIE, "data": [trace]}
+
+
+# frontière efficace de la prévention : comme le camembert, une figure fixe
+# dont le template plotly est réduit aux propriétés utilisées par des courbes
+_AXE_FRONTIERE = {
+    "automargin": True,
+    "gridcolor": "white",
+    "linecolor": "white",
+    "ticks": "",
+    "zerolinecolor": "white",
+    "zerolinewidth": 2,
+}
+FIGURE_FRONTIERE = {
+    "data": [],
+    "layout": {
+        "title": {"text": "<b>Coût évité chaque année selon la dépense</b>"},
+        "height": 450,
+        "xaxis": {"title": {"text": "Dépense annuelle (€)", "standoff": 15}},
+        "yaxis": {"title": {"text": "Coût évité (€)", "standoff": 15}},
+        "legend": {"orientation": "h", "y": -0.2},
+        "template": {
+            "layout": {
+                "font": {"color": "#2a3f5f"},
+                "hoverlabel": {"align": "left"},
+                "hovermode": "closest",
+                "paper_bgcolor": "white",
+                "plot_bgcolor": "#E5ECF6",
+                "title": {"x": 0.05},
+                "xaxis": _AXE_FRONTIERE,
+                "yaxis": _AXE_FRONTIERE,
+            },
+        },
+    },
+}
+
+
+def make_frontiere(resultat, budget=None):
+    """Frontière efficace d'un résultat de prevention.optimise : coût évité
+    selon la dépense, droite coût évité = dépense, meilleure allocation et
+    budget"""
+
+    frontiere = resultat["frontiere"].tolist()
+    depense = resultat["depense"].tolist()
+    cout_evite = resultat["cout_evite"].tolist()
+    optimum = resultat["optimum"]
+
+    def couvertures(k):
+        return "<br>".join(
+            f"{nom} : {100 * c:.0f} %"
+            for nom, c in zip(
+                resultat["interventions"], resultat["couvertures"][k].tolist()
+            )
+            if c > 0
+        )
+
+    depense_max = depense[frontiere[-1]]
+    data = [
+        {
+            "type": "scatter",
+            "x": [depense[k] for k in frontiere],
+            "y": [cout_evite[k] for k in frontiere],
+            "mode": "lines+markers",
+            "name": "Frontière efficace",
+            "marker": {"color": "#1b75bc"},
+            "customdata": [
+                [millify(depense[k]), millify(cout_evite[k]), couvertures(k)]
+                for k in frontiere
+            ],
+            "hovertemplate": "Dépense : %{customdata[0]}<br>Coût évité : "
+            "%{customdata[1]}<br>%{customdata[2]}<extra></extra>",
+        },
+        {
+            "type": "scatter",
+            "x": [0, depense_max],
+            "y": [0, depense_max],
+            "mode": "lines",
+            "name": "Coût évité = dépense",
+            "line": {"color": "#f7a5ab", "dash": "dash"},
+            "hoverinfo": "skip",
+        },
+        {
+            "type": "scatter",
+            "x": [depense[optimum]],
+            "y": [cout_evite[optimum]],
+            "mode": "markers",
+            "name": "Meilleure allocation",
+            "marker": {"color": "#d91b5c", "size": 14},
+            "hoverinfo": "skip",
+        },
+    ]
+
+    layout = FIGURE_FRONTIERE["layout"]
+    if budget is not None:
+        ligne_budget = {
+            "type": "line",
+            "x0": budget,
+            "x1": budget,
+            "yref": "paper",
+            "y0": 0,
+            "y1": 1,
+            "line": {"color": "#8ec63f", "dash": "dot"},
+        }
+        layout = {**layout, "shapes": [ligne_budget]}
+    return {"data": data, "layout": layout}
+
+
 def millify(n):
     millnames = ["", " mille €", " millions d'€", " milliards d'€"]
     n = float(n)
@@ -219,7 +436,15 @@ def millify(n):
     return "{:.1f}{}".format(n / 10 ** (3 * millidx), millnames[millidx])
 
 
-def generate_form_naissances(bdd_naissances):
+def generate_form_naissances(recherche_territoires, territoire_defaut=0):
+    """Formulaire de choix du territoire : les options du dropdown sont
+    chargées à la frappe (callback sur search_value), seules celles des plus
+    grands territoires sont dans la page initiale"""
+
+    options = recherche_territoires.options(recherche_territoires.cherche(""))
+    if territoire_defaut not in [o["value"] for o in options]:
+        options += recherche_territoires.options([territoire_defaut])
+
     form = dbc.Form(
         [
             dbc.Col(
@@ -239,15 +464,10 @@ def generate_form_naissances(bdd_naissances):
             dbc.Col(
                 [
                     dcc.Dropdown(
-                        value=756662,
+                        value=territoire_defaut,
                         id="dd-echelle",
-                        options=[
-                            {
-                                "label": r["Nom de l'échelon"],
-                                "value": r["Nombre de naissances (2018)"],
-                            }
-                            for _, r in bdd_naissances.iterrows()
-                        ],
+                        options=options,
+                        placeholder="Rechercher un territoire",
                     ),
                 ],
                 width=4,